@@ -4,23 +4,49 @@ Social Threat Monitor - Flask API + Authentication System
 Individual endpoints for each service with fresh data fetching
 """
 
-from flask import Flask, jsonify, request, session, redirect
+import cProfile
+import gc
+import hmac
+import threading
+import time
+
+# Measured from before the first import for the startup timing report
+APP_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Response, g, jsonify, request, session, redirect, stream_with_context
 from flask_cors import CORS
-import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.datastructures import MultiDict
 
 import json
+import os
 import traceback
 import sys
 from datetime import datetime
+from functools import wraps
 from typing import Dict, Any
 
-from services.reddit_service import RedditService
-from services.twitter_service import TwitterService
-from services.youtube_service import YouTubeService
-from services.gnews_service import GNewsService
-from services.newsapi_service import NewsAPIService
-from utils.logger import setup_logger
+from services.reddit_stream import RedditStreamIngestor
+from services.base_service import collect_stream, metered_stream
+from services.fanout import fan_out_stream
+from services.registry import ServiceRegistry
+from services.circuit_breaker import guarded_stream
+from services.scan_jobs import PRIORITIES, ScanJobQueue, ScanQueueFull, job_store
+from utils.logger import bind_log_context, new_log_id, request_id_var, setup_logger
+from utils.memory import memory_tracker, process_memory
+from utils.sampler import StackSampler
+from utils.streaming import ndjson_stream
+from utils import metrics
+from utils.compression import compress_response
+from utils.coordination import shard_leaser
+from utils.json_codec import USE_ORJSON, FastJSONProvider, content_etag, without_volatile
+from utils import profiling
+from utils.projection import current_projection, parse_fields, projection_var
+from utils.rate_limiter import rate_limiter
+from utils.seen_filter import parse_repeat_mode, repeat_mode_var, seen_items
+from utils.upstream_cache import cache_mode_var, parse_cache_mode, upstream_cache
+from config.settings import Config
+from database import init_db, create_user, validate_user
+from utils.password_hasher import HasherSaturated, password_hasher
 
 # --------------------------------------------------------------------
 # FLASK APP SETUP
@@ -29,79 +55,153 @@ from utils.logger import setup_logger
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
+if USE_ORJSON:
+    app.json = FastJSONProvider(app)
+
 app.secret_key = "sameer-super-secret-key"  # change if you want
 
 logger = setup_logger("flask_app")
 
-# --------------------------------------------------------------------
-# SQLITE AUTH SETUP
-# --------------------------------------------------------------------
 
-DB_NAME = "users.db"
+@app.before_request
+def bind_request_id():
+    """Tag every log record of this request with X-Request-ID (or a fresh id)"""
+    g.request_id = request.headers.get('X-Request-ID') or new_log_id()
+    g.request_id_token = request_id_var.set(g.request_id)
 
 
-def init_db():
-    """Create users table if it doesn't exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-        """
-    )
-    conn.commit()
-    conn.close()
+@app.after_request
+def echo_request_id(response):
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    return response
 
 
-def create_user(name: str, email: str, password: str) -> bool:
-    """Create a new user. Returns True if success, False if email exists."""
-    hashed_pw = generate_password_hash(password)
+@app.teardown_request
+def unbind_request_id(_error):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
 
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-            (name, email, hashed_pw),
-        )
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        # Email already exists
-        return False
 
+@app.before_request
+def track_in_flight():
+    metrics.HTTP_IN_FLIGHT.inc()
+    g.in_flight = True
+
+
+@app.after_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUESTS.inc(request.method, endpoint, response.status_code)
+    return response
+
+
+@app.teardown_request
+def untrack_in_flight(_error):
+    # Streamed responses finish here, after the last chunk was sent
+    if g.pop('in_flight', False):
+        metrics.HTTP_IN_FLIGHT.dec()
+
+@app.before_request
+def start_profiling():
+    """?profile=1 collects per-stage timings; &cprofile=1 also captures a cProfile dump"""
+    if request.args.get('profile') != '1':
+        return
+
+    path = None
+    if request.args.get('cprofile') == '1' and Config.PROFILE_CPROFILE_ENABLED:
+        path = g.profile_path = profiling.cprofile_path(Config.PROFILE_DIR, g.request_id)
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    g.stage_timings_token = profiling.stage_timings_var.set(profiling.StageTimings(path))
+
+
+@app.teardown_request
+def stop_profiling(_error):
+    # Runs after a streamed response has sent its last line
+    token = g.pop('stage_timings_token', None)
+    if token is not None:
+        profiling.stage_timings_var.reset(token)
+
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(g.profile_path)
+
+@app.before_request
+def bind_field_projection():
+    """?fields=summary|full|a,b,c limits which detection fields services build"""
+    if 'fields' in request.args:
+        g.projection_token = projection_var.set(parse_fields(request.args.get('fields')))
+
+
+@app.teardown_request
+def unbind_field_projection(_error):
+    token = g.pop('projection_token', None)
+    if token is not None:
+        projection_var.reset(token)
 
-def validate_user(email: str, password: str):
-    """
-    Validate login credentials.
-    Returns (True, name, user_id) if valid, else (False, None, None)
-    """
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT id, name, password FROM users WHERE email = ?", (email,)
-    )
-    user = cursor.fetchone()
-    conn.close()
 
-    if user and check_password_hash(user[2], password):
-        return True, user[1], user[0]
-    return False, None, None
+@app.before_request
+def bind_repeat_mode():
+    """?repeats=skip|flag|off overrides SEEN_FILTER_MODE for items earlier scans already saw"""
+    if 'repeats' in request.args:
+        g.repeat_mode_token = repeat_mode_var.set(parse_repeat_mode(request.args.get('repeats')))
 
 
-# Initialize DB at startup
+@app.teardown_request
+def unbind_repeat_mode(_error):
+    token = g.pop('repeat_mode_token', None)
+    if token is not None:
+        repeat_mode_var.reset(token)
+
+
+@app.before_request
+def bind_cache_mode():
+    """?cache=refresh re-fetches from the platforms (and stores the result), ?cache=off bypasses the cache"""
+    if 'cache' in request.args:
+        g.cache_mode_token = cache_mode_var.set(parse_cache_mode(request.args.get('cache')))
+
+
+@app.teardown_request
+def unbind_cache_mode(_error):
+    token = g.pop('cache_mode_token', None)
+    if token is not None:
+        cache_mode_var.reset(token)
+
+
+@app.after_request
+def compress(response):
+    """gzip/brotli by Accept-Encoding for bodies of at least COMPRESS_MIN_SIZE bytes"""
+    return compress_response(response, request.accept_encodings)
+
+# Multi-worker servers write per-process snapshots (see METRICS_DIR)
+metrics.registry.start()
+
+# Restore the cross-scan seen-item filter and snapshot it periodically
+seen_items.start()
+
+
+# --------------------------------------------------------------------
+# SQLITE AUTH SETUP
+# --------------------------------------------------------------------
+
+# User storage lives in database.py; create/upgrade the schema at startup
 init_db()
 
 # --------------------------------------------------------------------
 # AUTH ROUTES
 # --------------------------------------------------------------------
 
+def hashing_busy_response(error: HasherSaturated):
+    """503 with Retry-After when the password hashing pool is saturated."""
+    logger.warning("🔐 Password hashing saturated, shedding auth request")
+    response = jsonify({"success": False, "message": "Server busy, please retry shortly"})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
+
+
 @app.route("/signup", methods=["POST"])
 def signup():
     """
@@ -118,7 +218,12 @@ def signup():
     if not name or not email or not password:
         return jsonify({"success": False, "message": "All fields are required"}), 400
 
-    if create_user(name, email, password):
+    try:
+        created = create_user(name, email, password)
+    except HasherSaturated as e:
+        return hashing_busy_response(e)
+
+    if created:
         return jsonify({"success": True, "message": "Account created successfully"})
     else:
         return jsonify({"success": False, "message": "Email already registered"}), 409
@@ -138,7 +243,10 @@ def login():
     if not email or not password:
         return jsonify({"success": False, "message": "Email and password required"}), 400
 
-    status, user_name, user_id = validate_user(email, password)
+    try:
+        status, user_name, user_id = validate_user(email, password)
+    except HasherSaturated as e:
+        return hashing_busy_response(e)
 
     if status:
         session["user_id"] = user_id
@@ -174,34 +282,146 @@ def logout():
 # ORIGINAL THREAT MONITOR API
 # --------------------------------------------------------------------
 
-# Service instances cache
-service_instances = {}
+# Platform services, imported only when enabled so unused SDKs never load
+SERVICE_CLASSES = {
+    "reddit": "services.reddit_service:RedditService",
+    "twitter": "services.twitter_service:TwitterService",
+    "youtube": "services.youtube_service:YouTubeService",
+    "gnews": "services.gnews_service:GNewsService",
+    "newsapi": "services.newsapi_service:NewsAPIService"
+}
+
+# Service registry: one client per platform, built concurrently at boot
+service_registry = ServiceRegistry({
+    name: path for name, path in SERVICE_CLASSES.items() if name in Config.ENABLED_SERVICES
+})
+
+# Skip the reloader's parent process, which never serves requests
+if Config.SERVICE_WARMUP and not (__name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'):
+    service_registry.start_warm_up()
 
 
 def get_service_instance(service_name: str):
-    """Get or create service instance with error handling"""
-    if service_name not in service_instances:
-        try:
-            if service_name == "reddit":
-                service_instances[service_name] = RedditService()
-            elif service_name == "twitter":
-                service_instances[service_name] = TwitterService()
-            elif service_name == "youtube":
-                service_instances[service_name] = YouTubeService()
-            elif service_name == "gnews":
-                service_instances[service_name] = GNewsService()
-            elif service_name == "newsapi":
-                service_instances[service_name] = NewsAPIService()
-            else:
-                raise ValueError(f"Unknown service: {service_name}")
-
-            logger.info(f"✅ {service_name.capitalize()} service initialized")
+    """Get service instance from the registry (None if disabled or it failed to initialize)"""
+    if service_name not in service_registry.names:
+        return None
+    with profiling.stage(profiling.CONNECT):
+        return service_registry.get(service_name)
 
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize {service_name}: {e}")
-            return None
 
-    return service_instances[service_name]
+def json_response(payload: Dict[str, Any]):
+    """
+    jsonify with a strong ETag over the encoded body, answering 304 when
+    the client's If-None-Match still matches. Per-request timestamps are
+    left out of the body, so an unchanged result encodes the same on every
+    poll. With ?profile=1 the stage timings are added instead.
+    """
+    payload = without_volatile(payload)
+    timings = profiling.current_timings()
+    if timings is None:
+        response = jsonify(payload)
+        etag = content_etag(response.get_data())
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    # Encode once to measure serialization; the body sent also carries the timings
+    with profiling.stage(profiling.SERIALIZE):
+        app.json.dumps(payload)
+    payload["timings"] = timings.as_dict()
+    return jsonify(payload)
+
+
+def request_targets(name: str, default: str, split_commas: bool = False, args: MultiDict = None):
+    """
+    Read one or more scan targets from the query string (or ``args``).
+    Accepts repeated parameters (?query=a&query=b) and, when split_commas
+    is set, comma-separated lists (?subreddit=a,b,c).
+    """
+    values = (request.args if args is None else args).getlist(name)
+    if split_commas:
+        values = [part for value in values for part in value.split(',')]
+
+    targets = list(dict.fromkeys(value.strip() for value in values if value.strip()))
+    if len(targets) > Config.SCAN_MAX_TARGETS:
+        raise ValueError(f"Too many {name} targets (max {Config.SCAN_MAX_TARGETS})")
+    return targets or [default]
+
+
+# Per platform: (target parameter, default target, comma-separated targets,
+# default limit, stream_data argument for the target, for the limit)
+SCAN_PLANS = {
+    "reddit": ("subreddit", "TwoXChromosomes", True, 10, "subreddit_name", "limit"),
+    "twitter": ("query", "harassment OR abuse OR threat", False, 50, "query", "max_tweets"),
+    "youtube": ("query", "women harassment", False, 20, "query", "max_results"),
+    "gnews": ("query", "women harassment OR gender violence OR sexual harassment", False, 20, "query", "max_articles"),
+    "newsapi": ("query", "women harassment OR women abuse OR sexual harassment", False, 20, "query", "max_articles")
+}
+
+
+def plan_targets(service_name: str, labels, limit: int):
+    """(label, stream_data kwargs) for each target of a platform"""
+    *_, target_argument, limit_argument = SCAN_PLANS[service_name]
+    return [(label, {target_argument: label, limit_argument: limit}) for label in labels]
+
+
+def scan_targets(service_name: str, args: MultiDict):
+    """(targets, limit) of a single-platform scan from its query parameters"""
+    parameter, default, split_commas, default_limit, _, _ = SCAN_PLANS[service_name]
+    limit = args.get('limit', default_limit, type=int)
+    return plan_targets(service_name, request_targets(parameter, default, split_commas, args), limit), limit
+
+
+def all_scan_targets(args: MultiDict):
+    """(service name, targets) pairs of /api/scan/all: one query set for every search-based platform"""
+    limit = args.get('limit', 20, type=int)
+    queries = request_targets('query', 'harassment OR abuse', args=args)
+    labels = {
+        "reddit": request_targets('subreddit', 'TwoXChromosomes', split_commas=True, args=args),
+        "twitter": queries,
+        "youtube": queries,
+        "gnews": request_targets('gnews_query', SCAN_PLANS["gnews"][1], args=args),
+        "newsapi": queries
+    }
+    return [(name, plan_targets(name, labels[name], limit)) for name in SCAN_PLANS]
+
+
+def scan_stream(service, targets, concurrency: int = None):
+    """
+    Detection stream for one target, or a concurrent merged stream for several.
+    The outcome is reported to the service's circuit breaker.
+    """
+    if len(targets) == 1:
+        stream = service.stream_data(**targets[0][1])
+    else:
+        if concurrency is None:
+            concurrency = request.args.get('concurrency', Config.SCAN_FANOUT_CONCURRENCY, type=int)
+        concurrency = max(1, min(concurrency, Config.SCAN_FANOUT_MAX_CONCURRENCY))
+        stream = fan_out_stream(service, targets, max_concurrency=concurrency)
+
+    stream = metered_stream(service.metrics_key, stream)
+    stream = guarded_stream(service_registry.breaker(service.service_name.lower()), stream)
+    return bind_log_context(stream, scan_id=new_log_id())
+
+
+def scan_response(service, targets):
+    """
+    Run a scan and return it as JSON, or as NDJSON when ?stream=ndjson is passed.
+    With ?profile=1 the response (or the NDJSON summary) includes per-stage timings.
+    ?fields= (summary, full or field names) trims every detection.
+    ?repeats= (skip, flag or off) decides what happens to items earlier scans fetched.
+    """
+    stream = scan_stream(service, targets)
+
+    if request.args.get('stream') == 'ndjson':
+        return Response(
+            stream_with_context(ndjson_stream(stream, service.service_name)),
+            mimetype='application/x-ndjson'
+        )
+
+    return json_response(collect_stream(stream))
 
 
 @app.route('/api/reddit/scan', methods=['GET'])
@@ -209,12 +429,13 @@ def scan_reddit():
     """
     Scan Reddit for threats
     Query parameters:
-    - subreddit: subreddit name (default: TwoXChromosomes)
+    - subreddit: subreddit name, or a comma-separated list (default: TwoXChromosomes)
     - limit: number of posts to scan (default: 10)
+    - concurrency: parallel scans when several subreddits are given
+    - stream: set to 'ndjson' to stream detections as they are found
     """
     try:
-        subreddit = request.args.get('subreddit', 'TwoXChromosomes')
-        limit = request.args.get('limit', 10, type=int)
+        targets, limit = scan_targets('reddit', request.args)
 
         service = get_service_instance('reddit')
         if not service:
@@ -225,10 +446,11 @@ def scan_reddit():
                 "timestamp": datetime.utcnow().isoformat()
             }), 503
 
-        logger.info(f"🔍 Reddit scan requested: r/{subreddit}, limit={limit}")
-        result = service.fetch_data(subreddit_name=subreddit, limit=limit)
+        logger.info(f"🔍 Reddit scan requested: r/{'+'.join(label for label, _ in targets)}, limit={limit}")
+        return scan_response(service, targets)
 
-        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "service": "reddit"}), 400
 
     except Exception as e:
         logger.error(f"❌ Reddit scan error: {e}")
@@ -246,12 +468,12 @@ def scan_twitter():
     """
     Scan Twitter for threats
     Query parameters:
-    - query: search query (default: harassment OR abuse)
+    - query: search query (default: harassment OR abuse) (repeat to scan several queries concurrently)
     - limit: max tweets to scan (default: 50)
+    - stream: set to 'ndjson' to stream detections as they are found
     """
     try:
-        query = request.args.get('query', 'harassment OR abuse OR threat')
-        limit = request.args.get('limit', 50, type=int)
+        targets, limit = scan_targets('twitter', request.args)
 
         service = get_service_instance('twitter')
         if not service:
@@ -262,10 +484,11 @@ def scan_twitter():
                 "timestamp": datetime.utcnow().isoformat()
             }), 503
 
-        logger.info(f"🔍 Twitter scan requested: query='{query}', limit={limit}")
-        result = service.fetch_data(query=query, max_tweets=limit)
+        logger.info(f"🔍 Twitter scan requested: queries={[label for label, _ in targets]}, limit={limit}")
+        return scan_response(service, targets)
 
-        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "service": "twitter"}), 400
 
     except Exception as e:
         logger.error(f"❌ Twitter scan error: {e}")
@@ -283,12 +506,12 @@ def scan_youtube():
     """
     Scan YouTube for threats
     Query parameters:
-    - query: search query (default: women harassment)
+    - query: search query (default: women harassment) (repeat to scan several queries concurrently)
     - limit: max videos to scan (default: 20)
+    - stream: set to 'ndjson' to stream detections as they are found
     """
     try:
-        query = request.args.get('query', 'women harassment')
-        limit = request.args.get('limit', 20, type=int)
+        targets, limit = scan_targets('youtube', request.args)
 
         service = get_service_instance('youtube')
         if not service:
@@ -299,10 +522,11 @@ def scan_youtube():
                 "timestamp": datetime.utcnow().isoformat()
             }), 503
 
-        logger.info(f"🔍 YouTube scan requested: query='{query}', limit={limit}")
-        result = service.fetch_data(query=query, max_results=limit)
+        logger.info(f"🔍 YouTube scan requested: queries={[label for label, _ in targets]}, limit={limit}")
+        return scan_response(service, targets)
 
-        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "service": "youtube"}), 400
 
     except Exception as e:
         logger.error(f"❌ YouTube scan error: {e}")
@@ -320,12 +544,12 @@ def scan_gnews():
     """
     Scan GNews for threats
     Query parameters:
-    - query: search query (default: women harassment OR gender violence)
+    - query: search query (default: women harassment OR gender violence) (repeat to scan several queries concurrently)
     - limit: max articles to scan (default: 20)
+    - stream: set to 'ndjson' to stream detections as they are found
     """
     try:
-        query = request.args.get('query', 'women harassment OR gender violence OR sexual harassment')
-        limit = request.args.get('limit', 20, type=int)
+        targets, limit = scan_targets('gnews', request.args)
 
         service = get_service_instance('gnews')
         if not service:
@@ -336,10 +560,11 @@ def scan_gnews():
                 "timestamp": datetime.utcnow().isoformat()
             }), 503
 
-        logger.info(f"🔍 GNews scan requested: query='{query}', limit={limit}")
-        result = service.fetch_data(query=query, max_articles=limit)
+        logger.info(f"🔍 GNews scan requested: queries={[label for label, _ in targets]}, limit={limit}")
+        return scan_response(service, targets)
 
-        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "service": "gnews"}), 400
 
     except Exception as e:
         logger.error(f"❌ GNews scan error: {e}")
@@ -357,12 +582,12 @@ def scan_newsapi():
     """
     Scan NewsAPI for threats
     Query parameters:
-    - query: search query (default: women harassment OR abuse)
+    - query: search query (default: women harassment OR abuse) (repeat to scan several queries concurrently)
     - limit: max articles to scan (default: 20)
+    - stream: set to 'ndjson' to stream detections as they are found
     """
     try:
-        query = request.args.get('query', 'women harassment OR women abuse OR sexual harassment')
-        limit = request.args.get('limit', 20, type=int)
+        targets, limit = scan_targets('newsapi', request.args)
 
         service = get_service_instance('newsapi')
         if not service:
@@ -373,10 +598,11 @@ def scan_newsapi():
                 "timestamp": datetime.utcnow().isoformat()
             }), 503
 
-        logger.info(f"🔍 NewsAPI scan requested: query='{query}', limit={limit}")
-        result = service.fetch_data(query=query, max_articles=limit)
+        logger.info(f"🔍 NewsAPI scan requested: queries={[label for label, _ in targets]}, limit={limit}")
+        return scan_response(service, targets)
 
-        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e), "service": "newsapi"}), 400
 
     except Exception as e:
         logger.error(f"❌ NewsAPI scan error: {e}")
@@ -394,14 +620,12 @@ def scan_all_services():
     """
     Scan all available services
     Query parameters:
-    - query: search query for Twitter, YouTube, and news services
-    - subreddit: Reddit subreddit to scan
+    - query: search query for Twitter, YouTube, and news services (repeatable)
+    - subreddit: Reddit subreddit to scan, or a comma-separated list
     - limit: limit for each service
     """
     try:
-        query = request.args.get('query', 'harassment OR abuse')
-        subreddit = request.args.get('subreddit', 'TwoXChromosomes')
-        limit = request.args.get('limit', 20, type=int)
+        service_configs = all_scan_targets(request.args)
 
         results = {
             "scan_timestamp": datetime.utcnow().isoformat(),
@@ -410,33 +634,15 @@ def scan_all_services():
             "services": {}
         }
 
-        # Define service configurations
-        gnews_query = request.args.get(
-            'gnews_query',
-            'women harassment OR gender violence OR sexual harassment')
-
-        service_configs = [
-        ("reddit", {"subreddit_name": subreddit, "limit": limit}),
-        ("twitter", {"query": query, "max_tweets": limit}),
-        ("youtube", {"query": query, "max_results": limit}),
-        ("gnews", {"query": gnews_query, "max_articles": limit}),
-        ("newsapi", {"query": query, "max_articles": limit})
-          ]
-
-# service_configs = [
-        #     ("reddit", {"subreddit_name": subreddit, "limit": limit}),
-        #     ("twitter", {"query": query, "max_tweets": limit}),
-        #     ("youtube", {"query": query, "max_results": limit}),
-        #     ("gnews", {"query": query, "max_articles": limit}),
-        #     ("newsapi", {"query": query, "max_articles": limit})
-        # ]
-
-        for service_name, config in service_configs:
+        for service_name, targets in service_configs:
+            if service_name not in service_registry.names:
+                continue
+
             try:
                 service = get_service_instance(service_name)
                 if service:
                     logger.info(f"🔍 Scanning {service_name}")
-                    result = service.fetch_data(**config)
+                    result = collect_stream(scan_stream(service, targets))
                     results["services"][service_name] = result
 
                     if result.get("success"):
@@ -461,7 +667,10 @@ def scan_all_services():
         results["scan_completed"] = datetime.utcnow().isoformat()
         logger.info(f"✅ All services scan completed: {results['total_threats_found']} total threats found")
 
-        return jsonify(results)
+        return json_response(results)
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
 
     except Exception as e:
         logger.error(f"❌ All services scan error: {e}")
@@ -473,23 +682,280 @@ def scan_all_services():
         }), 500
 
 
+# --------------------------------------------------------------------
+# ASYNCHRONOUS SCAN JOBS
+# --------------------------------------------------------------------
+
+def job_args(params: Dict[str, Any]) -> MultiDict:
+    """A job's stored parameters as the query-string MultiDict the scan helpers read"""
+    return MultiDict([(name, value) for name, values in params.items() for value in values])
+
+
+def run_scan_job(job):
+    """Scan each platform a job asks for, handing every detection stream to the job"""
+    args = job_args(job.params)
+    request_id_var.set(f"job-{job.id[:12]}")
+    if 'fields' in args:
+        projection_var.set(parse_fields(args.get('fields')))
+    if 'repeats' in args:
+        repeat_mode_var.set(parse_repeat_mode(args.get('repeats')))
+    if 'cache' in args:
+        cache_mode_var.set(parse_cache_mode(args.get('cache')))
+
+    if job.service == "all":
+        plans = [(name, targets) for name, targets in all_scan_targets(args) if name in service_registry.names]
+    else:
+        plans = [(job.service, scan_targets(job.service, args)[0])]
+    concurrency = args.get('concurrency', Config.SCAN_FANOUT_CONCURRENCY, type=int)
+
+    for service_name, targets in plans:
+        if job.cancelled:
+            return
+        service = service_registry.get(service_name)
+        if not service:
+            # A single-platform job has nothing left to scan: it fails
+            if job.service != "all":
+                raise RuntimeError(f"{service_name} service unavailable")
+            job.record(service_name, {
+                "success": False,
+                "error": f"{service_name} service unavailable",
+                "timestamp": datetime.utcnow().isoformat()
+            })
+            continue
+        try:
+            job.drain(service_name, scan_stream(service, targets, concurrency))
+        except Exception as e:
+            # A single-platform job fails with its platform; /all carries on like /api/scan/all
+            if job.service != "all":
+                raise
+            logger.error(f"❌ Scan job {job.id}: error scanning {service_name}: {e}")
+            job.record(service_name, {"success": False, "error": str(e), "timestamp": datetime.utcnow().isoformat()})
+
+
+scan_jobs = ScanJobQueue(
+    run_scan_job,
+    workers=Config.SCAN_JOB_WORKERS,
+    max_queued=Config.SCAN_JOB_MAX_QUEUED,
+    result_ttl=Config.SCAN_JOB_RESULT_TTL,
+    max_detections=Config.SCAN_JOB_MAX_DETECTIONS,
+    retry_after=Config.SCAN_JOB_RETRY_AFTER,
+    store=job_store()
+)
+os.register_at_fork(after_in_child=scan_jobs.reset_after_fork)
+
+
+@app.route('/api/scans', methods=['POST'])
+def submit_scan_job():
+    """
+    Queue a scan and return its job id immediately (202)
+    JSON body:
+    - service: reddit, twitter, youtube, gnews, newsapi or all
+    - params: the query parameters of the matching scan endpoint, e.g.
+      {"subreddit": "a,b", "limit": 200, "fields": "summary"}
+    - priority: high, normal (default) or low
+    """
+    body = request.get_json(silent=True) or {}
+    service_name = str(body.get('service') or '').lower()
+    priority = str(body.get('priority') or 'normal').lower()
+    params = {
+        str(name): [str(value) for value in (values if isinstance(values, list) else [values])]
+        for name, values in (body.get('params') or {}).items()
+    }
+
+    if service_name != "all" and service_name not in SCAN_PLANS:
+        return jsonify({"success": False, "error": f"Unknown service: {service_name or '(none)'}"}), 400
+    if service_name != "all" and service_name not in service_registry.names:
+        return jsonify({"success": False, "error": f"{service_name} service is disabled"}), 400
+    if priority not in PRIORITIES:
+        return jsonify({"success": False, "error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+
+    try:
+        # Reject bad parameters now rather than in the background
+        if service_name == "all":
+            all_scan_targets(job_args(params))
+        else:
+            scan_targets(service_name, job_args(params))
+        job = scan_jobs.submit(service_name, params, priority)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except ScanQueueFull as e:
+        logger.warning("🗂️ Scan job queue full, rejecting job")
+        response = jsonify({"success": False, "error": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 503
+
+    status_url = f"/api/scans/{job.id}"
+    response = jsonify({"success": True, "job": job.snapshot(None), "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+
+@app.route('/api/scans', methods=['GET'])
+def scan_job_queue_status():
+    """Queue depth and job counts of this process"""
+    return jsonify({"success": True, **scan_jobs.stats()})
+
+
+@app.route('/api/scans/<job_id>', methods=['GET'])
+def scan_job_status(job_id):
+    """
+    State and results so far of a scan job
+    Query parameters:
+    - offset: skip this many detections (poll with the previous next_offset)
+    """
+    offset = max(0, request.args.get('offset', 0, type=int))
+    snapshot = scan_jobs.status(job_id, offset)
+    if snapshot is None:
+        return jsonify({"success": False, "error": "Unknown or expired scan job"}), 404
+    snapshot["next_offset"] = offset + len(snapshot["detections"])
+    return json_response({"success": True, "job": snapshot})
+
+
+@app.route('/api/scans/<job_id>', methods=['DELETE'])
+def cancel_scan_job(job_id):
+    """Cancel a queued or running scan job; it keeps the results gathered so far"""
+    snapshot = scan_jobs.cancel(job_id)
+    if snapshot is None:
+        return jsonify({"success": False, "error": "Unknown or expired scan job"}), 404
+    logger.info(f"🛑 Scan job {job_id} cancellation requested ({snapshot['state']})")
+    return jsonify({"success": True, "job": snapshot})
+
+
+# --------------------------------------------------------------------
+# REDDIT STREAM MODE
+# --------------------------------------------------------------------
+
+reddit_stream = None
+
+
+def launch_reddit_stream(subreddits):
+    """
+    (Re)start the ingestor over ``subreddits``, sharing them out with the
+    other processes ingesting them (utils.coordination); None when the
+    Reddit service is unavailable
+    """
+    global reddit_stream
+
+    service = get_service_instance('reddit')
+    if not service:
+        return None
+
+    if reddit_stream and reddit_stream.running:
+        reddit_stream.stop()
+
+    # The ingestor reports its connection to the breaker, settling the
+    # half-open probe the lookup above may have claimed
+    reddit_stream = RedditStreamIngestor(service, subreddits, shards=shard_leaser("reddit_stream"),
+                                         breaker=service_registry.breaker('reddit'))
+    reddit_stream.start()
+    logger.info(f"📡 Reddit stream mode started: r/{reddit_stream.multireddit or '(no shards held yet)'}")
+    return reddit_stream
+
+
+def stop_reddit_stream_ingestion():
+    """Stop the ingestor, handing its shards back to the other processes"""
+    if reddit_stream and reddit_stream.running:
+        reddit_stream.stop()
+
+
+@app.route('/api/reddit/stream', methods=['GET'])
+def reddit_stream_status():
+    """
+    Reddit stream mode status
+    Query parameters:
+    - limit: number of recent detections to return (default: 50)
+    - fields: detection fields to return (summary, full or field names)
+    """
+    limit = request.args.get('limit', 50, type=int)
+
+    if not reddit_stream:
+        return jsonify({"success": True, "running": False, "detections": []})
+
+    projection = current_projection()
+    detections = [d.to_dict(projection) for d in list(reddit_stream.recent_detections)[-limit:]] if limit > 0 else []
+    return jsonify({
+        "success": True,
+        **reddit_stream.status(),
+        "detections": detections,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+
+@app.route('/api/reddit/stream/start', methods=['POST'])
+def start_reddit_stream():
+    """
+    Start continuous ingestion over a combined multireddit; with several
+    processes ingesting, each streams only the subreddits in its shards
+    Query parameters:
+    - subreddits: comma-separated subreddit names (default: SUBREDDITS setting)
+    """
+    try:
+        subreddits = request.args.get('subreddits', Config.REDDIT_STREAM_SUBREDDITS).split(',')
+
+        stream = launch_reddit_stream(subreddits)
+        if not stream:
+            return jsonify({
+                "success": False,
+                "error": "Reddit service unavailable",
+                "service": "reddit",
+                "timestamp": datetime.utcnow().isoformat()
+            }), 503
+
+        return jsonify({"success": True, **stream.status()})
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    except Exception as e:
+        logger.error(f"❌ Reddit stream start error: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "success": False,
+            "error": str(e),
+            "service": "reddit",
+            "timestamp": datetime.utcnow().isoformat()
+        }), 500
+
+
+@app.route('/api/reddit/stream/stop', methods=['POST'])
+def stop_reddit_stream():
+    """Stop Reddit stream mode"""
+    if not reddit_stream or not reddit_stream.running:
+        return jsonify({"success": True, "running": False})
+
+    stop_reddit_stream_ingestion()
+    logger.info("🛑 Reddit stream mode stopped")
+    return jsonify({"success": True, **reddit_stream.status()})
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
+        registry_status = service_registry.status()
         services_status = {}
 
-        for service_name in ["reddit", "twitter", "youtube", "gnews", "newsapi"]:
-            try:
-                service = get_service_instance(service_name)
-                services_status[service_name] = "available" if service else "unavailable"
-            except Exception:
-                services_status[service_name] = "error"
+        for service_name, state in registry_status["services"].items():
+            services_status[service_name] = {
+                "ready": "available",
+                "circuit_open": "circuit_open",
+                "initializing": "initializing",
+                "pending": "pending"
+            }.get(state["state"], "unavailable")
 
         return jsonify({
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "services": services_status,
+            "disabled_services": [name for name in SERVICE_CLASSES if name not in service_registry.names],
+            "init_durations_ms": {
+                name: state["init_ms"] for name, state in registry_status["services"].items()
+            },
+            "password_hashing": password_hasher.stats(),
+            "scan_jobs": scan_jobs.stats(),
+            "circuits": {
+                name: state["circuit"] for name, state in registry_status["services"].items()
+            },
             "endpoints": [
                 "/api/reddit/scan",
                 "/api/twitter/scan",
@@ -497,7 +963,12 @@ def health_check():
                 "/api/gnews/scan",
                 "/api/newsapi/scan",
                 "/api/scan/all",
-                "/api/health"
+                "/api/scans",
+                "/api/reddit/stream",
+                "/api/health",
+                "/api/live",
+                "/api/ready",
+                "/metrics"
             ]
         })
 
@@ -509,6 +980,257 @@ def health_check():
         }), 500
 
 
+@app.route('/api/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "alive", "timestamp": datetime.utcnow().isoformat()})
+
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once service warm-up has finished, 503 before"""
+    registry_status = service_registry.status()
+    ready = service_registry.warmed_up or not Config.SERVICE_WARMUP
+
+    return jsonify({
+        "ready": ready,
+        "timestamp": datetime.utcnow().isoformat(),
+        "enabled_services": service_registry.names,
+        "app_import_ms": APP_IMPORT_MS,
+        **registry_status
+    }), 200 if ready else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of upstream latency, throughput, errors and in-flight requests"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# --------------------------------------------------------------------
+# ADMIN DIAGNOSTICS
+# --------------------------------------------------------------------
+
+def admin_required(view):
+    """Require the X-Admin-Token header; the endpoint does not exist without ADMIN_TOKEN"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({"error": "Endpoint not found"}), 404
+        token = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+            return jsonify({"success": False, "error": "Admin token required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+stack_sampler = None
+stack_sampler_lock = threading.Lock()
+
+
+def collapsed_stacks_response(sampler: StackSampler):
+    response = Response(sampler.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(sampler.samples)
+    return response
+
+
+@app.route('/api/admin/profile', methods=['GET'])
+@admin_required
+def sample_profile():
+    """
+    Sample every thread for N seconds and return collapsed stacks
+    (feed to flamegraph.pl or speedscope)
+    Query parameters:
+    - seconds: sampling duration (default: 10, max: PROFILER_MAX_SECONDS)
+    - interval: seconds between samples (default: PROFILER_INTERVAL)
+    """
+    global stack_sampler
+
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), Config.PROFILER_MAX_SECONDS)
+    interval = max(request.args.get('interval', Config.PROFILER_INTERVAL, type=float), 0.001)
+
+    with stack_sampler_lock:
+        if stack_sampler and stack_sampler.running:
+            return jsonify({"success": False, "error": "A profiling session is already running"}), 409
+        sampler = stack_sampler = StackSampler(interval)
+        sampler.start()
+
+    logger.info(f"🔬 Sampling profiler running for {seconds:.1f}s")
+    time.sleep(seconds)
+    sampler.stop()
+    return collapsed_stacks_response(sampler)
+
+
+@app.route('/api/admin/profile/start', methods=['POST'])
+@admin_required
+def start_sample_profile():
+    """
+    Start sampling in the background until /api/admin/profile/stop
+    Query parameters:
+    - interval: seconds between samples (default: PROFILER_INTERVAL)
+    """
+    global stack_sampler
+
+    interval = max(request.args.get('interval', Config.PROFILER_INTERVAL, type=float), 0.001)
+
+    with stack_sampler_lock:
+        if stack_sampler and stack_sampler.running:
+            return jsonify({"success": False, "error": "A profiling session is already running"}), 409
+        stack_sampler = StackSampler(interval)
+        stack_sampler.start()
+
+    logger.info("🔬 Sampling profiler started")
+    return jsonify({"success": True, **stack_sampler.status()})
+
+
+@app.route('/api/admin/profile/stop', methods=['POST'])
+@admin_required
+def stop_sample_profile():
+    """Stop the background sampler and return its collapsed stacks"""
+    with stack_sampler_lock:
+        sampler = stack_sampler
+        if not sampler or not sampler.running:
+            return jsonify({"success": False, "error": "No profiling session is running"}), 409
+        sampler.stop()
+
+    logger.info(f"🔬 Sampling profiler stopped after {sampler.samples} samples")
+    return collapsed_stacks_response(sampler)
+
+
+@app.route('/api/admin/profile/status', methods=['GET'])
+@admin_required
+def sample_profile_status():
+    """Whether a sampling session is running and how many samples it has taken"""
+    if not stack_sampler:
+        return jsonify({"success": True, "running": False})
+    return jsonify({"success": True, **stack_sampler.status()})
+
+
+def app_memory_usage() -> Dict[str, Any]:
+    """Sizes of the app's own long-lived caches and registries"""
+    instances = service_registry.instances
+    return {
+        "service_instances": sorted(instances),
+        "detector_keywords": {
+            name: len(service.detector.keywords)
+            for name, service in instances.items() if getattr(service, "detector", None)
+        },
+        "reddit_stream": reddit_stream.memory_usage() if reddit_stream else None,
+        "stack_sampler_stacks": stack_sampler.status()["unique_stacks"] if stack_sampler else 0,
+        "seen_filter_bytes": seen_items.status()["memory_bytes"],
+        "upstream_cache_bytes": upstream_cache.memory.memory_bytes(),
+        "gc_objects": len(gc.get_objects()),
+        "gc_counts": gc.get_count(),
+        "loaded_modules": len(sys.modules)
+    }
+
+
+@app.route('/api/admin/memory', methods=['GET'])
+@admin_required
+def memory_report():
+    """
+    Process RSS, app cache sizes and, while tracing, top allocation sites
+    Query parameters:
+    - top: number of allocation sites to return (default: 20)
+    - group_by: lineno, filename or traceback (default: lineno)
+    - diff: compare against the last baseline snapshot (default: true)
+    """
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"success": False, "error": "group_by must be lineno, filename or traceback"}), 400
+
+    report = {
+        "success": True,
+        "process": process_memory(),
+        "app": app_memory_usage(),
+        "tracing": memory_tracker.tracing,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if memory_tracker.tracing:
+        report["allocations"] = memory_tracker.report(
+            top=request.args.get('top', 20, type=int),
+            group_by=group_by,
+            diff=request.args.get('diff', 'true').lower() == 'true'
+        )
+    return jsonify(report)
+
+
+@app.route('/api/admin/memory/start', methods=['POST'])
+@admin_required
+def start_memory_tracing():
+    """
+    Start tracemalloc (slows allocations until stopped)
+    Query parameters:
+    - frames: stack frames kept per allocation (default: 1)
+    """
+    frames = min(max(request.args.get('frames', 1, type=int), 1), 50)
+    memory_tracker.start(frames)
+    logger.info(f"🧠 tracemalloc started ({frames} frame(s))")
+    return jsonify({"success": True, "tracing": True, "frames": frames})
+
+
+@app.route('/api/admin/memory/snapshot', methods=['POST'])
+@admin_required
+def take_memory_baseline():
+    """Store a baseline snapshot; later reports include growth since it"""
+    if not memory_tracker.tracing:
+        return jsonify({"success": False, "error": "tracemalloc is not running"}), 409
+    memory_tracker.take_baseline()
+    return jsonify({"success": True, "baseline_taken_at": datetime.utcnow().isoformat()})
+
+
+@app.route('/api/admin/memory/stop', methods=['POST'])
+@admin_required
+def stop_memory_tracing():
+    """Stop tracemalloc and drop its snapshots"""
+    memory_tracker.stop()
+    logger.info("🧠 tracemalloc stopped")
+    return jsonify({"success": True, "tracing": False})
+
+
+@app.route('/api/admin/seen', methods=['GET'])
+@admin_required
+def seen_filter_status():
+    """Fill level, rotations and memory of the cross-scan seen-item filter"""
+    return jsonify({"success": True, "seen_filter": seen_items.status()})
+
+
+@app.route('/api/admin/seen', methods=['DELETE'])
+@admin_required
+def clear_seen_filter():
+    """Forget every seen item; the next scans report everything as new"""
+    seen_items.clear()
+    logger.info("🧹 Seen-item filter cleared")
+    return jsonify({"success": True, "seen_filter": seen_items.status()})
+
+
+@app.route('/api/admin/cache', methods=['GET'])
+@admin_required
+def upstream_cache_status():
+    """TTLs and sizes of the in-process and shared platform response caches"""
+    return jsonify({"success": True, "upstream_cache": upstream_cache.status()})
+
+
+@app.route('/api/admin/cache', methods=['DELETE'])
+@admin_required
+def clear_upstream_cache():
+    """Drop every cached platform response, in this process and the shared store"""
+    upstream_cache.clear()
+    logger.info("🧹 Upstream response cache cleared")
+    return jsonify({"success": True, "upstream_cache": upstream_cache.status()})
+
+
+@app.route('/api/admin/rate-limits', methods=['GET'])
+@admin_required
+def rate_limit_status():
+    """Tokens left and remaining block time per platform/credential bucket"""
+    return jsonify({
+        "success": True,
+        "backend": Config.RATE_LIMIT_BACKEND,
+        "buckets": rate_limiter.status()
+    })
+
+
 # --------------------------------------------------------------------
 # ERROR HANDLERS
 # --------------------------------------------------------------------
@@ -524,7 +1246,16 @@ def not_found(error):
             "GET /api/gnews/scan?query=<text>&limit=<num>",
             "GET /api/newsapi/scan?query=<text>&limit=<num>",
             "GET /api/scan/all",
+            "POST /api/scans",
+            "GET /api/scans/<id>",
+            "DELETE /api/scans/<id>",
+            "GET /api/reddit/stream",
+            "POST /api/reddit/stream/start?subreddits=<a,b,c>",
+            "POST /api/reddit/stream/stop",
             "GET /api/health",
+            "GET /api/live",
+            "GET /api/ready",
+            "GET /metrics",
             "POST /signup",
             "POST /login",
             "GET /dashboard",
@@ -541,6 +1272,14 @@ def internal_error(error):
     }), 500
 
 
+# --------------------------------------------------------------------
+# STARTUP TIMING
+# --------------------------------------------------------------------
+
+APP_IMPORT_MS = round((time.perf_counter() - APP_IMPORT_STARTED) * 1000, 2)
+logger.info(f"⏱️ App loaded in {APP_IMPORT_MS} ms (enabled services: {', '.join(service_registry.names) or 'none'})")
+
+
 # --------------------------------------------------------------------
 # MAIN
 # --------------------------------------------------------------------
@@ -558,7 +1297,20 @@ if __name__ == '__main__':
     logger.info("   GET /api/gnews/scan?query=<text>&limit=<num>")
     logger.info("   GET /api/newsapi/scan?query=<text>&limit=<num>")
     logger.info("   GET /api/scan/all?query=<text>&subreddit=<name>&limit=<num>")
+    logger.info("   POST /api/scans  {service, params, priority}")
+    logger.info("   GET|DELETE /api/scans/<id>")
+    logger.info("   GET /api/reddit/stream")
+    logger.info("   POST /api/reddit/stream/start?subreddits=<a,b,c>")
+    logger.info("   POST /api/reddit/stream/stop")
     logger.info("   GET /api/health")
+    logger.info("   GET /api/live")
+    logger.info("   GET /api/ready")
+    logger.info("   GET /metrics")
+    logger.info("🛠️ Development server; in production run: gunicorn -c gunicorn.conf.py")
+
+    # Only the reloader's child serves requests (and ingests)
+    if Config.REDDIT_STREAM_AUTOSTART and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        launch_reddit_stream(Config.REDDIT_STREAM_SUBREDDITS.split(','))
 
     app.run(debug=True, host='0.0.0.0', port=5000)
 
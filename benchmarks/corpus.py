@@ -0,0 +1,164 @@
+"""
+Synthetic text corpora for detector benchmarks.
+
+Produces tweets (short), Reddit comments (medium) and news articles (long)
+from a fixed vocabulary. A share of the items (``threat_density``) has a
+detector keyword planted in it, and a share of those has the keyword
+obfuscated the way abusive posts often are (leetspeak, spacing, zero-width
+characters, look-alike letters). Another share of items mixes in non-ASCII
+text (accents, emoji, CJK, Arabic). Everything is seeded, so a given set of
+options always yields the same corpus.
+
+    python -m benchmarks.corpus --kind tweet --items 1000 --output tweets.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import random
+from typing import Dict, Iterator, List, Optional, Sequence
+
+# (min, max) characters per item
+KINDS = {
+    "tweet": (40, 280),
+    "reddit_comment": (80, 1200),
+    "article": (1500, 6000)
+}
+
+VOCABULARY = (
+    "the", "a", "and", "to", "of", "in", "is", "it", "that", "for", "on", "with", "as", "was", "at",
+    "by", "this", "from", "they", "we", "say", "her", "she", "or", "an", "will", "my", "one", "all",
+    "would", "there", "their", "what", "so", "up", "out", "if", "about", "who", "get", "which", "go",
+    "me", "when", "make", "can", "like", "time", "no", "just", "him", "know", "take", "people", "into",
+    "year", "your", "good", "some", "could", "them", "see", "other", "than", "then", "now", "look",
+    "only", "come", "its", "over", "think", "also", "back", "after", "use", "two", "how", "our",
+    "work", "first", "well", "way", "even", "new", "want", "because", "any", "these", "give", "day",
+    "most", "us", "city", "council", "report", "weekend", "market", "school", "family", "weather",
+    "football", "recipe", "travel", "music", "movie", "garden", "election", "budget", "museum",
+    "library", "coffee", "morning", "community", "project", "update", "release", "season", "team",
+    "doctor", "health", "science", "student", "teacher", "policy", "company", "street", "train"
+)
+
+UNICODE_FRAGMENTS = (
+    "café", "naïve", "jalapeño", "Zürich", "São Paulo", "façade", "crème brûlée", "😀", "🙄", "🔥",
+    "💔", "👀", "東京", "こんにちは", "谢谢", "안녕하세요", "مرحبا", "שלום", "Привет", "Ελλάδα"
+)
+
+LEET = {"a": "@", "e": "3", "i": "1", "o": "0", "s": "$", "t": "7"}
+HOMOGLYPHS = {"a": "а", "e": "е", "o": "о", "p": "р", "c": "с", "x": "х"}  # Cyrillic look-alikes
+ZERO_WIDTH = "​"
+
+OBFUSCATIONS = ("leet", "spaced", "zero_width", "homoglyph")
+
+
+def obfuscate(keyword: str, style: str, rng: random.Random) -> str:
+    if style == "leet":
+        return "".join(LEET.get(char, char) if rng.random() < 0.6 else char for char in keyword)
+    if style == "spaced":
+        return " ".join(keyword)
+    if style == "zero_width":
+        return ZERO_WIDTH.join(keyword)
+    if style == "homoglyph":
+        return "".join(HOMOGLYPHS.get(char, char) for char in keyword)
+    return keyword
+
+
+class CorpusGenerator:
+    """Seeded generator of benchmark items: {"kind", "text", "planted", "obfuscation"}"""
+
+    def __init__(self, keywords: Sequence[str], seed: int = 1, threat_density: float = 0.2,
+                 obfuscation_rate: float = 0.25, unicode_rate: float = 0.2):
+        self.keywords = list(keywords)
+        self.seed = seed
+        self.threat_density = threat_density
+        self.obfuscation_rate = obfuscation_rate
+        self.unicode_rate = unicode_rate
+
+    def _sentence(self, rng: random.Random, with_unicode: bool) -> str:
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(6, 18))]
+        if with_unicode and rng.random() < 0.5:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(UNICODE_FRAGMENTS))
+        return " ".join(words).capitalize() + rng.choice((".", ".", ".", "!", "?"))
+
+    def item(self, kind: str, index: int) -> Dict[str, object]:
+        rng = random.Random(f"{self.seed}:{kind}:{index}")
+        low, high = KINDS[kind]
+        target = rng.randint(low, high)
+        with_unicode = rng.random() < self.unicode_rate
+
+        sentences: List[str] = []
+        length = 0
+        while length < target:
+            sentence = self._sentence(rng, with_unicode)
+            sentences.append(sentence)
+            length += len(sentence) + 1
+
+        planted = obfuscation = None
+        if self.keywords and rng.random() < self.threat_density:
+            planted = rng.choice(self.keywords)
+            phrase = planted
+            if rng.random() < self.obfuscation_rate:
+                obfuscation = rng.choice(OBFUSCATIONS)
+                phrase = obfuscate(planted, obfuscation, rng)
+            position = rng.randrange(len(sentences))
+            words = sentences[position].split(" ")
+            words.insert(rng.randrange(len(words) + 1), phrase)
+            sentences[position] = " ".join(words)
+
+        text = " ".join(sentences)
+        if len(text) > high:
+            text = text[:high]
+        return {"kind": kind, "text": text, "planted": planted, "obfuscation": obfuscation}
+
+    def generate(self, kind: str, count: int) -> List[Dict[str, object]]:
+        return [self.item(kind, index) for index in range(count)]
+
+    def iter_mixed(self, count: int, kinds: Sequence[str] = tuple(KINDS)) -> Iterator[Dict[str, object]]:
+        for index in range(count):
+            yield self.item(kinds[index % len(kinds)], index)
+
+
+def synthetic_keywords(count: int, base: Sequence[str] = (), seed: int = 1) -> List[str]:
+    """
+    ``base`` topped up to ``count`` entries with made-up words and two-word
+    phrases, to measure how the detector scales with its rule list
+    """
+    keywords = list(dict.fromkeys(base))[:count]
+    seen = set(keywords)
+    rng = random.Random(f"keywords:{seed}")
+    consonants, vowels = "bcdfghjklmnprstvwz", "aeiou"
+    while len(keywords) < count:
+        word = "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(rng.randint(2, 5)))
+        if rng.random() < 0.3:
+            word = f"{word} {rng.choice(VOCABULARY)}"
+        if word not in seen:
+            seen.add(word)
+            keywords.append(word)
+    return keywords
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=tuple(KINDS) + ("mixed",), default="mixed")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--threat-density", type=float, default=0.2)
+    parser.add_argument("--obfuscation-rate", type=float, default=0.25, help="share of planted keywords obfuscated")
+    parser.add_argument("--unicode-rate", type=float, default=0.2, help="share of items with non-ASCII text")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", required=True, help="JSON lines, gzip'd when it ends in .gz")
+    args = parser.parse_args(argv)
+
+    from services.threat_detector import ThreatDetector
+
+    generator = CorpusGenerator(ThreatDetector().keywords, args.seed, args.threat_density,
+                                args.obfuscation_rate, args.unicode_rate)
+    items = generator.iter_mixed(args.items) if args.kind == "mixed" else generator.generate(args.kind, args.items)
+
+    opener = gzip.open if args.output.endswith(".gz") else open
+    with opener(args.output, "wt", encoding="utf-8") as output_file:
+        for item in items:
+            output_file.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
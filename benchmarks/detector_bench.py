@@ -0,0 +1,173 @@
+"""
+Micro-benchmark for ThreatDetector.
+
+Runs ``detect_threat`` and ``analyze`` (and any batch entry point the
+detector grows, see BATCH_FUNCTIONS) over synthetic tweets, Reddit comments
+and articles from benchmarks/corpus.py, with the keyword list padded to
+each of ``--sizes``. For every (function, keyword count, item kind) case it
+records items/sec, ns per input character and the per-item allocation peak
+measured with tracemalloc, and writes the lot to a JSON file so the cost of
+rule-list growth can be tracked from commit to commit.
+
+    python -m benchmarks.detector_bench --sizes 100,1000,10000,50000 --items 200
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.common import REPO_ROOT, environment, git_commit, write_json
+from benchmarks.corpus import KINDS, CorpusGenerator, synthetic_keywords
+
+DEFAULT_SIZES = "100,1000,10000,50000"
+
+# Per-item entry points on ThreatDetector
+ITEM_FUNCTIONS = ("detect_threat", "analyze")
+# Batch entry points (list of texts in, list of results out), benchmarked when present
+BATCH_FUNCTIONS = ("analyze_batch", "analyze_many", "detect_threats")
+
+
+def _per_item(function: Callable[[str], Any]) -> Callable[[Sequence[str]], None]:
+    def run(texts: Sequence[str]):
+        for text in texts:
+            function(text)
+    return run
+
+
+def entry_points(detector) -> Dict[str, Callable[[Sequence[str]], None]]:
+    """name -> callable running it over a list of texts"""
+    functions = {name: _per_item(getattr(detector, name)) for name in ITEM_FUNCTIONS}
+    for name in BATCH_FUNCTIONS:
+        function = getattr(detector, name, None)
+        if callable(function):
+            functions[name] = function
+    return functions
+
+
+def time_case(run: Callable[[Sequence[str]], None], texts: Sequence[str], budget: float,
+              chunk: int = 10) -> Dict[str, float]:
+    """
+    Run ``texts`` through ``run`` in chunks until they are all done or
+    ``budget`` seconds have passed, then again while time is left
+    """
+    items = chars = 0
+    elapsed = 0.0
+    while texts and elapsed < budget:
+        for start in range(0, len(texts), chunk):
+            batch = texts[start:start + chunk]
+            started = time.perf_counter()
+            run(batch)
+            elapsed += time.perf_counter() - started
+            items += len(batch)
+            chars += sum(len(text) for text in batch)
+            if elapsed >= budget:
+                break
+    return {"items": items, "chars": chars, "seconds": elapsed}
+
+
+def allocation_peaks(run: Callable[[Sequence[str]], None], texts: Sequence[str]) -> List[int]:
+    """Peak bytes allocated while processing each text on its own"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for text in texts:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            run([text])
+            peaks.append(max(0, tracemalloc.get_traced_memory()[1] - baseline))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def bench(sizes: Sequence[int], kinds: Sequence[str], items: int, budget: float, alloc_sample: int,
+          threat_density: float, seed: int, functions: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    from services.threat_detector import ThreatDetector
+
+    detector = ThreatDetector()
+    base_keywords = list(detector.keywords)
+    generator = CorpusGenerator(base_keywords, seed=seed, threat_density=threat_density)
+    corpora = {kind: [item["text"] for item in generator.generate(kind, items)] for kind in kinds}
+
+    results = []
+    for size in sizes:
+        detector.keywords = synthetic_keywords(size, base_keywords, seed=seed)
+        for name, run in entry_points(detector).items():
+            if functions and name not in functions:
+                continue
+            for kind, texts in corpora.items():
+                timing = time_case(run, texts, budget)
+                threats = sum(1 for text in texts if detector.detect_threat(text)) if name == "detect_threat" else None
+                peaks = allocation_peaks(run, texts[:alloc_sample])
+                result = {
+                    "function": name,
+                    "keywords": size,
+                    "kind": kind,
+                    "items": timing["items"],
+                    "chars": timing["chars"],
+                    "seconds": round(timing["seconds"], 4),
+                    "items_per_sec": round(timing["items"] / timing["seconds"], 1) if timing["seconds"] else None,
+                    "ns_per_char": round(timing["seconds"] * 1e9 / timing["chars"], 2) if timing["chars"] else None,
+                    "alloc_peak_bytes_mean": round(sum(peaks) / len(peaks)) if peaks else None,
+                    "alloc_peak_bytes_max": max(peaks) if peaks else None
+                }
+                if threats is not None:
+                    result["threat_share"] = round(threats / len(texts), 3)
+                results.append(result)
+                print_row(result)
+    return results
+
+
+def print_row(result: Dict[str, Any]):
+    print(f"{result['function']:<14} {result['keywords']:>7} {result['kind']:<15} {result['items']:>7} "
+          f"{result['items_per_sec'] or '-':>12} {result['ns_per_char'] or '-':>10} "
+          f"{result['alloc_peak_bytes_mean'] or '-':>10}", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="keyword list sizes")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="item kinds from: " + ", ".join(KINDS))
+    parser.add_argument("--functions", help="only these entry points, e.g. detect_threat")
+    parser.add_argument("--items", type=int, default=200, help="corpus items per kind")
+    parser.add_argument("--budget", type=float, default=2.0, help="timed seconds per case")
+    parser.add_argument("--alloc-sample", type=int, default=20, help="items per case traced for allocations")
+    parser.add_argument("--threat-density", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result JSON (default: benchmarks/results/detector-<time>.json)")
+    args = parser.parse_args(argv)
+
+    # The detector logs at INFO on construction; keep the table readable
+    logging.disable(logging.INFO)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    functions = [name.strip() for name in args.functions.split(",")] if args.functions else None
+
+    print(f"{'function':<14} {'keywords':>7} {'kind':<15} {'items':>7} {'items/sec':>12} {'ns/char':>10} "
+          f"{'alloc B':>10}")
+    results = bench(sizes, kinds, args.items, args.budget, args.alloc_sample, args.threat_density, args.seed,
+                    functions)
+
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results",
+                                         f"detector-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, {
+        "benchmark": "detector",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "environment": environment(),
+        "config": {"sizes": sizes, "kinds": kinds, "items": args.items, "budget_s": args.budget,
+                   "alloc_sample": args.alloc_sample, "threat_density": args.threat_density, "seed": args.seed},
+        "results": results
+    })
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
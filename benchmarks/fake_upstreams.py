@@ -0,0 +1,300 @@
+"""
+Local stand-ins for the Reddit, Twitter, YouTube, GNews and NewsAPI HTTP APIs.
+
+Each platform gets its own small HTTP server answering the endpoints the
+services call with deterministic synthetic content, optionally slowed down
+and failing at a given rate. Point the app at them with
+UPSTREAM_BASE_URLS (printed on start):
+
+    python -m benchmarks.fake_upstreams --latency-ms 80 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from utils.replay import FaultInjector
+
+PLATFORMS = ("reddit", "twitter", "youtube", "gnews", "newsapi")
+DEFAULT_BASE_PORT = 8801
+
+THREAT_PHRASES = (
+    "she keeps getting harassed by a stalker", "he said he would kill you", "sexual harassment at work",
+    "revenge porn was posted of her", "they doxxed her address", "domestic violence shelter",
+    "creepy guy following me home", "online abuse and threats", "I know where you live",
+    "groping on the train", "sextortion messages again"
+)
+BENIGN_PHRASES = (
+    "great weather for a walk today", "new recipe for lentil soup", "the match went to extra time",
+    "city council approves new park", "tips for a job interview", "quarterly earnings beat estimates",
+    "photos from the mountain trip", "book club picks for spring", "how to fix a squeaky door",
+    "local library extends its hours"
+)
+
+
+class ContentGenerator:
+    """Deterministic synthetic posts: a share of them (threat_density) mention abuse"""
+
+    def __init__(self, seed: int = 1, threat_density: float = 0.3):
+        self.seed = seed
+        self.threat_density = threat_density
+
+    def text(self, key: str, sentences: int = 2) -> str:
+        rng = random.Random(f"{self.seed}:{key}")
+        parts = [rng.choice(BENIGN_PHRASES) for _ in range(sentences)]
+        if rng.random() < self.threat_density:
+            parts[rng.randrange(sentences)] = rng.choice(THREAT_PHRASES)
+        return ". ".join(parts).capitalize() + "."
+
+    @staticmethod
+    def timestamp(index: int) -> datetime:
+        return datetime.now(timezone.utc).replace(microsecond=0) - timedelta(minutes=7 * index)
+
+
+# ---- per-platform responses: (status, body) for a path and query ----
+
+def reddit_routes(content: ContentGenerator, items: int):
+    def listing(children, after=None):
+        return {"kind": "Listing", "data": {"after": after, "before": None, "dist": len(children), "children": children}}
+
+    def post(index: int, subreddit: str) -> Dict[str, Any]:
+        post_id = f"p{index:05d}"
+        return {"kind": "t3", "data": {
+            "id": post_id, "name": f"t3_{post_id}", "title": content.text(f"reddit-title-{index}", 1),
+            "selftext": content.text(f"reddit-body-{index}", 3), "author": f"user{index % 97}",
+            "subreddit": subreddit, "permalink": f"/r/{subreddit}/comments/{post_id}/post/",
+            "created_utc": content.timestamp(index).timestamp(), "score": index % 50, "num_comments": 3,
+            "url": f"https://reddit.com/r/{subreddit}/comments/{post_id}/post/"
+        }}
+
+    def comment(post_id: str, index: int, subreddit: str) -> Dict[str, Any]:
+        comment_id = f"{post_id}c{index}"
+        return {"kind": "t1", "data": {
+            "id": comment_id, "name": f"t1_{comment_id}", "body": content.text(f"reddit-comment-{comment_id}", 1),
+            "author": f"user{index}", "subreddit": subreddit, "link_id": f"t3_{post_id}", "parent_id": f"t3_{post_id}",
+            "permalink": f"/r/{subreddit}/comments/{post_id}/post/{comment_id}/",
+            "created_utc": content.timestamp(index).timestamp(), "score": 1, "replies": ""
+        }}
+
+    def route(method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/api/v1/access_token":
+            return 200, {"access_token": "fake-token", "token_type": "bearer", "expires_in": 86400, "scope": "*"}
+        if path == "/api/v1/me":
+            return 200, {"name": "fake_user", "id": "fake", "created_utc": 0}
+        match = re.match(r"^/r/([^/]+)/new/?$", path)
+        if match:
+            limit = min(int(query.get("limit", 25)), items)
+            return 200, listing([post(index, match.group(1)) for index in range(limit)])
+        match = re.match(r"^/comments/([^/]+)/?", path)
+        if match:
+            post_id = match.group(1)
+            index = int(post_id[1:]) if post_id[1:].isdigit() else 0
+            subreddit = "TwoXChromosomes"
+            return 200, [listing([post(index, subreddit)]),
+                         listing([comment(post_id, number, subreddit) for number in range(3)])]
+        return 404, {"message": "Not Found", "error": 404}
+
+    return route
+
+
+def twitter_routes(content: ContentGenerator, items: int):
+    def route(method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/2/tweets/search/recent":
+            count = min(int(query.get("max_results", 10)), items)
+            tweets = [{
+                "id": str(1_700_000_000_000 + index), "text": content.text(f"tweet-{index}", 1),
+                "author_id": str(1000 + index % 50),
+                "created_at": content.timestamp(index).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "public_metrics": {"retweet_count": index % 7, "reply_count": 1, "like_count": index % 31, "quote_count": 0}
+            } for index in range(count)]
+            users = [{"id": str(1000 + number), "name": f"User {number}", "username": f"user{number}"}
+                     for number in sorted({index % 50 for index in range(count)})]
+            return 200, {"data": tweets, "includes": {"users": users}, "meta": {"result_count": count}}
+        match = re.match(r"^/2/users/(\d+)$", path)
+        if match:
+            user_id = match.group(1)
+            return 200, {"data": {"id": user_id, "name": f"User {user_id}", "username": f"user{user_id}"}}
+        return 404, {"title": "Not Found Error", "status": 404}
+
+    return route
+
+
+def youtube_routes(content: ContentGenerator, items: int):
+    def route(method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path.endswith("/youtube/v3/search"):
+            count = min(int(query.get("maxResults", 5)), items)
+            return 200, {"kind": "youtube#searchListResponse", "items": [{
+                "kind": "youtube#searchResult",
+                "id": {"kind": "youtube#video", "videoId": f"vid{index:05d}"},
+                "snippet": {
+                    "title": content.text(f"video-title-{index}", 1),
+                    "description": content.text(f"video-description-{index}", 3),
+                    "channelTitle": f"Channel {index % 13}", "channelId": f"UC{index % 13:04d}",
+                    "publishedAt": content.timestamp(index).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "thumbnails": {"default": {"url": f"https://i.ytimg.com/vi/vid{index:05d}/default.jpg"}}
+                }
+            } for index in range(count)]}
+        if path.endswith("/youtube/v3/commentThreads"):
+            video_id = query.get("videoId", "vid")
+            count = min(int(query.get("maxResults", 10)), 5)
+            return 200, {"kind": "youtube#commentThreadListResponse", "items": [{
+                "id": f"{video_id}c{index}",
+                "snippet": {"topLevelComment": {"snippet": {
+                    "textDisplay": content.text(f"yt-comment-{video_id}-{index}", 1),
+                    "authorDisplayName": f"Viewer {index}", "authorChannelId": {"value": f"UCv{index}"},
+                    "publishedAt": content.timestamp(index).strftime("%Y-%m-%dT%H:%M:%SZ")
+                }}}
+            } for index in range(count)]}
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    return route
+
+
+def gnews_routes(content: ContentGenerator, items: int):
+    def route(method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/api/v4/search":
+            count = min(int(query.get("max", 10)), items)
+            return 200, {"totalArticles": count, "articles": [{
+                "title": content.text(f"gnews-title-{index}", 1),
+                "description": content.text(f"gnews-description-{index}", 2),
+                "content": content.text(f"gnews-content-{index}", 6),
+                "url": f"https://news.example.com/gnews/{index}",
+                "image": f"https://news.example.com/gnews/{index}.jpg",
+                "publishedAt": content.timestamp(index).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "source": {"name": f"Outlet {index % 9}", "url": "https://news.example.com"}
+            } for index in range(count)]}
+        return 404, {"errors": ["Not Found"]}
+
+    return route
+
+
+def newsapi_routes(content: ContentGenerator, items: int):
+    def route(method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/v2/everything":
+            count = min(int(query.get("pageSize", 20)), items)
+            return 200, {"status": "ok", "totalResults": count, "articles": [{
+                "source": {"id": f"outlet-{index % 9}", "name": f"Outlet {index % 9}"},
+                "author": f"Reporter {index % 11}",
+                "title": content.text(f"newsapi-title-{index}", 1),
+                "description": content.text(f"newsapi-description-{index}", 2),
+                "url": f"https://news.example.com/newsapi/{index}",
+                "urlToImage": f"https://news.example.com/newsapi/{index}.jpg",
+                "publishedAt": content.timestamp(index).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "content": content.text(f"newsapi-content-{index}", 6)
+            } for index in range(count)]}
+        return 404, {"status": "error", "code": "notFound", "message": "Not Found"}
+
+    return route
+
+
+ROUTES = {
+    "reddit": reddit_routes,
+    "twitter": twitter_routes,
+    "youtube": youtube_routes,
+    "gnews": gnews_routes,
+    "newsapi": newsapi_routes
+}
+
+
+def make_handler(platform: str, route, faults: FaultInjector):
+    class FakeUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _respond(self):
+            parts = urlsplit(self.path)
+            query = {name: values[-1] for name, values in parse_qs(parts.query).items()}
+            if self.headers.get("Content-Length"):
+                self.rfile.read(int(self.headers["Content-Length"]))
+
+            faults.delay()
+            if faults.should_fail():
+                status, body = 503, {"error": "injected upstream failure"}
+            else:
+                status, body = route(self.command, parts.path, query)
+
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = _respond
+        do_POST = _respond
+
+        def log_message(self, format, *args):
+            pass
+
+    FakeUpstreamHandler.__name__ = f"{platform.title()}FakeHandler"
+    return FakeUpstreamHandler
+
+
+class FakeUpstreams:
+    """One threaded HTTP server per platform on consecutive ports"""
+
+    def __init__(self, platforms=PLATFORMS, host: str = "127.0.0.1", base_port: int = DEFAULT_BASE_PORT,
+                 latency_ms: float = 0.0, error_rate: float = 0.0, threat_density: float = 0.3,
+                 items: int = 50, seed: int = 1):
+        self.host = host
+        self.servers: Dict[str, ThreadingHTTPServer] = {}
+        self.threads: List[threading.Thread] = []
+        content = ContentGenerator(seed, threat_density)
+        for offset, platform in enumerate(platforms):
+            faults = FaultInjector(latency_ms, error_rate, seed=seed + offset)
+            handler = make_handler(platform, ROUTES[platform](content, items), faults)
+            port = base_port + offset if base_port else 0
+            self.servers[platform] = ThreadingHTTPServer((host, port), handler)
+
+    @property
+    def base_urls(self) -> Dict[str, str]:
+        return {platform: f"http://{self.host}:{server.server_address[1]}" for platform, server in self.servers.items()}
+
+    def env(self) -> str:
+        """UPSTREAM_BASE_URLS value for these servers"""
+        return ",".join(f"{platform}={url}" for platform, url in self.base_urls.items())
+
+    def start(self) -> "FakeUpstreams":
+        for platform, server in self.servers.items():
+            thread = threading.Thread(target=server.serve_forever, name=f"fake-{platform}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--platforms", default=",".join(PLATFORMS), help="comma separated subset")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--threat-density", type=float, default=0.3, help="share of items that mention abuse")
+    parser.add_argument("--items", type=int, default=50, help="upper bound on items per listing")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    platforms = [name.strip() for name in args.platforms.split(",") if name.strip()]
+    upstreams = FakeUpstreams(platforms, args.host, args.base_port, args.latency_ms, args.error_rate,
+                              args.threat_density, args.items, args.seed).start()
+    print(f"UPSTREAM_BASE_URLS={upstreams.env()}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
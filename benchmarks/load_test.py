@@ -0,0 +1,346 @@
+"""
+HTTP load test for the Flask API.
+
+Boots app.py in a subprocess against the local fake platform servers
+(benchmarks/fake_upstreams.py), drives a weighted mix of endpoints from
+``--concurrency`` client threads for ``--duration`` seconds and writes
+throughput and latency percentiles, overall and per endpoint, to a JSON
+file. With ``--baseline`` the run is compared against an earlier result
+and the exit status is 1 when throughput drops, or p95/p99 latency rises,
+by more than ``--threshold``.
+
+    python -m benchmarks.load_test --concurrency 16 --duration 30 \\
+        --mix gnews=4,newsapi=4,scan_all=1,health=4,login=1 \\
+        --baseline benchmarks/baselines/load_test.json
+
+Use ``--url`` to load an already running server instead (its services must
+already point at fake upstreams or recorded cassettes).
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.common import REPO_ROOT, environment, git_commit, write_json
+
+BENCH_EMAIL = "loadtest@example.com"
+BENCH_PASSWORD = "loadtest-password"
+
+# name -> (method, path); form bodies are filled in per request
+ENDPOINTS = {
+    "reddit": ("GET", "/api/reddit/scan?limit=10"),
+    "twitter": ("GET", "/api/twitter/scan?limit=10"),
+    "youtube": ("GET", "/api/youtube/scan?limit=5"),
+    "gnews": ("GET", "/api/gnews/scan?limit=20"),
+    "newsapi": ("GET", "/api/newsapi/scan?limit=20"),
+    "scan_all": ("GET", "/api/scan/all?limit=5"),
+    "health": ("GET", "/api/health"),
+    "login": ("POST", "/login"),
+    "signup": ("POST", "/signup")
+}
+DEFAULT_MIX = "reddit=2,twitter=2,youtube=1,gnews=3,newsapi=3,scan_all=1,health=4,login=1"
+
+# Compared against the baseline: (path in the result, higher is better)
+COMPARED_STATS = (("throughput_rps", True), ("p95_ms", False), ("p99_ms", False))
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if not name:
+            continue
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": to_ms(sum(latencies) / count) if count else None,
+        "p50_ms": to_ms(percentile(latencies, 0.50)),
+        "p95_ms": to_ms(percentile(latencies, 0.95)),
+        "p99_ms": to_ms(percentile(latencies, 0.99)),
+        "max_ms": to_ms(latencies[-1]) if count else None
+    }
+
+
+class LoadRunner:
+    """Closed-loop load: each client thread sends its next request when the last one returns"""
+
+    def __init__(self, base_url: str, mix: Dict[str, float], concurrency: int, duration: float,
+                 warmup: float = 2.0, timeout: float = 60.0, seed: int = 1):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.timeout = timeout
+        self.seed = seed
+        self._samples: Dict[str, List[float]] = {name: [] for name in mix}
+        self._errors: Dict[str, int] = {name: 0 for name in mix}
+        self._lock = threading.Lock()
+
+    def _request(self, session: requests.Session, name: str, sequence: str) -> bool:
+        method, path = ENDPOINTS[name]
+        url = self.base_url + path
+        if name == "login":
+            response = session.post(url, data={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}, timeout=self.timeout)
+        elif name == "signup":
+            response = session.post(url, data={"name": "Load Test", "email": f"loadtest-{sequence}@example.com",
+                                               "password": BENCH_PASSWORD}, timeout=self.timeout)
+        else:
+            response = session.request(method, url, timeout=self.timeout)
+        response.content
+        return response.status_code < 400
+
+    def _client(self, index: int, measure_from: float, stop_at: float):
+        rng = random.Random(self.seed * 1000 + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        session = requests.Session()
+        sequence = 0
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            sequence += 1
+            try:
+                ok = self._request(session, name, f"{os.getpid()}-{index}-{sequence}-{time.time_ns()}")
+            except requests.RequestException:
+                ok = False
+            finished = time.perf_counter()
+            if started >= measure_from:
+                with self._lock:
+                    self._samples[name].append(finished - started)
+                    if not ok:
+                        self._errors[name] += 1
+        session.close()
+
+    def run(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        measure_from = now + self.warmup
+        stop_at = measure_from + self.duration
+        threads = [threading.Thread(target=self._client, args=(index, measure_from, stop_at), daemon=True)
+                   for index in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = max(time.perf_counter() - measure_from, 1e-9)
+
+        all_latencies = [value for samples in self._samples.values() for value in samples]
+        return {
+            "overall": summarize(all_latencies, sum(self._errors.values()), elapsed),
+            "endpoints": {name: summarize(self._samples[name], self._errors[name], elapsed) for name in self.mix}
+        }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regressions of ``result`` against ``baseline`` beyond ``threshold`` (0.1 = 10%)"""
+    regressions = []
+    sections = [("overall", result["overall"], baseline.get("overall", {}))]
+    sections += [(name, stats, baseline.get("endpoints", {}).get(name, {}))
+                 for name, stats in result["endpoints"].items()]
+
+    for section, current, previous in sections:
+        for stat, higher_is_better in COMPARED_STATS:
+            now, before = current.get(stat), previous.get(stat)
+            if not now or not before:
+                continue
+            change = (now - before) / before
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{section}.{stat}: {before} -> {now} ({change:+.1%})")
+    return regressions
+
+
+# ---- server under test ----
+
+def server_env(upstream_urls: str, workdir: str, args) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "UPSTREAM_BASE_URLS": upstream_urls,
+        "UPSTREAM_MODE": "live",
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench",
+        "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "TWITTER_BEARER_TOKEN": "bench", "YOUTUBE_API_KEY": "bench",
+        "GNEWS_API_KEY": "bench", "NEWSAPI_KEY": "bench",
+        # Measure the app, not the client-side pacing or the cross-scan filter
+        "RATE_LIMITS": "",
+        "SEEN_FILTER_MODE": args.seen_filter,
+        "SEEN_FILTER_PATH": "",
+        "UPSTREAM_CACHE_TTLS": args.upstream_cache,
+        "UPSTREAM_CACHE_PATH": os.path.join(workdir, "upstream_cache.db"),
+        "AUTH_DB_PATH": os.path.join(workdir, "users.db"),
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "metrics"),
+        "PYTHONUNBUFFERED": "1"
+    })
+    return env
+
+
+def start_server(args, upstream_urls: str, workdir: str, log_file) -> subprocess.Popen:
+    env = server_env(upstream_urls, workdir, args)
+    if args.server == "gunicorn":
+        # The production config (preload, gthread, recycling), sized from the command line
+        command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+                   "-b", f"{args.host}:{args.port}", "-w", str(args.workers), "--threads", str(args.threads)]
+    else:
+        command = [sys.executable, "-c",
+                   "import app; app.app.run(host=%r, port=%d, threaded=True, use_reloader=False)" % (args.host, args.port)]
+    # Run from the work dir so databases and snapshots stay out of the tree
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/api/ready", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def ensure_bench_user(base_url: str):
+    requests.post(base_url + "/signup", data={"name": "Load Test", "email": BENCH_EMAIL, "password": BENCH_PASSWORD},
+                  timeout=60)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load this running server instead of booting app.py")
+    parser.add_argument("--server", choices=("werkzeug", "gunicorn"), default="werkzeug")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before that")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,... from: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-items", type=int, default=20)
+    parser.add_argument("--seen-filter", choices=("off", "skip", "flag"), default="off",
+                        help="SEEN_FILTER_MODE for the server (off = every scan analyses everything)")
+    parser.add_argument("--upstream-cache", default="",
+                        help="platform response cache TTLs, e.g. gnews:300 (default: no caching)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="result JSON (default: benchmarks/results/load_test-<time>.json)")
+    parser.add_argument("--baseline", help="earlier result to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression, 0.10 = 10%%")
+    parser.add_argument("--save-baseline", action="store_true", help="also write the result to --baseline")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fake_upstreams import FakeUpstreams
+
+    mix = parse_mix(args.mix)
+    upstreams = server = None
+    workdir = tempfile.mkdtemp(prefix="load_test-")
+    log_path = os.path.join(workdir, "server.log")
+
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            upstreams = FakeUpstreams(base_port=0, latency_ms=args.upstream_latency_ms,
+                                      error_rate=args.upstream_error_rate, items=args.upstream_items,
+                                      seed=args.seed).start()
+            with open(log_path, "wb") as log_file:
+                server = start_server(args, upstreams.env(), workdir, log_file)
+            base_url = f"http://{args.host}:{args.port}"
+            wait_until_ready(base_url)
+
+        if "login" in mix:
+            ensure_bench_user(base_url)
+
+        print(f"Loading {base_url} with {args.concurrency} clients for {args.duration:.0f}s "
+              f"(+{args.warmup:.0f}s warm-up): {args.mix}", flush=True)
+        stats = LoadRunner(base_url, mix, args.concurrency, args.duration, args.warmup, seed=args.seed).run()
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if upstreams is not None:
+            upstreams.stop()
+
+    result = {
+        "benchmark": "load_test",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "environment": environment(),
+        "config": {
+            "server": "external" if args.url else args.server,
+            "workers": args.workers if args.server == "gunicorn" else 1,
+            "threads": args.threads if args.server == "gunicorn" else None,
+            "concurrency": args.concurrency, "duration_s": args.duration, "warmup_s": args.warmup,
+            "mix": mix, "upstream_latency_ms": args.upstream_latency_ms,
+            "upstream_error_rate": args.upstream_error_rate, "upstream_items": args.upstream_items,
+            "seen_filter": args.seen_filter, "upstream_cache": args.upstream_cache
+        },
+        **stats
+    }
+
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results",
+                                         f"load_test-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, result)
+    print_report(result)
+    print(f"Results written to {output}" + ("" if args.url else f" (server log: {log_path})"))
+
+    if args.baseline and args.save_baseline:
+        write_json(args.baseline, result)
+        print(f"Baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+def print_report(result: Dict[str, Any]):
+    rows: List[Tuple[str, Dict[str, Any]]] = [("overall", result["overall"])] + list(result["endpoints"].items())
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, stats in rows:
+        print(f"{name:<10} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms'] or '-':>8} {stats['p95_ms'] or '-':>8} {stats['p99_ms'] or '-':>8}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -29,3 +29,144 @@ class Config:
     YOUTUBE_MAX_RESULTS = int(os.getenv("YOUTUBE_MAX_RESULTS", "20"))
     NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "20"))
     GNEWS_MAX_ARTICLES = int(os.getenv("GNEWS_MAX_ARTICLES", "20"))
+
+    # Reddit stream mode
+    REDDIT_STREAM_SUBREDDITS = os.getenv("SUBREDDITS", "TwoXChromosomes")
+    REDDIT_STREAM_BATCH_SIZE = int(os.getenv("REDDIT_STREAM_BATCH_SIZE", "25"))
+    REDDIT_STREAM_FLUSH_SECONDS = float(os.getenv("REDDIT_STREAM_FLUSH_SECONDS", "5"))
+    REDDIT_STREAM_MAX_BACKOFF = float(os.getenv("REDDIT_STREAM_MAX_BACKOFF", "300"))
+    REDDIT_STREAM_RECENT_DETECTIONS = int(os.getenv("REDDIT_STREAM_RECENT_DETECTIONS", "500"))
+
+    # Multi-target scans
+    SCAN_FANOUT_CONCURRENCY = int(os.getenv("SCAN_FANOUT_CONCURRENCY", "4"))
+    SCAN_FANOUT_MAX_CONCURRENCY = int(os.getenv("SCAN_FANOUT_MAX_CONCURRENCY", "8"))
+    SCAN_MAX_TARGETS = int(os.getenv("SCAN_MAX_TARGETS", "10"))
+
+    # Service startup
+    SERVICE_WARMUP = os.getenv("SERVICE_WARMUP", "true").lower() == "true"
+    ENABLED_SERVICES = [
+        name.strip().lower()
+        for name in os.getenv("ENABLED_SERVICES", "reddit,twitter,youtube,gnews,newsapi").split(",")
+        if name.strip()
+    ]
+
+    # Circuit breakers
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+    CIRCUIT_BASE_COOLDOWN = float(os.getenv("CIRCUIT_BASE_COOLDOWN", "5"))
+    CIRCUIT_MAX_COOLDOWN = float(os.getenv("CIRCUIT_MAX_COOLDOWN", "300"))
+
+    # Local copy of the trimmed YouTube discovery document (built on first start)
+    YOUTUBE_DISCOVERY_CACHE = os.getenv("YOUTUBE_DISCOVERY_CACHE", "")
+
+    # Auth database
+    AUTH_DB_PATH = os.getenv("AUTH_DB_PATH", "users.db")
+    AUTH_DB_BUSY_TIMEOUT_MS = int(os.getenv("AUTH_DB_BUSY_TIMEOUT_MS", "5000"))
+
+    # Password hashing
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 2, 4))))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+    # Logging
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Keep 1 in N per-item messages per level, e.g. "DEBUG:1000,INFO:100,WARNING:10"
+    LOG_ITEM_SAMPLING = os.getenv("LOG_ITEM_SAMPLING", "DEBUG:1000,INFO:100,WARNING:10")
+
+    # Metrics: per-process snapshot directory for multi-worker servers
+    # (empty = single process); clear it before the server starts
+    METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+    # Request profiling (?profile=1); &cprofile=1 also dumps a cProfile capture
+    PROFILE_CPROFILE_ENABLED = os.getenv("PROFILE_CPROFILE_ENABLED", "false").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+    # Admin diagnostics (endpoints are disabled while ADMIN_TOKEN is empty)
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.01"))
+    PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+    # Response encoding: "auto" uses orjson when installed, "stdlib" forces json
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+    # Cross-scan seen-item filter: "flag" reports repeats marked as such,
+    # "skip" drops them before analysis (or per request, ?repeats=skip),
+    # "off" disables it
+    SEEN_FILTER_MODE = os.getenv("SEEN_FILTER_MODE", "flag").lower()
+    SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "200000"))
+    SEEN_FILTER_ERROR_RATE = float(os.getenv("SEEN_FILTER_ERROR_RATE", "0.001"))
+    SEEN_FILTER_PATH = os.getenv("SEEN_FILTER_PATH", "data/seen_items.bloom")
+    SEEN_FILTER_SNAPSHOT_SECONDS = float(os.getenv("SEEN_FILTER_SNAPSHOT_SECONDS", "60"))
+
+    # Client-side rate limits per platform and credential, as requests/seconds;
+    # youtube is counted in quota units (search.list = 100, commentThreads = 1)
+    RATE_LIMITS = os.getenv(
+        "RATE_LIMITS",
+        "reddit:100/60,twitter:450/900,youtube:10000/86400,gnews:100/86400,newsapi:100/86400"
+    )
+    # Platforms whose limits apply per endpoint: each endpoint gets its own bucket
+    RATE_LIMIT_PER_ENDPOINT = os.getenv("RATE_LIMIT_PER_ENDPOINT", "twitter")
+    RATE_LIMIT_HEADROOM = float(os.getenv("RATE_LIMIT_HEADROOM", "0.9"))
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "10"))
+    # "memory" (per process) or "sqlite" (shared by worker processes)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", "data/rate_limits.db")
+
+    # Upstream traffic: "live", "record" (live, saved to cassettes) or "replay"
+    # (answered from cassettes, with the injected latency and error rate)
+    UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()
+    CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+    UPSTREAM_FAKE_LATENCY_MS = float(os.getenv("UPSTREAM_FAKE_LATENCY_MS", "0"))
+    UPSTREAM_FAKE_ERROR_RATE = float(os.getenv("UPSTREAM_FAKE_ERROR_RATE", "0"))
+    # Point platforms at other hosts, e.g. "gnews=http://127.0.0.1:8804,twitter=http://127.0.0.1:8802"
+    UPSTREAM_BASE_URLS = os.getenv("UPSTREAM_BASE_URLS", "")
+
+    # Platform API response cache: seconds per platform, e.g.
+    # "reddit:60,youtube:300" (empty, missing or 0 = not cached), an
+    # in-process LRU over a SQLite file every worker shares (empty path =
+    # in-process only)
+    UPSTREAM_CACHE_TTLS = os.getenv("UPSTREAM_CACHE_TTLS", "")
+    UPSTREAM_CACHE_PATH = os.getenv("UPSTREAM_CACHE_PATH", "data/upstream_cache.db")
+    UPSTREAM_CACHE_MEMORY_ENTRIES = int(os.getenv("UPSTREAM_CACHE_MEMORY_ENTRIES", "512"))
+    UPSTREAM_CACHE_MAX_ROWS = int(os.getenv("UPSTREAM_CACHE_MAX_ROWS", "20000"))
+    UPSTREAM_CACHE_COMPRESS_LEVEL = int(os.getenv("UPSTREAM_CACHE_COMPRESS_LEVEL", "6"))
+
+    # Asynchronous scan jobs (POST /api/scans): worker threads per process,
+    # queue bound, and how long finished results stay available; "sqlite"
+    # lets every worker process report on and cancel any job
+    SCAN_JOB_WORKERS = int(os.getenv("SCAN_JOB_WORKERS", "2"))
+    SCAN_JOB_MAX_QUEUED = int(os.getenv("SCAN_JOB_MAX_QUEUED", "50"))
+    SCAN_JOB_MAX_DETECTIONS = int(os.getenv("SCAN_JOB_MAX_DETECTIONS", "5000"))
+    SCAN_JOB_RESULT_TTL = float(os.getenv("SCAN_JOB_RESULT_TTL", "3600"))
+    SCAN_JOB_RETRY_AFTER = int(os.getenv("SCAN_JOB_RETRY_AFTER", "5"))
+    SCAN_JOB_BACKEND = os.getenv("SCAN_JOB_BACKEND", "memory").lower()
+    SCAN_JOB_DB_PATH = os.getenv("SCAN_JOB_DB_PATH", "data/scan_jobs.db")
+
+    # Ingestion sharding: stream targets are hashed into SHARD_COUNT shards
+    # leased by the processes ingesting them; "memory" (one process),
+    # "sqlite" (processes sharing COORDINATION_DB_PATH) or "module:factory".
+    # Worker id defaults to host:pid
+    SHARD_COUNT = int(os.getenv("SHARD_COUNT", "16"))
+    SHARD_LEASE_SECONDS = float(os.getenv("SHARD_LEASE_SECONDS", "30"))
+    SHARD_WORKER_ID = os.getenv("SHARD_WORKER_ID", "")
+    COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "memory")
+    COORDINATION_DB_PATH = os.getenv("COORDINATION_DB_PATH", "data/coordination.db")
+    REDDIT_STREAM_AUTOSTART = os.getenv("REDDIT_STREAM_AUTOSTART", "false").lower() == "true"
+
+    # Production server (gunicorn.conf.py): preloaded app, threaded workers
+    # recycled after SERVER_MAX_REQUESTS (+ random jitter) requests
+    SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:5000")
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 2)))
+    SERVER_WORKER_CLASS = os.getenv("SERVER_WORKER_CLASS", "gthread")
+    SERVER_THREADS = int(os.getenv("SERVER_THREADS", "16"))
+    SERVER_TIMEOUT = int(os.getenv("SERVER_TIMEOUT", "120"))
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+    SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "5"))
+    SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "5000"))
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "500"))
+    SERVER_WARMUP_TIMEOUT = float(os.getenv("SERVER_WARMUP_TIMEOUT", "60"))
@@ -1,76 +1,157 @@
-import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
-
-DB_NAME = "users.db"
+"""
+User storage for the auth routes.
 
+All access goes through one SQLite connection per thread (WAL journal,
+busy_timeout, cached prepared statements) instead of opening and closing
+a connection on every call. The schema is versioned with PRAGMA
+user_version and upgraded by init_db().
+"""
 
-def init_db():
-    """Create the database and users table if not exists."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
+import os
+import sqlite3
+import threading
+
+from config.settings import Config
+from utils.password_hasher import password_hasher
+
+DB_NAME = Config.AUTH_DB_PATH
+
+# Each entry upgrades the schema by one version; never edit a released entry
+MIGRATIONS = [
+    # 1: users table
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL
+    )
+    """,
+]
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache reuses the prepared form
+INSERT_USER = "INSERT INTO users (name, email, password) VALUES (?, ?, ?)"
+SELECT_USER_BY_EMAIL = "SELECT id, name, password FROM users WHERE email = ?"
+SELECT_USER_BY_ID = "SELECT id, name, email FROM users WHERE id = ?"
+UPDATE_PASSWORD = "UPDATE users SET password = ? WHERE id = ?"
+
+
+class ConnectionPool:
+    """One SQLite connection per thread, re-created after a fork"""
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, statement_cache: int = 64):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache = statement_cache
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            # Connections must never be shared with a forked child
+            self._reset_after_fork()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: every single-statement write is its own transaction
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            cached_statements=self.statement_cache,
+            check_same_thread=False
         )
-    """)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
 
-    conn.commit()
-    conn.close()
+    def _reset_after_fork(self):
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
 
+    def close_all(self):
+        """Close every pooled connection (shutdown / worker recycle)"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
 
-def create_user(name, email, password):
-    """Insert a new user into DB. Returns True if success, False if email exists."""
 
-    hashed_pw = generate_password_hash(password)
+pool = ConnectionPool(DB_NAME, busy_timeout_ms=Config.AUTH_DB_BUSY_TIMEOUT_MS)
 
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-                       (name, email, hashed_pw))
-        conn.commit()
-        conn.close()
 
-        return True  # successfully inserted
+def init_db():
+    """Create the database and apply any pending schema migrations."""
+    conn = pool.connection()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    for target_version, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(migration)
+            conn.execute(f"PRAGMA user_version={target_version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def create_user(name: str, email: str, password: str) -> bool:
+    """
+    Create a new user. Returns True if success, False if email exists.
+    Raises HasherSaturated when the hashing pool is full.
+    """
+    hashed_pw = password_hasher.hash(password)
 
+    try:
+        pool.connection().execute(INSERT_USER, (name, email, hashed_pw))
+        return True
     except sqlite3.IntegrityError:
-        return False  # email already exists
-
-
-def validate_user(email, password):
-    """Check user login credentials.
-       Returns (True, name, user_id) if valid else (False, None, None)."""
-
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id, name, password FROM users WHERE email=?", (email,))
-    user = cursor.fetchone()
-
-    conn.close()
+        # Email already exists
+        return False
+
+
+def validate_user(email: str, password: str):
+    """
+    Validate login credentials.
+    Returns (True, name, user_id) if valid, else (False, None, None).
+    Hashes made with an outdated method or cost are upgraded in the background.
+    Raises HasherSaturated when the hashing pool is full.
+    """
+    user = pool.connection().execute(SELECT_USER_BY_EMAIL, (email,)).fetchone()
+
+    if user and password_hasher.verify(user[2], password):
+        if password_hasher.needs_rehash(user[2]):
+            password_hasher.rehash_in_background(password, lambda new_hash: update_password(user[0], new_hash))
+        return True, user[1], user[0]
+    return False, None, None
 
-    if user and check_password_hash(user[2], password):
-        return True, user[1], user[0]  # valid login
 
-    return False, None, None
+def update_password(user_id: int, hashed_pw: str):
+    """Replace a user's stored password hash."""
+    pool.connection().execute(UPDATE_PASSWORD, (hashed_pw, user_id))
 
 
 def get_user_by_id(user_id):
     """Fetch a user using their ID."""
-
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id, name, email FROM users WHERE id=?", (user_id,))
-    user = cursor.fetchone()
-
-    conn.close()
-
-    return user
+    return pool.connection().execute(SELECT_USER_BY_ID, (user_id,)).fetchone()
 
 
 # Run when this file executes directly
@@ -0,0 +1,103 @@
+"""
+Production server settings for gunicorn, read from Config (SERVER_* variables)
+
+    gunicorn -c gunicorn.conf.py
+
+The app is imported once in the master (preload), which waits for the
+service warm-up and freezes the heap before forking, so every worker
+shares the clients and compiled detector patterns copy-on-write. Workers
+are threaded: scans spend their time waiting on platform APIs, not CPU.
+"""
+
+import gc
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Several workers need a shared metrics directory for /metrics to cover all of them
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "social_threat_monitor_metrics"))
+
+from config.settings import Config  # noqa: E402
+
+# Per-process job state would 404 every poll that lands on another worker;
+# set before the preloaded app builds its job queue
+shared_backends = []
+if Config.SERVER_WORKERS > 1 and Config.SCAN_JOB_BACKEND != "sqlite":
+    Config.SCAN_JOB_BACKEND = "sqlite"
+    shared_backends.append("SCAN_JOB_BACKEND=sqlite")
+# Autostarted ingestion runs in every worker; with in-process leases each
+# would hold every shard and stream every subreddit
+if Config.SERVER_WORKERS > 1 and Config.REDDIT_STREAM_AUTOSTART and Config.COORDINATION_BACKEND.lower() == "memory":
+    Config.COORDINATION_BACKEND = "sqlite"
+    shared_backends.append("COORDINATION_BACKEND=sqlite")
+
+wsgi_app = "app:app"
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+worker_class = Config.SERVER_WORKER_CLASS
+threads = Config.SERVER_THREADS
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS_JITTER
+preload_app = True
+# Worker heartbeats on tmpfs, so a slow disk cannot get workers killed
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def on_starting(server):
+    from utils import metrics
+
+    metrics.registry.clear_snapshots()
+    if shared_backends:
+        server.log.info(f"{Config.SERVER_WORKERS} workers: using {', '.join(shared_backends)}")
+
+
+def when_ready(server):
+    from app import service_registry
+
+    if not service_registry.wait_for_warm_up(Config.SERVER_WARMUP_TIMEOUT):
+        server.log.warning(f"Service warm-up still running after {Config.SERVER_WARMUP_TIMEOUT:.0f}s; "
+                           f"workers will finish it themselves")
+
+    for instance in service_registry.instances.values():
+        detector = getattr(instance, "detector", None)
+        if detector is not None:
+            # Compiles the harassment patterns into re's cache before the fork
+            detector.detect_threat("warm-up")
+            break
+
+    # Everything built so far moves out of the collector's reach, so its
+    # passes in the workers never write to (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded app frozen ({gc.get_freeze_count()} objects shared with workers)")
+
+
+def post_fork(server, worker):
+    # Metrics, the seen-item filter and the password hasher reset themselves
+    # through os.register_at_fork; SQLite pools reconnect on the pid change
+    from app import service_registry
+    from utils.logger import restart_log_listeners
+
+    restart_log_listeners()
+    service_registry.reset_after_fork()
+
+    if Config.REDDIT_STREAM_AUTOSTART:
+        # Every worker joins the ingestion and leases its share of the shards
+        # through the shared coordination backend (forced to sqlite above)
+        from app import launch_reddit_stream
+
+        launch_reddit_stream(Config.REDDIT_STREAM_SUBREDDITS.split(","))
+
+
+def worker_exit(server, worker):
+    from app import stop_reddit_stream_ingestion
+    from database import pool
+
+    # Gives the worker's shards back now rather than when their leases expire
+    stop_reddit_stream_ingestion()
+    pool.close_all()
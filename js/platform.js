@@ -20,7 +20,10 @@ let lastScan = null;
 async function callAPI(endpoint, params = {}) {
   const url = new URL(API_CONFIG.BASE_URL + endpoint);
   Object.entries(params).forEach(([k, v]) => {
-    if (v !== null && v !== undefined) url.searchParams.append(k, v);
+    if (v === null || v === undefined) return;
+    // Arrays become repeated params so several targets share one request
+    if (Array.isArray(v)) v.forEach(item => url.searchParams.append(k, item));
+    else url.searchParams.append(k, v);
   });
 
   const res = await fetch(url.toString());
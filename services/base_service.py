@@ -1,25 +1,158 @@
+import time
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Any, Dict, Generator, Iterable, Optional
 from utils.logger import setup_logger
+from utils import metrics, profiling
+from utils.rate_limiter import shed_locally
+from utils.seen_filter import OFF, SKIP, current_repeat_mode, seen_items
+from services.models import Detection
+
+def collect_stream(stream: Generator[Detection, None, Dict[str, Any]]) -> Dict[str, Any]:
+    """Drain a detection stream into its final response with all detections attached"""
+    detections = []
+
+    while True:
+        try:
+            detections.append(next(stream))
+        except StopIteration as stop:
+            response = stop.value
+            break
+
+    response["data"]["detections"] = detections
+    return response
+
+
+def upstream_status(error) -> Optional[int]:
+    """HTTP status of a failed upstream call, when the client library exposes one"""
+    # requests, tweepy and prawcore errors carry .response; googleapiclient uses .resp
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def metered_stream(service_key: str,
+                   stream: Generator[Detection, None, Dict[str, Any]]) -> Generator[Detection, None, Dict[str, Any]]:
+    """Pass a detection stream through, recording scan duration, items scanned and threats found"""
+    started = time.perf_counter()
+    try:
+        while True:
+            try:
+                detection = next(stream)
+            except StopIteration as stop:
+                response = stop.value
+                break
+            yield detection
+    except Exception:
+        metrics.SCANS.inc(service_key, "error")
+        raise
+    finally:
+        metrics.SCAN_DURATION.observe(time.perf_counter() - started, service_key)
+
+    data = response.get("data") or {}
+    scanned = sum(value for key, value in data.items() if key.endswith("_scanned") and isinstance(value, int))
+    metrics.ITEMS_SCANNED.inc(service_key, amount=scanned)
+    metrics.THREATS_FOUND.inc(service_key, amount=data.get("threats_found", 0))
+    metrics.SCANS.inc(service_key, "success" if response.get("success") else "failure")
+    return response
+
 
 class BaseService(ABC):
+    # Whether stream_data may run on several threads at once (see services.fanout)
+    thread_safe = True
+
     def __init__(self, service_name):
         self.service_name = service_name
+        self.metrics_key = service_name.lower()
         self.logger = setup_logger(f"{service_name}_service")
 
+    def reset_after_fork(self):
+        """Drop pooled upstream connections inherited from the parent process"""
+        session = getattr(self, "session", None)
+        if session is not None:
+            session.close()
+
+    @contextmanager
+    def upstream_call(self, call: str, stage: str = profiling.UPSTREAM_LIST):
+        """Time one platform API call and count it by status if it fails"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(self.metrics_key, call, upstream_status(e) or "error")
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.UPSTREAM_LATENCY.observe(elapsed, self.metrics_key, call)
+            profiling.record_stage(stage, elapsed)
+
+    def upstream_pages(self, call: str, items: Iterable) -> Generator[Any, None, None]:
+        """
+        Iterate a lazily paginated API result (praw listings, tweepy
+        paginators), recording the time spent waiting on it as one call
+        """
+        iterator = iter(items)
+        waited = 0.0
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    metrics.UPSTREAM_ERRORS.inc(self.metrics_key, call, upstream_status(e) or "error")
+                    raise
+                finally:
+                    waited += time.perf_counter() - started
+                yield item
+        finally:
+            metrics.UPSTREAM_LATENCY.observe(waited, self.metrics_key, call)
+            profiling.record_stage(profiling.UPSTREAM_LIST, waited)
+
+    def seen_before(self, kind: str, item_id: str) -> bool:
+        """
+        True if an earlier scan already fetched this item (it is recorded
+        either way); always False while the request's repeat mode is off
+        """
+        if not item_id or current_repeat_mode() == OFF:
+            return False
+        seen = seen_items.check_and_add(f"{self.metrics_key}:{kind}:{item_id}")
+        metrics.CACHE_REQUESTS.inc("seen_items", "hit" if seen else "miss")
+        return seen
+
+    @property
+    def skip_repeats(self) -> bool:
+        """Whether repeats are dropped before analysis rather than flagged"""
+        return current_repeat_mode() == SKIP
+
     @abstractmethod
-    def fetch_data(self, **kwargs):
-        """Fetch fresh data from the service"""
+    def stream_data(self, **kwargs) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh detections as they are produced and return the final response"""
         pass
 
+    def fetch_data(self, **kwargs) -> Dict[str, Any]:
+        """Fetch fresh data from the service"""
+        return collect_stream(self.stream_data(**kwargs))
+
     def format_response(self, data, success=True, message="", error=None):
         """Standard response format"""
-        return {
+        response = {
             "service": self.service_name,
             "timestamp": datetime.utcnow().isoformat(),
             "success": success,
             "message": message,
             "error": str(error) if error else None,
+            "upstream_status": upstream_status(error) if error else None,
             "data": data,
             "total_items": len(data) if isinstance(data, list) else 0
         }
+        if error is not None and shed_locally(error):
+            # Shed by the client-side rate limiter; the platform was never asked
+            response["rate_limited"] = True
+        return response
@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Any, Dict, Generator
+
+from config.settings import Config
+from services.models import Detection
+from utils.logger import setup_logger
+from utils.rate_limiter import shed_locally
+
+logger = setup_logger("circuit_breaker")
+
+# Upstream statuses that say "this request was bad", not "the service is failing"
+CLIENT_ERROR_STATUSES = {400, 404, 422}
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one service
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are refused until the cool-down elapses. The cool-down doubles on
+    every consecutive trip, up to ``max_cooldown``. Once it elapses, one
+    probe call is let through (half-open): success closes the circuit,
+    failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None,
+                 base_cooldown: float = None, max_cooldown: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.base_cooldown = base_cooldown or Config.CIRCUIT_BASE_COOLDOWN
+        self.max_cooldown = max_cooldown or Config.CIRCUIT_MAX_COOLDOWN
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.open_until = 0.0
+        self.last_error = None
+        self.rejected = 0
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True if a call may proceed. Claims the probe slot when half-open."""
+        if self.state == self.CLOSED:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == self.OPEN:
+                if now < self.open_until:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+
+            # Half-open: one probe at a time; a probe that never reported back
+            # (e.g. an abandoned stream) expires after one cool-down period.
+            if self._probe_started is not None and now - self._probe_started < self.current_cooldown:
+                self.rejected += 1
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self.failures:
+            return
+
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probe_started = None
+
+    def record_failure(self, error: Any = None, trip: bool = False):
+        """Count a failure; ``trip`` opens the circuit immediately (e.g. constructor failures)"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error else None
+
+            if trip or self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self.open_until = time.monotonic() + self.current_cooldown
+                self._probe_started = None
+                logger.warning(f"Circuit for {self.name} opened for {self.current_cooldown:.0f}s "
+                               f"after {self.failures} failure(s): {self.last_error}")
+
+    def release(self):
+        """Give back an unused half-open probe slot"""
+        with self._lock:
+            self._probe_started = None
+
+    @property
+    def current_cooldown(self) -> float:
+        return min(self.base_cooldown * (2 ** max(self.trips - 1, 0)), self.max_cooldown)
+
+    def retry_after(self) -> float:
+        """Seconds until the next call will be let through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.open_until - time.monotonic(), 0.0)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "cooldown_seconds": self.current_cooldown if self.trips else 0.0,
+            "retry_after_seconds": round(self.retry_after(), 2),
+            "rejected_calls": self.rejected,
+            "last_error": self.last_error
+        }
+
+
+def is_breaker_failure(response: Dict[str, Any]) -> bool:
+    """Whether a failed service response should count against its circuit"""
+    if response.get("success") or response.get("rate_limited"):
+        return False
+    return response.get("upstream_status") not in CLIENT_ERROR_STATUSES
+
+
+def guarded_stream(breaker: CircuitBreaker,
+                   stream: Generator[Detection, None, Dict[str, Any]]) -> Generator[Detection, None, Dict[str, Any]]:
+    """Pass a detection stream through, reporting its outcome to the breaker"""
+    recorded = False
+    try:
+        while True:
+            try:
+                detection = next(stream)
+            except StopIteration as stop:
+                response = stop.value
+                break
+            yield detection
+
+        if response.get("rate_limited"):
+            # A local shed says nothing about the platform either way
+            breaker.release()
+        elif is_breaker_failure(response):
+            breaker.record_failure(response.get("error") or response.get("message"))
+        else:
+            breaker.record_success()
+        recorded = True
+        return response
+
+    except Exception as e:
+        if shed_locally(e):
+            breaker.release()
+        else:
+            breaker.record_failure(e)
+        recorded = True
+        raise
+
+    finally:
+        if not recorded:
+            breaker.release()
@@ -0,0 +1,134 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Generator, List, Tuple
+
+from services.models import Detection
+from utils.logger import setup_logger
+
+logger = setup_logger("scan_fanout")
+
+
+def fan_out_stream(service, targets: List[Tuple[str, Dict[str, Any]]],
+                   max_concurrency: int = 4) -> Generator[Detection, None, Dict[str, Any]]:
+    """
+    Scan several targets of one service concurrently
+
+    Each target runs ``service.stream_data(**kwargs)`` on a bounded worker
+    pool. Detections are yielded as soon as any target produces them,
+    de-duplicated by ``Detection.key``, and the merged response carries per-target
+    stats under ``data["targets"]``.
+
+    Args:
+        service: BaseService instance
+        targets: (label, stream_data kwargs) pairs
+        max_concurrency (int): Upper bound on concurrent upstream scans;
+            1 for services that are not ``thread_safe``
+    """
+    if not service.thread_safe:
+        max_concurrency = 1
+
+    events = queue.Queue(maxsize=256)
+    cancelled = threading.Event()
+
+    def run_target(label, kwargs):
+        started = time.perf_counter()
+        stream = service.stream_data(**kwargs)
+        try:
+            while not cancelled.is_set():
+                try:
+                    detection = next(stream)
+                except StopIteration as stop:
+                    response = stop.value
+                    break
+                _put(("detection", label, detection))
+            else:
+                stream.close()
+                return
+        except Exception as e:
+            response = service.format_response({"detections": []}, success=False, error=e,
+                                               message=f"Error scanning {label}: {e}")
+        _put(("done", label, (response, time.perf_counter() - started)))
+
+    def _put(event):
+        while not cancelled.is_set():
+            try:
+                events.put(event, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    started_at = datetime.utcnow().isoformat()
+    seen = set()
+    duplicates = 0
+    per_target = {}
+    scanned_totals = {}
+    errors = []
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(targets))),
+                                  thread_name_prefix=f"{service.service_name.lower()}-fanout")
+    try:
+        for label, kwargs in targets:
+            # Workers inherit the request/scan ids used for log correlation
+            executor.submit(contextvars.copy_context().run, run_target, label, kwargs)
+
+        pending = len(targets)
+        while pending:
+            kind, label, payload = events.get()
+
+            if kind == "detection":
+                key = payload.key
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                payload.target = label
+                yield payload
+                continue
+
+            pending -= 1
+            response, duration = payload
+            data = response.get("data", {})
+            stats = {key: value for key, value in data.items() if key not in ("detections", "source_info")}
+            stats.update({
+                "success": response.get("success"),
+                "error": response.get("error"),
+                "duration_ms": round(duration * 1000, 2)
+            })
+            per_target[label] = stats
+
+            for key, value in data.items():
+                if key.endswith("_scanned") or key == "repeats_skipped":
+                    scanned_totals[key] = scanned_totals.get(key, 0) + value
+            if not response.get("success"):
+                errors.append(f"{label}: {response.get('error') or response.get('message')}")
+
+    finally:
+        cancelled.set()
+        executor.shutdown(wait=False)
+
+    succeeded = sum(1 for stats in per_target.values() if stats["success"])
+    results = {
+        **scanned_totals,
+        "threats_found": len(seen),
+        "duplicates_removed": duplicates,
+        "detections": [],
+        "targets": per_target,
+        "source_info": {
+            "platform": service.service_name,
+            "targets": [label for label, _ in targets],
+            "scan_time": started_at,
+            "max_concurrency": max_concurrency,
+            "focus": "women_harassment_abuse"
+        }
+    }
+
+    message = (f"Multi-target {service.service_name} scan completed: {succeeded}/{len(targets)} targets, "
+               f"{len(seen)} unique harassment/abuse cases found")
+    logger.info(message)
+
+    return service.format_response(results, success=succeeded > 0, message=message,
+                                   error="; ".join(errors) if errors else None)
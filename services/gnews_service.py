@@ -1,9 +1,14 @@
 import requests
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Generator
 from services.base_service import BaseService
+from services.models import Detection
 from services.threat_detector import ThreatDetector
 from config.settings import Config
+from utils.logger import PER_ITEM
+from utils.projection import current_projection
+from utils.rate_limiter import RateLimited, rate_limited_session
+from utils.seen_filter import canonical_url
 
 class GNewsService(BaseService):
     def __init__(self):
@@ -15,8 +20,11 @@ class GNewsService(BaseService):
         if not self.api_key:
             raise ValueError("GNEWS_API_KEY not configured")
 
-    def fetch_data(self, query: str = None, max_articles: int = 20) -> Dict[str, Any]:
-        """Fetch fresh GNews data for women harassment/abuse detection"""
+        # Paced by the shared rate limiter; also reuses connections between scans
+        self.session = rate_limited_session("gnews", self.api_key)
+
+    def stream_data(self, query: str = None, max_articles: int = 20) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh GNews women harassment/abuse detections as they are produced"""
         if not query:
             query = "women harassment OR women abuse OR sexual harassment OR gender violence OR domestic violence"
 
@@ -24,6 +32,7 @@ class GNewsService(BaseService):
             "query": query,
             "articles_scanned": 0,
             "threats_found": 0,
+            "repeats_skipped": 0,
             "detections": [],
             "source_info": {
                 "platform": "GNews",
@@ -34,7 +43,8 @@ class GNewsService(BaseService):
         }
 
         try:
-            self.logger.info(f"Fetching fresh GNews articles for women harassment/abuse (max: {max_articles})")
+            fields = current_projection()
+            self.logger.info("Fetching fresh GNews articles for women harassment/abuse (max: %s)", max_articles)
 
             # Get articles from last 7 days for freshness
             from_date = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -48,8 +58,9 @@ class GNewsService(BaseService):
                 "from": from_date
             }
 
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
+            with self.upstream_call("search"):
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
 
             data = response.json()
 
@@ -66,6 +77,12 @@ class GNewsService(BaseService):
                 try:
                     results["articles_scanned"] += 1
 
+                    # Articles an earlier scan already fetched are not analyzed again
+                    repeat = self.seen_before("news_article", canonical_url(article.get("url", "")))
+                    if repeat and self.skip_repeats:
+                        results["repeats_skipped"] += 1
+                        continue
+
                     # Analyze article content for women harassment/abuse
                     title = article.get("title", "")
                     description = article.get("description", "")
@@ -81,25 +98,30 @@ class GNewsService(BaseService):
 
                         source_info = article.get("source", {})
 
-                        results["detections"].append({
-                            "type": "news_article",
-                            "title": title,
-                            "description": description,
-                            "url": article.get("url", ""),
-                            "source_name": source_info.get("name", "Unknown Source"),
-                            "source_url": source_info.get("url", ""),
-                            "author": "GNews Source",
-                            "published_at": article.get("publishedAt", ""),
-                            "image_url": article.get("image", ""),
-                            "confidence": analysis["confidence"],
-                            "keywords_found": analysis["keywords_found"],
-                            "category": analysis["category"],
-                            "content_preview": analysis["text_preview"],
-                            "is_fresh_data": True
-                        })
+                        detection = Detection.from_analysis(
+                            "news_article", "gnews", analysis,
+                            url=article.get("url", ""),
+                            author="GNews Source",
+                            title=title,
+                            created_at=article.get("publishedAt", ""),
+                            extras={
+                                "source_name": source_info.get("name", "Unknown Source"),
+                                "source_url": source_info.get("url", ""),
+                                "image_url": article.get("image", "")
+                            }
+                        )
+                        # Long text fields are only built when requested (?fields=)
+                        if fields.wants("description"):
+                            detection.set_extra("description", description)
+                        if fields.wants("content", "content_preview"):
+                            detection.content = analysis["text_preview"]
+                        if repeat:
+                            detection.mark_repeat()
+
+                        yield detection
 
                 except Exception as article_error:
-                    self.logger.warning(f"Error processing GNews article: {article_error}")
+                    self.logger.warning("Error processing GNews article: %s", article_error, extra=PER_ITEM)
                     continue
 
             message = f"Fresh GNews scan completed: {results['articles_scanned']} articles, {results['threats_found']} harassment/abuse cases found"
@@ -118,6 +140,11 @@ class GNewsService(BaseService):
             self.logger.error(error_msg)
             return self.format_response(results, success=False, error=e, message=error_msg)
 
+        except RateLimited as e:
+            error_msg = f"GNews request budget used up; retry in {e.retry_after:.0f}s"
+            self.logger.warning(error_msg)
+            return self.format_response(results, success=False, error=e, message=error_msg)
+
         except Exception as e:
             error_msg = f"Error fetching fresh GNews data: {e}"
             self.logger.error(error_msg)
@@ -0,0 +1,126 @@
+from typing import Any, Dict, Optional
+
+from utils.projection import FieldProjection, current_projection
+
+# Per platform/type: unified field -> the key older clients read it from,
+# plus constant keys every record of that shape carried
+SHAPES = {
+    ("reddit", "post"): {
+        "aliases": {"url": "post_url", "created_at": "created_utc"},
+        "constants": {}
+    },
+    ("reddit", "comment"): {
+        "aliases": {"url": "comment_url", "created_at": "created_utc", "title": "post_title"},
+        "constants": {}
+    },
+    ("twitter", "tweet"): {
+        "aliases": {"id": "tweet_id", "url": "tweet_url", "author": "username"},
+        "constants": {"is_fresh_data": True}
+    },
+    ("youtube", "video"): {
+        "aliases": {"id": "video_id", "url": "video_url", "author": "channel_title",
+                    "created_at": "published_at", "content": "description"},
+        "constants": {"is_fresh_data": True}
+    },
+    ("youtube", "comment"): {
+        "aliases": {"id": "comment_id", "url": "video_url", "title": "video_title",
+                    "created_at": "published_at", "content": "comment_text"},
+        "constants": {"is_fresh_data": True}
+    },
+    ("gnews", "news_article"): {
+        "aliases": {"created_at": "published_at", "content": "content_preview"},
+        "constants": {"is_fresh_data": True}
+    },
+    ("newsapi", "news_article"): {
+        "aliases": {"created_at": "published_at", "content": "content_preview"},
+        "constants": {"is_fresh_data": True}
+    }
+}
+NO_SHAPE = {"aliases": {}, "constants": {}}
+
+
+class Detection:
+    """
+    One flagged item, in the same shape for every service
+
+    Common fields live in fixed slots; platform-specific values (scores,
+    thumbnails, channel ids, ...) go in ``extras``. Records stay objects
+    through streaming, de-duplication and buffering and only become dicts
+    in ``to_dict`` at the serialization edge. By default each value goes out
+    once, under the legacy key older clients read (post_url, tweet_url,
+    published_at, ...) where the platform had one; the unified names are
+    opt-in through ``?fields=`` (e.g. ``fields=summary`` or ``fields=url``).
+    """
+
+    __slots__ = ("type", "platform", "id", "url", "author", "title", "content", "created_at",
+                 "confidence", "keywords_found", "category", "target", "extras")
+
+    COMMON_FIELDS = __slots__[:-1]
+
+    def __init__(self, type: str, platform: str, id: str = None, url: str = None,
+                 author: str = None, title: str = None, content: str = None,
+                 created_at: str = None, confidence: float = 0.0, keywords_found=None,
+                 category: str = None, extras: Optional[Dict[str, Any]] = None):
+        self.type = type
+        self.platform = platform
+        self.id = id
+        self.url = url
+        self.author = author
+        self.title = title
+        self.content = content
+        self.created_at = created_at
+        self.confidence = confidence
+        self.keywords_found = keywords_found
+        self.category = category
+        self.target = None
+        self.extras = extras or None
+
+    @classmethod
+    def from_analysis(cls, type: str, platform: str, analysis: Dict[str, Any], **values) -> "Detection":
+        """Record for a detector result; confidence, keywords and category come from ``analysis``"""
+        return cls(type, platform, confidence=analysis["confidence"],
+                   keywords_found=analysis["keywords_found"], category=analysis["category"], **values)
+
+    def set_extra(self, key: str, value: Any):
+        if self.extras is None:
+            self.extras = {}
+        self.extras[key] = value
+
+    def mark_repeat(self):
+        """Flag an item an earlier scan already reported (?repeats=flag)"""
+        self.set_extra("repeat", True)
+        self.set_extra("is_fresh_data", False)
+
+    @property
+    def key(self) -> str:
+        """Stable identity, used to merge overlapping scans"""
+        return f"{self.platform}:{self.type}:{self.id or self.url or self.content or self.title}"
+
+    def to_dict(self, fields: FieldProjection = None) -> Dict[str, Any]:
+        """JSON-ready dict, limited to the request's ?fields= projection"""
+        fields = fields or current_projection()
+        shape = SHAPES.get((self.platform, self.type), NO_SHAPE)
+
+        result = {}
+        aliases = shape["aliases"]
+        for name in self.COMMON_FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            alias = aliases.get(name)
+            if fields.is_full:
+                result[alias or name] = value
+                continue
+            if fields.wants(name):
+                result[name] = value
+            if alias and fields.wants(alias):
+                result[alias] = value
+
+        for source in (shape["constants"], self.extras or {}):
+            for name, value in source.items():
+                if fields.wants(name):
+                    result[name] = value
+        return result
+
+    def __repr__(self):
+        return f"Detection({self.platform}/{self.type} {self.id or self.url})"
@@ -1,9 +1,14 @@
 import requests
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Generator
 from services.base_service import BaseService
+from services.models import Detection
 from services.threat_detector import ThreatDetector
 from config.settings import Config
+from utils.logger import PER_ITEM
+from utils.projection import current_projection
+from utils.rate_limiter import RateLimited, rate_limited_session
+from utils.seen_filter import canonical_url
 
 class NewsAPIService(BaseService):
     def __init__(self):
@@ -15,8 +20,11 @@ class NewsAPIService(BaseService):
         if not self.api_key:
             raise ValueError("NEWSAPI_KEY not configured")
 
-    def fetch_data(self, query: str = None, max_articles: int = 20) -> Dict[str, Any]:
-        """Fetch fresh NewsAPI data for women harassment/abuse detection"""
+        # Paced by the shared rate limiter; also reuses connections between scans
+        self.session = rate_limited_session("newsapi", self.api_key)
+
+    def stream_data(self, query: str = None, max_articles: int = 20) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh NewsAPI women harassment/abuse detections as they are produced"""
         if not query:
             query = "women harassment OR women abuse OR sexual harassment OR gender violence OR domestic violence"
 
@@ -24,6 +32,7 @@ class NewsAPIService(BaseService):
             "query": query,
             "articles_scanned": 0,
             "threats_found": 0,
+            "repeats_skipped": 0,
             "detections": [],
             "source_info": {
                 "platform": "NewsAPI",
@@ -34,7 +43,8 @@ class NewsAPIService(BaseService):
         }
 
         try:
-            self.logger.info(f"Fetching fresh NewsAPI articles for women harassment/abuse (max: {max_articles})")
+            fields = current_projection()
+            self.logger.info("Fetching fresh NewsAPI articles for women harassment/abuse (max: %s)", max_articles)
 
             # Get articles from last 7 days for freshness
             from_date = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d')
@@ -48,8 +58,9 @@ class NewsAPIService(BaseService):
                 "apiKey": self.api_key
             }
 
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
+            with self.upstream_call("everything"):
+                response = self.session.get(self.base_url, params=params, timeout=30)
+                response.raise_for_status()
 
             data = response.json()
 
@@ -62,6 +73,12 @@ class NewsAPIService(BaseService):
                 try:
                     results["articles_scanned"] += 1
 
+                    # Articles an earlier scan already fetched are not analyzed again
+                    repeat = self.seen_before("news_article", canonical_url(article.get("url", "")))
+                    if repeat and self.skip_repeats:
+                        results["repeats_skipped"] += 1
+                        continue
+
                     # Analyze article content for women harassment/abuse
                     title = article.get("title", "") or ""
                     description = article.get("description", "") or ""
@@ -79,25 +96,30 @@ class NewsAPIService(BaseService):
 
                         source_info = article.get("source", {})
 
-                        results["detections"].append({
-                            "type": "news_article",
-                            "title": title,
-                            "description": description,
-                            "author": article.get("author", "Unknown Author"),
-                            "url": article.get("url", ""),
-                            "source_name": source_info.get("name", "Unknown"),
-                            "source_id": source_info.get("id", ""),
-                            "published_at": article.get("publishedAt", ""),
-                            "url_to_image": article.get("urlToImage", ""),
-                            "confidence": analysis["confidence"],
-                            "keywords_found": analysis["keywords_found"],
-                            "category": analysis["category"],
-                            "content_preview": analysis["text_preview"],
-                            "is_fresh_data": True
-                        })
+                        detection = Detection.from_analysis(
+                            "news_article", "newsapi", analysis,
+                            url=article.get("url", ""),
+                            author=article.get("author", "Unknown Author"),
+                            title=title,
+                            created_at=article.get("publishedAt", ""),
+                            extras={
+                                "source_name": source_info.get("name", "Unknown"),
+                                "source_id": source_info.get("id", ""),
+                                "url_to_image": article.get("urlToImage", "")
+                            }
+                        )
+                        # Long text fields are only built when requested (?fields=)
+                        if fields.wants("description"):
+                            detection.set_extra("description", description)
+                        if fields.wants("content", "content_preview"):
+                            detection.content = analysis["text_preview"]
+                        if repeat:
+                            detection.mark_repeat()
+
+                        yield detection
 
                 except Exception as article_error:
-                    self.logger.warning(f"Error processing NewsAPI article: {article_error}")
+                    self.logger.warning("Error processing NewsAPI article: %s", article_error, extra=PER_ITEM)
                     continue
 
             message = f"Fresh NewsAPI scan completed: {results['articles_scanned']} articles, {results['threats_found']} harassment/abuse cases found"
@@ -116,6 +138,11 @@ class NewsAPIService(BaseService):
             self.logger.error(error_msg)
             return self.format_response(results, success=False, error=e, message=error_msg)
 
+        except RateLimited as e:
+            error_msg = f"NewsAPI request budget used up; retry in {e.retry_after:.0f}s"
+            self.logger.warning(error_msg)
+            return self.format_response(results, success=False, error=e, message=error_msg)
+
         except Exception as e:
             error_msg = f"Error fetching fresh NewsAPI data: {e}"
             self.logger.error(error_msg)
@@ -1,26 +1,38 @@
 import praw
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Generator
 from services.base_service import BaseService
+from services.models import Detection
 from services.threat_detector import ThreatDetector
 from config.settings import Config
+from utils.logger import PER_ITEM
+from utils.projection import FULL, FieldProjection, current_projection
+from utils.rate_limiter import rate_limited_session
+from utils import profiling
 
 class RedditService(BaseService):
+    # One praw.Reddit instance is not safe to share between threads
+    thread_safe = False
+
     def __init__(self):
         super().__init__("Reddit")
         self.detector = ThreatDetector()
         self.reddit = None
+        self.session = None
         self._connect()
 
     def _connect(self):
         """Connect to Reddit API with error handling"""
         try:
+            self.session = rate_limited_session("reddit", Config.REDDIT_CLIENT_ID)
             self.reddit = praw.Reddit(
                 client_id=Config.REDDIT_CLIENT_ID,
                 client_secret=Config.REDDIT_CLIENT_SECRET,
                 username=Config.REDDIT_USERNAME,
                 password=Config.REDDIT_PASSWORD,
-                user_agent="WomenHarassmentMonitor/2.0"
+                user_agent="WomenHarassmentMonitor/2.0",
+                # Shared with the stream ingestor and other workers through the rate limiter
+                requestor_kwargs={"session": self.session}
             )
             # Test connection
             self.reddit.user.me()
@@ -29,12 +41,40 @@ class RedditService(BaseService):
             self.logger.error(f"Failed to connect to Reddit: {e}")
             raise ConnectionError(f"Reddit API connection failed: {e}")
 
-    def fetch_data(self, subreddit_name: str = "TwoXChromosomes", limit: int = 10) -> Dict[str, Any]:
-        """Fetch fresh Reddit data for women harassment/abuse detection"""
+    def post_detection(self, post, analysis: Dict[str, Any], fields: FieldProjection = FULL) -> Detection:
+        """Build the detection record for a flagged submission"""
+        return Detection.from_analysis(
+            "post", "reddit", analysis,
+            id=post.id,
+            url=f"https://reddit.com{post.permalink}",
+            author=str(post.author) if post.author else "[deleted]",
+            title=post.title,
+            content=analysis["text_preview"] if fields.wants("content") else None,
+            created_at=datetime.fromtimestamp(post.created_utc).isoformat(),
+            extras={"score": post.score, "num_comments": post.num_comments}
+        )
+
+    def comment_detection(self, comment, analysis: Dict[str, Any], post_title: str,
+                          fields: FieldProjection = FULL) -> Detection:
+        """Build the detection record for a flagged comment"""
+        return Detection.from_analysis(
+            "comment", "reddit", analysis,
+            id=comment.id,
+            url=f"https://reddit.com{comment.permalink}",
+            author=str(comment.author) if comment.author else "[deleted]",
+            title=post_title,
+            content=analysis["text_preview"] if fields.wants("content") else None,
+            created_at=datetime.fromtimestamp(comment.created_utc).isoformat(),
+            extras={"score": comment.score}
+        )
+
+    def stream_data(self, subreddit_name: str = "TwoXChromosomes", limit: int = 10) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh Reddit women harassment/abuse detections as they are produced"""
         results = {
             "subreddit": subreddit_name,
             "posts_scanned": 0,
             "threats_found": 0,
+            "repeats_skipped": 0,
             "detections": [],
             "source_info": {
                 "platform": "Reddit",
@@ -49,59 +89,51 @@ class RedditService(BaseService):
                 raise ConnectionError("Reddit client not initialized")
 
             subreddit = self.reddit.subreddit(subreddit_name)
-            self.logger.info(f"Fetching fresh data from r/{subreddit_name} (limit: {limit})")
+            fields = current_projection()
+            self.logger.info("Fetching fresh data from r/%s (limit: %s)", subreddit_name, limit)
 
             # Get fresh posts using 'new' to ensure latest content
-            for post in subreddit.new(limit=limit):
+            for post in self.upstream_pages("new", subreddit.new(limit=limit)):
                 try:
                     results["posts_scanned"] += 1
 
-                    # Analyze post content
+                    # Analyze post content, unless an earlier scan already did
                     content = f"{post.title} {post.selftext or ''}".strip()
-                    if content:
+                    repeat = self.seen_before("post", post.id)
+                    if repeat and self.skip_repeats:
+                        results["repeats_skipped"] += 1
+                    elif content:
                         analysis = self.detector.analyze(content)
 
                         if analysis["is_threat"]:
                             results["threats_found"] += 1
-                            results["detections"].append({
-                                "type": "post",
-                                "title": post.title,
-                                "author": str(post.author) if post.author else "[deleted]",
-                                "content": analysis["text_preview"],
-                                "post_url": f"https://reddit.com{post.permalink}",
-                                "confidence": analysis["confidence"],
-                                "keywords_found": analysis["keywords_found"],
-                                "created_utc": datetime.fromtimestamp(post.created_utc).isoformat(),
-                                "score": post.score,
-                                "num_comments": post.num_comments,
-                                "category": analysis["category"]
-                            })
+                            detection = self.post_detection(post, analysis, fields)
+                            if repeat:
+                                detection.mark_repeat()
+                            yield detection
 
                     # Analyze fresh comments
                     try:
-                        post.comments.replace_more(limit=0)
+                        with self.upstream_call("comments", stage=profiling.ENRICH):
+                            post.comments.replace_more(limit=0)
                         for comment in post.comments.list()[:5]:
                             if hasattr(comment, 'body') and comment.body and comment.body != '[deleted]':
+                                repeat = self.seen_before("comment", comment.id)
+                                if repeat and self.skip_repeats:
+                                    results["repeats_skipped"] += 1
+                                    continue
                                 analysis = self.detector.analyze(comment.body)
                                 if analysis["is_threat"]:
                                     results["threats_found"] += 1
-                                    results["detections"].append({
-                                        "type": "comment",
-                                        "post_title": post.title,
-                                        "author": str(comment.author) if comment.author else "[deleted]",
-                                        "content": analysis["text_preview"],
-                                        "comment_url": f"https://reddit.com{comment.permalink}",
-                                        "confidence": analysis["confidence"],
-                                        "keywords_found": analysis["keywords_found"],
-                                        "created_utc": datetime.fromtimestamp(comment.created_utc).isoformat(),
-                                        "score": comment.score,
-                                        "category": analysis["category"]
-                                    })
+                                    detection = self.comment_detection(comment, analysis, post.title, fields)
+                                    if repeat:
+                                        detection.mark_repeat()
+                                    yield detection
                     except Exception as comment_error:
-                        self.logger.warning(f"Error processing comments: {comment_error}")
+                        self.logger.warning("Error processing comments: %s", comment_error, extra=PER_ITEM)
 
                 except Exception as post_error:
-                    self.logger.warning(f"Error processing post: {post_error}")
+                    self.logger.warning("Error processing post: %s", post_error, extra=PER_ITEM)
                     continue
 
             message = f"Fresh Reddit scan completed: {results['posts_scanned']} posts, {results['threats_found']} harassment/abuse cases found"
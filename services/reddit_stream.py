@@ -0,0 +1,298 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config.settings import Config
+from services.circuit_breaker import CircuitBreaker
+from services.models import Detection
+from utils.coordination import ShardLeaser
+from utils.logger import PER_ITEM, setup_logger
+from utils.rate_limiter import shed_locally
+from utils.upstream_cache import REFRESH, cache_mode_var
+
+
+class RedditStreamIngestor:
+    """
+    Continuous Reddit ingestion over a combined multireddit (a+b+c)
+
+    One submission stream and one comment stream cover every configured
+    subreddit. Items are buffered and handed to the detector in batches,
+    and the connection is re-established with exponential backoff when
+    Reddit drops it.
+
+    With a ShardLeaser (utils.coordination) the ingestor only streams the
+    subreddits whose shards this process holds, and reconnects with the new
+    set whenever the shards are rebalanced between processes.
+
+    With the Reddit service's CircuitBreaker, each connection reports its
+    outcome: the first successful poll as a success, an interruption as a
+    failure. That settles a half-open probe taken to fetch the service.
+    """
+
+    IDLE_MAX_DELAY = 16.0
+    SEEN_IDS_LIMIT = 10000
+
+    def __init__(self, reddit_service, subreddits: List[str],
+                 batch_size: int = None, flush_seconds: float = None,
+                 max_backoff: float = None, max_recent: int = None,
+                 on_detections: Optional[Callable[[List[Detection]], None]] = None,
+                 shards: Optional[ShardLeaser] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.service = reddit_service
+        self.breaker = breaker
+        self.subreddits = [name.strip() for name in subreddits if name.strip()]
+        self.shards = shards
+        self.batch_size = batch_size or Config.REDDIT_STREAM_BATCH_SIZE
+        self.flush_seconds = flush_seconds or Config.REDDIT_STREAM_FLUSH_SECONDS
+        self.max_backoff = max_backoff or Config.REDDIT_STREAM_MAX_BACKOFF
+        self.on_detections = on_detections
+        self.logger = setup_logger("reddit_stream")
+
+        if not self.subreddits:
+            raise ValueError("At least one subreddit is required for stream mode")
+
+        self.recent_detections = deque(maxlen=max_recent or Config.REDDIT_STREAM_RECENT_DETECTIONS)
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._seen_ids = set()
+        self._seen_order = deque()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.counters = {
+            "submissions_seen": 0,
+            "comments_seen": 0,
+            "items_analyzed": 0,
+            "threats_found": 0,
+            "repeats_skipped": 0,
+            "batches": 0,
+            "reconnects": 0,
+            "errors": 0
+        }
+        self.started_at = None
+        self.last_item_at = None
+        self.last_error = None
+
+    @property
+    def active_subreddits(self) -> List[str]:
+        """The configured subreddits this process is responsible for"""
+        if self.shards is None:
+            return self.subreddits
+        return self.shards.owned_targets(self.subreddits)
+
+    @property
+    def multireddit(self) -> str:
+        return "+".join(self.active_subreddits)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the ingestion thread"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self.started_at = time.time()
+        if self.shards is not None:
+            self.shards.start()
+        self._thread = threading.Thread(target=self._run, name="reddit-stream", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Reddit stream started for r/{self.multireddit}")
+
+    def stop(self, timeout: float = 10.0):
+        """Signal the ingestion thread to stop and wait for it"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self.shards is not None:
+            self.shards.stop()
+        self.logger.info(f"Reddit stream stopped for r/{self.multireddit}")
+
+    def status(self) -> Dict[str, Any]:
+        """Current state and throughput counters"""
+        with self._lock:
+            counters = dict(self.counters)
+
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        items_seen = counters["submissions_seen"] + counters["comments_seen"]
+        return {
+            "running": self.running,
+            "multireddit": f"r/{self.multireddit}",
+            "subreddits": self.active_subreddits,
+            "configured_subreddits": self.subreddits,
+            "shards": self.shards.status() if self.shards is not None else None,
+            "batch_size": self.batch_size,
+            "counters": counters,
+            "uptime_seconds": round(uptime, 2),
+            "items_per_second": round(items_seen / uptime, 3) if uptime else 0.0,
+            "buffered_items": len(self._buffer),
+            "last_item_at": datetime.utcfromtimestamp(self.last_item_at).isoformat() if self.last_item_at else None,
+            "last_error": self.last_error
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Entries held by the ingestor's in-memory buffers"""
+        return {
+            "recent_detections": len(self.recent_detections),
+            "seen_ids": len(self._seen_ids),
+            "buffered_items": len(self._buffer)
+        }
+
+    def _run(self):
+        # Polls must see new submissions, not a listing cached by an earlier scan
+        cache_mode_var.set(REFRESH)
+        backoff = 1.0
+        first_connection = True
+
+        while not self._stop_event.is_set():
+            generation = self.shards.generation if self.shards is not None else 0
+            subreddits = self.active_subreddits
+            if not subreddits:
+                # Every shard with one of our subreddits is leased elsewhere
+                self._flush()
+                self._stop_event.wait(self.shards.heartbeat_seconds)
+                first_connection = False
+                continue
+
+            try:
+                self._consume("+".join(subreddits), generation, skip_existing=first_connection)
+            except Exception as e:
+                with self._lock:
+                    self.counters["errors"] += 1
+                    self.counters["reconnects"] += 1
+                self.last_error = str(e)
+                if self.breaker is not None:
+                    if shed_locally(e):
+                        self.breaker.release()
+                    else:
+                        self.breaker.record_failure(e)
+                self.logger.warning("Reddit stream interrupted: %s; reconnecting in %.0fs", e, backoff)
+                self._flush()
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            else:
+                backoff = 1.0
+            # After an outage or a rebalance the streams restart without
+            # skip_existing so the gap (or what the shard's previous holder
+            # missed) is backfilled; already-seen ids are dropped in _accept.
+            first_connection = False
+
+        self._flush()
+        if self.breaker is not None:
+            # Stopped before the connection reported either way
+            self.breaker.release()
+
+    def _rebalanced(self, generation: int) -> bool:
+        return self.shards is not None and self.shards.generation != generation
+
+    def _consume(self, multireddit_name: str, generation: int, skip_existing: bool):
+        if not self.service.reddit:
+            raise ConnectionError("Reddit client not initialized")
+
+        multireddit = self.service.reddit.subreddit(multireddit_name)
+        submissions = multireddit.stream.submissions(skip_existing=skip_existing, pause_after=-1)
+        comments = multireddit.stream.comments(skip_existing=skip_existing, pause_after=-1)
+        idle_delay = 1.0
+        reported = self.breaker is None
+
+        while not self._stop_event.is_set() and not self._rebalanced(generation):
+            received = 0
+
+            for submission in submissions:
+                if submission is None or self._stop_event.is_set():
+                    break
+                received += self._accept("post", submission)
+
+            for comment in comments:
+                if comment is None or self._stop_event.is_set():
+                    break
+                received += self._accept("comment", comment)
+
+            if not reported:
+                # Both listings answered: the connection is up
+                self.breaker.record_success()
+                reported = True
+
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush()
+
+            if received:
+                idle_delay = 1.0
+            else:
+                self._stop_event.wait(idle_delay)
+                idle_delay = min(idle_delay * 2, self.IDLE_MAX_DELAY)
+
+    def _accept(self, kind: str, item) -> int:
+        if item.id in self._seen_ids:
+            return 0
+
+        self._seen_ids.add(item.id)
+        self._seen_order.append(item.id)
+        if len(self._seen_order) > self.SEEN_IDS_LIMIT:
+            self._seen_ids.discard(self._seen_order.popleft())
+
+        with self._lock:
+            self.counters["submissions_seen" if kind == "post" else "comments_seen"] += 1
+        self.last_item_at = time.time()
+        self._buffer.append((kind, item))
+
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+        return 1
+
+    def _flush(self):
+        """Hand the buffered batch to the detector"""
+        batch, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if not batch:
+            return
+
+        detections = []
+        skipped = 0
+        for kind, item in batch:
+            try:
+                # Items a scan (or an earlier run of the stream) already fetched
+                repeat = self.service.seen_before(kind, item.id)
+                if repeat and self.service.skip_repeats:
+                    skipped += 1
+                    continue
+
+                if kind == "post":
+                    content = f"{item.title} {item.selftext or ''}".strip()
+                else:
+                    content = item.body if item.body != "[deleted]" else ""
+                if not content:
+                    continue
+
+                analysis = self.service.detector.analyze(content)
+                if not analysis["is_threat"]:
+                    continue
+
+                if kind == "post":
+                    detection = self.service.post_detection(item, analysis)
+                else:
+                    detection = self.service.comment_detection(item, analysis, getattr(item, "link_title", ""))
+                detection.set_extra("subreddit", str(item.subreddit))
+                if repeat:
+                    detection.mark_repeat()
+                detections.append(detection)
+
+            except Exception as item_error:
+                self.logger.warning("Error processing streamed %s: %s", kind, item_error, extra=PER_ITEM)
+
+        with self._lock:
+            self.counters["items_analyzed"] += len(batch) - skipped
+            self.counters["repeats_skipped"] += skipped
+            self.counters["threats_found"] += len(detections)
+            self.counters["batches"] += 1
+
+        self.recent_detections.extend(detections)
+        if detections and self.on_detections:
+            try:
+                self.on_detections(detections)
+            except Exception as callback_error:
+                self.logger.warning("Stream detection handler failed: %s", callback_error)
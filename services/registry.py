@@ -0,0 +1,185 @@
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Union
+
+from services.circuit_breaker import CircuitBreaker
+from utils.logger import setup_logger
+
+
+class ServiceRegistry:
+    """
+    Thread-safe holder for the platform service clients
+
+    Each service is built at most once; concurrent callers for the same
+    service wait on a per-service lock instead of constructing a second
+    client. ``warm_up`` builds every service in parallel so requests never
+    pay client-construction latency.
+
+    Each service also has a circuit breaker. A failed construction opens it
+    immediately, so lookups return None without retrying the connection
+    until the cool-down has elapsed.
+    """
+
+    def __init__(self, factories: Dict[str, Union[str, Callable[[], Any]]]):
+        """
+        Args:
+            factories: service name -> callable returning the instance, or a
+                "module:attribute" path imported only when the service is built
+                so unused platform SDKs are never loaded
+        """
+        self.logger = setup_logger("service_registry")
+        self._factories = dict(factories)
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self._breakers = {name: CircuitBreaker(name) for name in self._factories}
+        self._instances = {}
+        self._errors = {}
+        self._init_durations = {}
+        self._import_durations = {}
+        self._warm_up_thread = None
+        self._warm_up_started = None
+        self._warm_up_finished = None
+
+    @property
+    def names(self):
+        return list(self._factories)
+
+    @property
+    def instances(self) -> Dict[str, Any]:
+        return dict(self._instances)
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        return self._breakers[name]
+
+    def get(self, name: str):
+        """
+        Return the service instance, building it on first use.
+        None if construction failed or the service's circuit is open.
+        """
+        if name not in self._factories:
+            raise ValueError(f"Unknown service: {name}")
+
+        if not self._breakers[name].allow_request():
+            return None
+
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            # Another thread may have finished construction while we waited
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+            return self._build(name)
+
+    def _resolve(self, name: str) -> Callable[[], Any]:
+        factory = self._factories[name]
+        if not isinstance(factory, str):
+            return factory
+
+        started = time.perf_counter()
+        module_name, _, attribute = factory.partition(":")
+        factory = getattr(importlib.import_module(module_name), attribute)
+        self._import_durations[name] = time.perf_counter() - started
+        self._factories[name] = factory
+        return factory
+
+    def _build(self, name: str):
+        started = time.perf_counter()
+        try:
+            instance = self._resolve(name)()
+        except Exception as e:
+            self._init_durations[name] = time.perf_counter() - started
+            self._errors[name] = str(e)
+            self._breakers[name].record_failure(e, trip=True)
+            self.logger.error(f"❌ Failed to initialize {name}: {e}")
+            return None
+
+        self._init_durations[name] = time.perf_counter() - started
+        self._errors.pop(name, None)
+        self._breakers[name].record_success()
+        self._instances[name] = instance
+        self.logger.info(f"✅ {name.capitalize()} service initialized in {self._init_durations[name] * 1000:.0f} ms")
+        return instance
+
+    def warm_up(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Build every registered service concurrently and wait for all of them"""
+        self._warm_up_started = time.time()
+        self._warm_up_finished = None
+
+        with ThreadPoolExecutor(max_workers=max_workers or len(self._factories) or 1,
+                                thread_name_prefix="service-warmup") as executor:
+            list(executor.map(self.get, self._factories))
+
+        self._warm_up_finished = time.time()
+        ready = sum(1 for name in self._factories if name in self._instances)
+        self.logger.info(f"Service warm-up finished in {self._warm_up_finished - self._warm_up_started:.2f}s "
+                         f"({ready}/{len(self._factories)} ready)")
+        return self.status()
+
+    def start_warm_up(self):
+        """Run warm_up on a background thread so process start is not blocked"""
+        if self._warm_up_thread and self._warm_up_thread.is_alive():
+            return
+        self._warm_up_thread = threading.Thread(target=self.warm_up, name="service-warmup", daemon=True)
+        self._warm_up_thread.start()
+
+    def wait_for_warm_up(self, timeout: Optional[float] = None) -> bool:
+        """Block until a started warm-up has finished; False if it is still running"""
+        thread = self._warm_up_thread
+        if thread is not None:
+            thread.join(timeout)
+        return thread is None or not thread.is_alive()
+
+    def reset_after_fork(self):
+        """
+        Let a forked worker reuse the clients built before the fork: fresh
+        locks, and each service drops the pooled connections it inherited
+        """
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self._warm_up_thread = None
+        for instance in self._instances.values():
+            instance.reset_after_fork()
+
+    @property
+    def warmed_up(self) -> bool:
+        return self._warm_up_finished is not None
+
+    def service_state(self, name: str) -> str:
+        if self._breakers[name].state == CircuitBreaker.OPEN:
+            return "circuit_open"
+        if name in self._instances:
+            return "ready"
+        if self._locks[name].locked():
+            return "initializing"
+        if name in self._errors:
+            return "failed"
+        return "pending"
+
+    def status(self) -> Dict[str, Any]:
+        """Per-service readiness and init durations"""
+        services = {}
+        for name in self._factories:
+            duration = self._init_durations.get(name)
+            import_duration = self._import_durations.get(name)
+            services[name] = {
+                "state": self.service_state(name),
+                "import_ms": round(import_duration * 1000, 2) if import_duration is not None else None,
+                "init_ms": round(duration * 1000, 2) if duration is not None else None,
+                "error": self._errors.get(name),
+                "circuit": self._breakers[name].status()
+            }
+
+        warm_up = None
+        if self._warm_up_started:
+            warm_up = {
+                "started_at": datetime.utcfromtimestamp(self._warm_up_started).isoformat(),
+                "finished": self.warmed_up,
+                "duration_ms": round((self._warm_up_finished - self._warm_up_started) * 1000, 2)
+                if self.warmed_up else None
+            }
+
+        return {"services": services, "warm_up": warm_up}
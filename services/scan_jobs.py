@@ -0,0 +1,456 @@
+"""
+Asynchronous scan jobs.
+
+``POST /api/scans`` puts a scan on a bounded priority queue and answers
+with the job id straight away; a small pool of worker threads runs the
+queued scans, at most SCAN_JOB_WORKERS per process at a time. Detections
+are gathered on the job as they arrive, so ``GET /api/scans/<id>`` shows
+partial results while the scan runs, and a job can be cancelled while
+queued or between two detections.
+
+With SCAN_JOB_BACKEND=sqlite every job's status is also published to a
+SQLite file, so any worker process can report on (and cancel) a job that
+another one is running. Each publish rewrites the small status row and
+appends only the detections gathered since the previous one.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Generator, List, Optional
+
+from config.settings import Config
+from database import ConnectionPool
+from services.models import Detection
+from utils import metrics
+from utils.logger import setup_logger
+from utils.projection import current_projection
+
+logger = setup_logger("scan_jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# A running job's progress is published to the store at most this often
+PUBLISH_SECONDS = 1.0
+
+
+class ScanQueueFull(Exception):
+    """Raised when SCAN_JOB_MAX_QUEUED jobs are already waiting; callers should answer 503"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__("Scan job queue is full")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class ScanJob:
+    """One queued scan: what to scan, its state, and the results gathered so far"""
+
+    def __init__(self, service: str, params: Dict[str, Any], priority: str = "normal",
+                 max_detections: int = 5000):
+        self.id = uuid.uuid4().hex
+        self.service = service
+        self.params = params
+        self.priority = priority
+        self.max_detections = max_detections
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.detections: List[Dict[str, Any]] = []
+        self.threats_found = 0
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.error = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._published = 0.0
+        # Detections already handed to the store
+        self.stored_detections = 0
+        self.publish: Callable[["ScanJob"], None] = lambda job: None
+        self.cancel_requested_elsewhere: Callable[["ScanJob"], bool] = lambda job: False
+
+    @property
+    def finished(self) -> bool:
+        return self.state not in ACTIVE_STATES
+
+    def begin(self) -> bool:
+        """Move from queued to running; False if the job was cancelled meanwhile"""
+        with self._lock:
+            if self.state != QUEUED:
+                return False
+            self.state = RUNNING
+            self.started_at = time.time()
+            return True
+
+    def cancel(self) -> bool:
+        """Ask the job to stop; one still queued is cancelled on the spot (True)"""
+        self._cancel.set()
+        with self._lock:
+            if self.state != QUEUED:
+                return False
+            self.state = CANCELLED
+            return True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def drain(self, name: str, stream: Generator[Detection, None, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Gather a platform's detection stream into the job and keep its final
+        response; returns None if the job was cancelled before it finished
+        """
+        projection = current_projection()
+        self._check_cancelled_elsewhere()
+        while True:
+            if self._cancel.is_set():
+                stream.close()
+                return None
+            try:
+                detection = next(stream)
+            except StopIteration as stop:
+                response = stop.value
+                break
+
+            item = detection.to_dict(projection)
+            with self._lock:
+                self.threats_found += 1
+                if len(self.detections) < self.max_detections:
+                    self.detections.append(item)
+            self._publish_progress()
+
+        self.record(name, response)
+        return response
+
+    def record(self, name: str, response: Dict[str, Any]):
+        """Keep a platform's final response (its detections are already on the job)"""
+        data = {key: value for key, value in (response.get("data") or {}).items() if key != "detections"}
+        with self._lock:
+            self.services[name] = {**response, "data": data}
+
+    def _check_cancelled_elsewhere(self):
+        if not self._cancel.is_set() and self.cancel_requested_elsewhere(self):
+            self._cancel.set()
+
+    def _publish_progress(self):
+        now = time.monotonic()
+        if now - self._published >= PUBLISH_SECONDS:
+            self._published = now
+            self.publish(self)
+            self._check_cancelled_elsewhere()
+
+    def snapshot(self, detections_from: Optional[int] = 0) -> Dict[str, Any]:
+        """JSON-ready status; detections from that offset on (None leaves them out)"""
+        with self._lock:
+            snapshot = {
+                "id": self.id,
+                "service": self.service,
+                "params": self.params,
+                "priority": self.priority,
+                "state": self.state,
+                "created_at": _iso(self.created_at),
+                "started_at": _iso(self.started_at),
+                "finished_at": _iso(self.finished_at),
+                "duration_ms": round((self.finished_at - self.started_at) * 1000, 2)
+                if self.started_at and self.finished_at else None,
+                "cancel_requested": self._cancel.is_set(),
+                "threats_found": self.threats_found,
+                "detections_total": len(self.detections),
+                "detections_truncated": self.threats_found > len(self.detections),
+                "services": dict(self.services),
+                "error": self.error
+            }
+            if detections_from is not None:
+                snapshot["detections"] = self.detections[detections_from:]
+        return snapshot
+
+    def detections_since(self, start: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return self.detections[start:]
+
+
+class LocalJobStore:
+    """Jobs are known only to the process running them"""
+
+    def save(self, snapshot: Dict[str, Any], start: int = 0, detections: List[Dict[str, Any]] = ()):
+        pass
+
+    def load(self, job_id: str, detections_from: Optional[int] = 0) -> Optional[Dict[str, Any]]:
+        return None
+
+    def request_cancel(self, job_id: str) -> bool:
+        return False
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return False
+
+    def purge(self, before: float):
+        pass
+
+
+class SQLiteJobStore:
+    """Job status shared by every process using the same SQLite file"""
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS scan_jobs (
+            id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            snapshot TEXT NOT NULL,
+            cancel INTEGER NOT NULL DEFAULT 0,
+            updated REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS scan_job_detections (
+            job_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            detection TEXT NOT NULL,
+            PRIMARY KEY (job_id, seq)
+        )
+        """
+    )
+    UPSERT_JOB = """
+    INSERT INTO scan_jobs (id, state, snapshot, updated) VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET state = excluded.state, snapshot = excluded.snapshot, updated = excluded.updated
+    """
+    # Concurrent publishes of one job may both carry the same detections
+    INSERT_DETECTION = "INSERT OR IGNORE INTO scan_job_detections (job_id, seq, detection) VALUES (?, ?, ?)"
+    SELECT_DETECTIONS = "SELECT detection FROM scan_job_detections WHERE job_id = ? AND seq >= ? ORDER BY seq"
+    SELECT_SNAPSHOT = "SELECT snapshot, cancel FROM scan_jobs WHERE id = ?"
+    SELECT_CANCEL = "SELECT cancel FROM scan_jobs WHERE id = ?"
+    REQUEST_CANCEL = "UPDATE scan_jobs SET cancel = 1 WHERE id = ? AND state IN ('queued', 'running')"
+    DELETE_FINISHED_DETECTIONS = """
+    DELETE FROM scan_job_detections WHERE job_id IN
+        (SELECT id FROM scan_jobs WHERE updated < ? AND state NOT IN ('queued', 'running'))
+    """
+    DELETE_FINISHED = "DELETE FROM scan_jobs WHERE updated < ? AND state NOT IN ('queued', 'running')"
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.pool = ConnectionPool(path, busy_timeout_ms=busy_timeout_ms)
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._schema_ready and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self.pool.connection()
+        if not self._schema_ready:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._schema_ready = True
+        return conn
+
+    def save(self, snapshot: Dict[str, Any], start: int = 0, detections: List[Dict[str, Any]] = ()):
+        """Status without detections, plus the detections from ``start`` not stored yet"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(self.UPSERT_JOB, (snapshot["id"], snapshot["state"],
+                                           json.dumps(snapshot, default=str), time.time()))
+            conn.executemany(self.INSERT_DETECTION, [(snapshot["id"], start + index, json.dumps(item, default=str))
+                                                     for index, item in enumerate(detections)])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load(self, job_id: str, detections_from: Optional[int] = 0) -> Optional[Dict[str, Any]]:
+        conn = self._connection()
+        row = conn.execute(self.SELECT_SNAPSHOT, (job_id,)).fetchone()
+        if row is None:
+            return None
+        snapshot = json.loads(row[0])
+        snapshot["cancel_requested"] = snapshot["cancel_requested"] or bool(row[1])
+        if detections_from is not None:
+            snapshot["detections"] = [json.loads(item) for (item,) in
+                                      conn.execute(self.SELECT_DETECTIONS, (job_id, detections_from))]
+        return snapshot
+
+    def request_cancel(self, job_id: str) -> bool:
+        return self._connection().execute(self.REQUEST_CANCEL, (job_id,)).rowcount > 0
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._connection().execute(self.SELECT_CANCEL, (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def purge(self, before: float):
+        conn = self._connection()
+        conn.execute(self.DELETE_FINISHED_DETECTIONS, (before,))
+        conn.execute(self.DELETE_FINISHED, (before,))
+
+
+class ScanJobQueue:
+    """
+    Bounded priority queue of scan jobs and the worker threads running them
+
+    ``runner(job)`` does the scanning, handing each platform's detection
+    stream to ``job.drain``; it runs in a fresh context, so context
+    variables it sets stay with the job.
+    """
+
+    def __init__(self, runner: Callable[[ScanJob], None], workers: int = 2, max_queued: int = 50,
+                 result_ttl: float = 3600.0, max_detections: int = 5000, retry_after: int = 5, store=None):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_detections = max_detections
+        self.retry_after = retry_after
+        self.store = store or LocalJobStore()
+        self._reset()
+
+    def _reset(self):
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+        self._queued = 0
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, service: str, params: Dict[str, Any], priority: str = "normal") -> ScanJob:
+        """Queue a scan; raises ScanQueueFull once max_queued jobs are waiting"""
+        job = ScanJob(service, params, priority, self.max_detections)
+        job.publish = self._publish
+        job.cancel_requested_elsewhere = lambda job: self.store.cancel_requested(job.id)
+
+        with self._lock:
+            self._purge()
+            if self._queued >= self.max_queued:
+                raise ScanQueueFull(self.retry_after)
+            self._queued += 1
+            self._jobs[job.id] = job
+            self._ensure_workers()
+        self._publish(job)
+        metrics.SCAN_JOBS_ACTIVE.inc(QUEUED)
+        self._queue.put((PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._sequence), job))
+        logger.info(f"Scan job {job.id} queued: {service}, priority={priority}")
+        return job
+
+    def _ensure_workers(self):
+        # Started on first use, so a preloading server's master never owns them
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"scan-job-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            with self._lock:
+                self._queued -= 1
+            metrics.SCAN_JOBS_ACTIVE.dec(QUEUED)
+            try:
+                contextvars.Context().run(self._run, job)
+            except Exception as e:
+                logger.error(f"Scan job worker error: {e}")
+
+    def _run(self, job: ScanJob):
+        if self.store.cancel_requested(job.id) and job.cancel():
+            self._finish(job, CANCELLED)
+        if not job.begin():
+            return
+
+        metrics.SCAN_JOB_WAIT.observe(job.started_at - job.created_at, job.service)
+        metrics.SCAN_JOBS_ACTIVE.inc(RUNNING)
+        self._publish(job)
+        try:
+            self.runner(job)
+            state = CANCELLED if job.cancelled else SUCCEEDED
+        except Exception as e:
+            logger.error(f"Scan job {job.id} failed: {e}")
+            job.error = str(e)
+            state = FAILED
+        finally:
+            metrics.SCAN_JOBS_ACTIVE.dec(RUNNING)
+        self._finish(job, state)
+
+    def _finish(self, job: ScanJob, state: str):
+        job.state = state
+        job.finished_at = time.time()
+        metrics.SCAN_JOBS.inc(job.service, state)
+        self._publish(job)
+        logger.info(f"Scan job {job.id} {state}: {job.threats_found} threats found")
+
+    def _publish(self, job: ScanJob):
+        start = job.stored_detections
+        detections = job.detections_since(start)
+        try:
+            self.store.save(job.snapshot(None), start, detections)
+            job.stored_detections = max(job.stored_detections, start + len(detections))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not publish scan job {job.id}: {e}")
+
+    def _purge(self):
+        """Forget finished jobs older than result_ttl (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+        try:
+            self.store.purge(cutoff)
+        except sqlite3.Error:
+            pass
+
+    def status(self, job_id: str, detections_from: int = 0) -> Optional[Dict[str, Any]]:
+        """A job's snapshot, from this process or the shared store; None if unknown"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot(detections_from)
+        return self.store.load(job_id, detections_from)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Ask a queued or running job to stop; it ends as cancelled once its
+        worker notices. Returns its snapshot, or None if unknown
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.cancel():
+                self._finish(job, CANCELLED)
+            elif not job.finished:
+                self._publish(job)
+            return job.snapshot(None)
+        self.store.request_cancel(job_id)
+        return self.store.load(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "queued": self._queued,
+                "jobs": states
+            }
+
+    def reset_after_fork(self):
+        """A forked child starts with an empty queue and no worker threads"""
+        self._reset()
+
+
+def job_store():
+    if Config.SCAN_JOB_BACKEND == "sqlite":
+        return SQLiteJobStore(Config.SCAN_JOB_DB_PATH, busy_timeout_ms=Config.AUTH_DB_BUSY_TIMEOUT_MS)
+    return LocalJobStore()
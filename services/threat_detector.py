@@ -1,8 +1,11 @@
 import re
+import time
 from typing import List, Dict, Any
 from datetime import datetime
 from config.settings import Config
 from utils.logger import setup_logger
+from utils.metrics import DETECTOR_DURATION
+from utils.profiling import DETECT, record_stage
 
 class ThreatDetector:
     def __init__(self):
@@ -85,6 +88,7 @@ class ThreatDetector:
 
     def analyze(self, text: str) -> Dict[str, Any]:
         """Analyze text for women harassment/abuse content"""
+        started = time.perf_counter()
         try:
             is_threat = self.detect_threat(text)
             confidence = 0.0
@@ -125,3 +129,8 @@ class ThreatDetector:
                 "analysis_timestamp": datetime.utcnow().isoformat(),
                 "category": "error"
             }
+
+        finally:
+            elapsed = time.perf_counter() - started
+            DETECTOR_DURATION.observe(elapsed)
+            record_stage(DETECT, elapsed)
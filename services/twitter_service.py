@@ -1,9 +1,14 @@
 import tweepy
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Generator
 from services.base_service import BaseService
+from services.models import Detection
 from services.threat_detector import ThreatDetector
 from config.settings import Config
+from utils.logger import PER_ITEM
+from utils.projection import current_projection
+from utils.rate_limiter import rate_limited_session
+from utils import profiling
 
 class TwitterService(BaseService):
     def __init__(self):
@@ -18,15 +23,21 @@ class TwitterService(BaseService):
             if not Config.TWITTER_BEARER_TOKEN:
                 raise ValueError("TWITTER_BEARER_TOKEN not configured")
 
-            self.client = tweepy.Client(bearer_token=Config.TWITTER_BEARER_TOKEN)
+            # Pacing is left to the shared rate limiter, which follows x-rate-limit-* headers
+            self.client = tweepy.Client(bearer_token=Config.TWITTER_BEARER_TOKEN, wait_on_rate_limit=False)
+            rate_limited_session("twitter", Config.TWITTER_BEARER_TOKEN, self.client.session)
             self.logger.info("Successfully connected to Twitter API")
 
         except Exception as e:
             self.logger.error(f"Failed to connect to Twitter: {e}")
             raise ConnectionError(f"Twitter API connection failed: {e}")
 
-    def fetch_data(self, query: str = None, max_tweets: int = 50) -> Dict[str, Any]:
-        """Fetch fresh Twitter data for women harassment/abuse detection"""
+    def reset_after_fork(self):
+        if self.client is not None:
+            self.client.session.close()
+
+    def stream_data(self, query: str = None, max_tweets: int = 50) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh Twitter women harassment/abuse detections as they are produced"""
         if not query:
             # Default query focused on women harassment/abuse
             query = "(women harassment OR women abuse OR sexual harassment OR gender violence OR domestic violence OR stalking women) -is:retweet lang:en"
@@ -35,6 +46,7 @@ class TwitterService(BaseService):
             "query": query,
             "tweets_scanned": 0,
             "threats_found": 0,
+            "repeats_skipped": 0,
             "detections": [],
             "source_info": {
                 "platform": "Twitter",
@@ -48,7 +60,8 @@ class TwitterService(BaseService):
             if not self.client:
                 raise ConnectionError("Twitter client not initialized")
 
-            self.logger.info(f"Fetching fresh tweets for women harassment/abuse (max: {max_tweets})")
+            fields = current_projection()
+            self.logger.info("Fetching fresh tweets for women harassment/abuse (max: %s)", max_tweets)
 
             # Get fresh tweets from last 7 days to ensure new content
             start_time = datetime.utcnow() - timedelta(days=7)
@@ -63,6 +76,7 @@ class TwitterService(BaseService):
                 start_time=start_time,
                 max_results=min(100, max_tweets)
             ).flatten(limit=max_tweets)
+            tweets = self.upstream_pages("search_recent_tweets", tweets)
 
             # Build user lookup dictionary
             users_dict = {}
@@ -71,12 +85,20 @@ class TwitterService(BaseService):
                 try:
                     results["tweets_scanned"] += 1
 
+                    # Tweets an earlier scan already fetched skip the lookups and analysis
+                    repeat = self.seen_before("tweet", str(tweet.id))
+                    if repeat and self.skip_repeats:
+                        results["repeats_skipped"] += 1
+                        continue
+
                     # Get username for better source attribution
                     username = "unknown_user"
-                    if hasattr(tweet, 'author_id') and tweet.author_id:
+                    needs_username = fields.wants("author", "username", "url", "tweet_url")
+                    if needs_username and hasattr(tweet, 'author_id') and tweet.author_id:
                         if tweet.author_id not in users_dict:
                             try:
-                                user = self.client.get_user(id=tweet.author_id)
+                                with self.upstream_call("get_user", stage=profiling.ENRICH):
+                                    user = self.client.get_user(id=tweet.author_id)
                                 users_dict[tweet.author_id] = user.data.username if user.data else "unknown_user"
                             except:
                                 users_dict[tweet.author_id] = "unknown_user"
@@ -87,23 +109,26 @@ class TwitterService(BaseService):
 
                     if analysis["is_threat"]:
                         results["threats_found"] += 1
-                        results["detections"].append({
-                            "type": "tweet",
-                            "content": analysis["text_preview"],
-                            "tweet_id": str(tweet.id),
-                            "author_id": str(tweet.author_id) if tweet.author_id else "unknown",
-                            "username": username,
-                            "tweet_url": f"https://twitter.com/{username}/status/{tweet.id}",
-                            "created_at": tweet.created_at.isoformat() if tweet.created_at else datetime.utcnow().isoformat(),
-                            "confidence": analysis["confidence"],
-                            "keywords_found": analysis["keywords_found"],
-                            "category": analysis["category"],
-                            "public_metrics": getattr(tweet, 'public_metrics', {}),
-                            "is_fresh_data": True  # Flag to indicate this is fresh data
-                        })
+                        detection = Detection.from_analysis(
+                            "tweet", "twitter", analysis,
+                            id=str(tweet.id),
+                            url=f"https://twitter.com/{username}/status/{tweet.id}",
+                            author=username,
+                            created_at=tweet.created_at.isoformat() if tweet.created_at else datetime.utcnow().isoformat(),
+                            extras={"author_id": str(tweet.author_id) if tweet.author_id else "unknown"}
+                        )
+                        # Only built when requested (?fields=)
+                        if fields.wants("content"):
+                            detection.content = analysis["text_preview"]
+                        if fields.wants("public_metrics"):
+                            detection.set_extra("public_metrics", getattr(tweet, 'public_metrics', {}))
+                        if repeat:
+                            detection.mark_repeat()
+
+                        yield detection
 
                 except Exception as tweet_error:
-                    self.logger.warning(f"Error processing tweet: {tweet_error}")
+                    self.logger.warning("Error processing tweet: %s", tweet_error, extra=PER_ITEM)
                     continue
 
             message = f"Fresh Twitter scan completed: {results['tweets_scanned']} tweets, {results['threats_found']} harassment/abuse cases found"
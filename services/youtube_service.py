@@ -1,33 +1,136 @@
-from googleapiclient.discovery import build
+import json
+import os
+import threading
+import httplib2
+from urllib.parse import urlsplit
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Generator
 from services.base_service import BaseService
+from services.models import Detection
 from services.threat_detector import ThreatDetector
 from config.settings import Config
+from utils.logger import PER_ITEM
+from utils import metrics, profiling
+from utils.projection import current_projection
+from utils.replay import upstream_http, youtube_client_options
+from utils.rate_limiter import rate_limited_http
+
+# Only the resources fetch_data calls are kept in the discovery document
+USED_RESOURCES = ("search", "commentThreads")
+
+# Data API quota units per call, taken from the youtube rate-limit bucket
+SEARCH_QUOTA_COST = 100
+LIST_QUOTA_COST = 1
+
+
+def quota_cost(uri: str) -> float:
+    return SEARCH_QUOTA_COST if urlsplit(uri).path.endswith("/search") else LIST_QUOTA_COST
+
+
+def _referenced_schemas(node, found=None):
+    """Collect every schema name reachable through $ref from a discovery fragment"""
+    found = set() if found is None else found
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str):
+            found.add(ref)
+        for value in node.values():
+            _referenced_schemas(value, found)
+    elif isinstance(node, list):
+        for value in node:
+            _referenced_schemas(value, found)
+    return found
+
+
+def trim_discovery_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce the YouTube discovery document to the resources and schemas we use"""
+    resources = {name: document["resources"][name] for name in USED_RESOURCES}
+    schemas = document.get("schemas", {})
+
+    needed = _referenced_schemas(resources)
+    pending = list(needed)
+    while pending:
+        for ref in _referenced_schemas(schemas.get(pending.pop(), {})):
+            if ref not in needed:
+                needed.add(ref)
+                pending.append(ref)
+
+    return {
+        **document,
+        "resources": resources,
+        "schemas": {name: schemas[name] for name in needed if name in schemas}
+    }
+
+
+def load_discovery_document() -> str:
+    """
+    Trimmed YouTube v3 discovery document, read from the local cache file
+    when one is configured, otherwise built from the copy shipped with
+    google-api-python-client. Never touches the network.
+    """
+    cache_path = Config.YOUTUBE_DISCOVERY_CACHE
+    if cache_path and os.path.exists(cache_path):
+        metrics.CACHE_REQUESTS.inc("youtube_discovery", "hit")
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            return cache_file.read()
+    if cache_path:
+        metrics.CACHE_REQUESTS.inc("youtube_discovery", "miss")
+
+    document = json.dumps(trim_discovery_document(json.loads(get_static_doc("youtube", "v3"))))
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as cache_file:
+            cache_file.write(document)
+
+    return document
+
 
 class YouTubeService(BaseService):
     def __init__(self):
         super().__init__("YouTube")
         self.detector = ThreatDetector()
         self.youtube = None
+        self._local = threading.local()
         self._connect()
 
+    def _http(self):
+        """
+        httplib2 connections are not thread-safe, so every thread gets its
+        own; quota is taken below the response cache, so hits spend none
+        """
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = upstream_http("youtube") or httplib2.Http(timeout=30)
+            http = self._local.http = rate_limited_http("youtube", Config.YOUTUBE_API_KEY, http, quota_cost)
+        return http
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+
     def _connect(self):
         """Connect to YouTube API with error handling"""
         try:
             if not Config.YOUTUBE_API_KEY:
                 raise ValueError("YOUTUBE_API_KEY not configured")
 
-            self.youtube = build("youtube", "v3", developerKey=Config.YOUTUBE_API_KEY)
+            self.youtube = build_from_document(
+                load_discovery_document(),
+                developerKey=Config.YOUTUBE_API_KEY,
+                http=self._http(),
+                client_options=youtube_client_options()
+            )
             self.logger.info("Successfully connected to YouTube API")
 
         except Exception as e:
             self.logger.error(f"Failed to connect to YouTube: {e}")
             raise ConnectionError(f"YouTube API connection failed: {e}")
 
-    def fetch_data(self, query: str = None, max_results: int = 20) -> Dict[str, Any]:
-        """Fetch fresh YouTube data for women harassment/abuse detection"""
+    def stream_data(self, query: str = None, max_results: int = 20) -> Generator[Detection, None, Dict[str, Any]]:
+        """Yield fresh YouTube women harassment/abuse detections as they are produced"""
         if not query:
             query = "women harassment OR sexual harassment OR gender violence OR women abuse"
 
@@ -35,6 +138,7 @@ class YouTubeService(BaseService):
             "query": query,
             "videos_scanned": 0,
             "threats_found": 0,
+            "repeats_skipped": 0,
             "detections": [],
             "source_info": {
                 "platform": "YouTube",
@@ -48,7 +152,8 @@ class YouTubeService(BaseService):
             if not self.youtube:
                 raise ConnectionError("YouTube client not initialized")
 
-            self.logger.info(f"Fetching fresh YouTube videos for women harassment/abuse (max: {max_results})")
+            fields = current_projection()
+            self.logger.info("Fetching fresh YouTube videos for women harassment/abuse (max: %s)", max_results)
 
             # Search for fresh videos (published in last week for freshness)
             published_after = (datetime.utcnow() - timedelta(days=7)).isoformat() + 'Z'
@@ -62,15 +167,25 @@ class YouTubeService(BaseService):
                 publishedAfter=published_after,
                 regionCode="US"
             )
-            search_response = search_request.execute()
+            with self.upstream_call("search.list"):
+                search_response = search_request.execute(http=self._http())
 
             for item in search_response.get("items", []):
                 try:
                     results["videos_scanned"] += 1
 
-                    # Analyze video title and description
                     title = item["snippet"]["title"]
                     description = item["snippet"]["description"]
+
+                    # Videos an earlier scan already fetched skip re-analysis but still
+                    # have their comments fetched; seen_before drops repeat comments
+                    repeat = self.seen_before("video", item["id"]["videoId"])
+                    if repeat and self.skip_repeats:
+                        results["repeats_skipped"] += 1
+                        yield from self._comment_detections(item, title, fields, results)
+                        continue
+
+                    # Analyze video title and description
                     content = f"{title} {description}"
 
                     analysis = self.detector.analyze(content)
@@ -78,62 +193,30 @@ class YouTubeService(BaseService):
                     if analysis["is_threat"]:
                         results["threats_found"] += 1
 
-                        detection = {
-                            "type": "video",
-                            "title": title,
-                            "description": description[:300] + "..." if len(description) > 300 else description,
-                            "channel_title": item["snippet"]["channelTitle"],
-                            "channel_id": item["snippet"]["channelId"],
-                            "video_id": item["id"]["videoId"],
-                            "video_url": f"https://www.youtube.com/watch?v={item['id']['videoId']}",
-                            "published_at": item["snippet"]["publishedAt"],
-                            "confidence": analysis["confidence"],
-                            "keywords_found": analysis["keywords_found"],
-                            "category": analysis["category"],
-                            "thumbnails": item["snippet"].get("thumbnails", {}),
-                            "is_fresh_data": True
-                        }
-
-                        results["detections"].append(detection)
+                        detection = Detection.from_analysis(
+                            "video", "youtube", analysis,
+                            id=item["id"]["videoId"],
+                            url=f"https://www.youtube.com/watch?v={item['id']['videoId']}",
+                            author=item["snippet"]["channelTitle"],
+                            title=title,
+                            created_at=item["snippet"]["publishedAt"],
+                            extras={"channel_id": item["snippet"]["channelId"]}
+                        )
+                        # Only built when requested (?fields=)
+                        if fields.wants("content", "description"):
+                            detection.content = description[:300] + "..." if len(description) > 300 else description
+                        if fields.wants("thumbnails"):
+                            detection.set_extra("thumbnails", item["snippet"].get("thumbnails", {}))
+                        if repeat:
+                            detection.mark_repeat()
+
+                        yield detection
 
                         # Get fresh comments for videos with harassment content
-                        try:
-                            comments_request = self.youtube.commentThreads().list(
-                                videoId=item["id"]["videoId"],
-                                part="snippet",
-                                maxResults=10,
-                                order="time"  # Get most recent comments
-                            )
-                            comments_response = comments_request.execute()
-
-                            for comment_item in comments_response.get("items", []):
-                                comment_text = comment_item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                                comment_analysis = self.detector.analyze(comment_text)
-
-                                if comment_analysis["is_threat"]:
-                                    results["threats_found"] += 1
-                                    results["detections"].append({
-                                        "type": "comment",
-                                        "video_title": title,
-                                        "video_url": f"https://www.youtube.com/watch?v={item['id']['videoId']}",
-                                        "comment_text": comment_analysis["text_preview"],
-                                        "author": comment_item["snippet"]["topLevelComment"]["snippet"]["authorDisplayName"],
-                                        "author_channel_id": comment_item["snippet"]["topLevelComment"]["snippet"].get("authorChannelId", ""),
-                                        "published_at": comment_item["snippet"]["topLevelComment"]["snippet"]["publishedAt"],
-                                        "confidence": comment_analysis["confidence"],
-                                        "keywords_found": comment_analysis["keywords_found"],
-                                        "category": comment_analysis["category"],
-                                        "is_fresh_data": True
-                                    })
-
-                        except HttpError as comment_error:
-                            if comment_error.resp.status == 403:
-                                self.logger.warning(f"Comments disabled for video {item['id']['videoId']}")
-                            else:
-                                self.logger.warning(f"Error fetching comments: {comment_error}")
+                        yield from self._comment_detections(item, title, fields, results)
 
                 except Exception as video_error:
-                    self.logger.warning(f"Error processing video: {video_error}")
+                    self.logger.warning("Error processing video: %s", video_error, extra=PER_ITEM)
                     continue
 
             message = f"Fresh YouTube scan completed: {results['videos_scanned']} videos, {results['threats_found']} harassment/abuse cases found"
@@ -145,3 +228,49 @@ class YouTubeService(BaseService):
             error_msg = f"Error fetching fresh YouTube data: {e}"
             self.logger.error(error_msg)
             return self.format_response(results, success=False, error=e, message=error_msg)
+
+    def _comment_detections(self, item, title, fields, results):
+        """Yield harassment/abuse detections from a video's most recent comments"""
+        try:
+            comments_request = self.youtube.commentThreads().list(
+                videoId=item["id"]["videoId"],
+                part="snippet",
+                maxResults=10,
+                order="time"  # Get most recent comments
+            )
+            with self.upstream_call("commentThreads.list", stage=profiling.ENRICH):
+                comments_response = comments_request.execute(http=self._http())
+
+            for comment_item in comments_response.get("items", []):
+                comment_repeat = self.seen_before("comment", comment_item.get("id", ""))
+                if comment_repeat and self.skip_repeats:
+                    results["repeats_skipped"] += 1
+                    continue
+
+                comment_text = comment_item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
+                comment_analysis = self.detector.analyze(comment_text)
+
+                if comment_analysis["is_threat"]:
+                    results["threats_found"] += 1
+                    comment_snippet = comment_item["snippet"]["topLevelComment"]["snippet"]
+                    comment_detection = Detection.from_analysis(
+                        "comment", "youtube", comment_analysis,
+                        id=comment_item.get("id", ""),
+                        url=f"https://www.youtube.com/watch?v={item['id']['videoId']}",
+                        author=comment_snippet["authorDisplayName"],
+                        title=title,
+                        created_at=comment_snippet["publishedAt"],
+                        extras={"author_channel_id": comment_snippet.get("authorChannelId", "")}
+                    )
+                    if fields.wants("content", "comment_text"):
+                        comment_detection.content = comment_analysis["text_preview"]
+                    if comment_repeat:
+                        comment_detection.mark_repeat()
+
+                    yield comment_detection
+
+        except HttpError as comment_error:
+            if comment_error.resp.status == 403:
+                self.logger.warning("Comments disabled for video %s", item['id']['videoId'], extra=PER_ITEM)
+            else:
+                self.logger.warning("Error fetching comments: %s", comment_error, extra=PER_ITEM)
@@ -0,0 +1,54 @@
+import gzip
+
+from config.settings import Config
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def choose_encoding(accept_encodings) -> str:
+    """Best content coding the client accepts: br (if available), then gzip, else identity"""
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response, accept_encodings):
+    """
+    Compress a finished, non-streamed response in place when the client
+    accepts it and the body is at least COMPRESS_MIN_SIZE bytes
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.content_length is not None and response.content_length < Config.COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=min(Config.COMPRESS_LEVEL, 11))
+    else:
+        compressed = gzip.compress(body, compresslevel=min(Config.COMPRESS_LEVEL, 9), mtime=0)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
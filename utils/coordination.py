@@ -0,0 +1,358 @@
+"""
+Lease-based work sharding between ingestion processes.
+
+Scan targets (subreddits, queries) are hashed into SHARD_COUNT shards.
+Every process taking part heartbeats into a coordination backend and holds
+time-bounded leases on its fair share of the shards (shards / live
+members, rounded up), renewing them every third of SHARD_LEASE_SECONDS.
+A process only ingests the targets of shards it holds, so each target is
+fetched from upstream by one process at a time.
+
+Rebalancing needs no coordinator: a member that joins makes everyone's
+share smaller, and those over it release their least-preferred shards; a
+member that stops cleanly gives its shards back at once, and one that
+dies stops renewing, so its leases expire and the survivors claim them.
+A member that stalls for longer than a lease finds, on its next
+heartbeat, that its shards have moved on and drops them.
+
+COORDINATION_BACKEND picks where the leases live: "memory" (this process
+only), "sqlite" (every process sharing COORDINATION_DB_PATH on one host),
+or "module:attribute" naming a factory for another backend, which needs
+the ``heartbeat``/``leave``/``leases``/``claim``/``release`` methods of
+the two below.
+"""
+
+import hashlib
+import importlib
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from config.settings import Config
+from database import ConnectionPool
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger("coordination")
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shard_of(target: str, shards: int) -> int:
+    """Stable shard of a target, the same in every process and on every host"""
+    return _hash(target.strip().lower()) % shards
+
+
+def default_member_id() -> str:
+    return Config.SHARD_WORKER_ID or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class MemoryCoordinator:
+    """Leases held in this process; members are the ingestors running in it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members: Dict[str, Dict[str, float]] = {}
+        self._leases: Dict[str, Dict[int, tuple]] = {}
+
+    def reset_after_fork(self):
+        """A forked child starts with no members or leases of its own"""
+        self._lock = threading.Lock()
+        self._members = {}
+        self._leases = {}
+
+    def heartbeat(self, group: str, member: str, ttl: float, now: float) -> List[str]:
+        """Record ``member`` as alive for ``ttl`` seconds; returns the live members"""
+        with self._lock:
+            members = self._members.setdefault(group, {})
+            members[member] = now + ttl
+            for name in [name for name, expires in members.items() if expires <= now]:
+                del members[name]
+            return sorted(members)
+
+    def leave(self, group: str, member: str):
+        with self._lock:
+            self._members.get(group, {}).pop(member, None)
+            leases = self._leases.get(group, {})
+            for shard in [shard for shard, (owner, _) in leases.items() if owner == member]:
+                del leases[shard]
+
+    def leases(self, group: str, now: float) -> Dict[int, str]:
+        """shard -> member for the unexpired leases"""
+        with self._lock:
+            return {shard: owner for shard, (owner, expires) in self._leases.get(group, {}).items()
+                    if expires > now}
+
+    def claim(self, group: str, shards: Iterable[int], member: str, ttl: float, now: float) -> List[int]:
+        """Take or renew the leases on ``shards`` that are free, expired or already ours"""
+        held = []
+        with self._lock:
+            leases = self._leases.setdefault(group, {})
+            for shard in shards:
+                owner, expires = leases.get(shard, (None, 0.0))
+                if owner in (None, member) or expires <= now:
+                    leases[shard] = (member, now + ttl)
+                    held.append(shard)
+        return held
+
+    def release(self, group: str, shards: Iterable[int], member: str):
+        with self._lock:
+            leases = self._leases.get(group, {})
+            for shard in shards:
+                if leases.get(shard, (None,))[0] == member:
+                    del leases[shard]
+
+
+class SQLiteCoordinator:
+    """Leases shared by every process using the same SQLite file"""
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS shard_members (
+            grp TEXT NOT NULL,
+            member TEXT NOT NULL,
+            expires REAL NOT NULL,
+            PRIMARY KEY (grp, member)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS shard_leases (
+            grp TEXT NOT NULL,
+            shard INTEGER NOT NULL,
+            member TEXT NOT NULL,
+            expires REAL NOT NULL,
+            PRIMARY KEY (grp, shard)
+        )
+        """
+    )
+    UPSERT_MEMBER = "INSERT OR REPLACE INTO shard_members (grp, member, expires) VALUES (?, ?, ?)"
+    DELETE_EXPIRED_MEMBERS = "DELETE FROM shard_members WHERE grp = ? AND expires <= ?"
+    SELECT_MEMBERS = "SELECT member FROM shard_members WHERE grp = ? ORDER BY member"
+    DELETE_MEMBER = "DELETE FROM shard_members WHERE grp = ? AND member = ?"
+    SELECT_LEASES = "SELECT shard, member FROM shard_leases WHERE grp = ? AND expires > ?"
+    # Takes a free or expired lease, or renews our own; leaves anyone else's alone
+    CLAIM_LEASE = """
+    INSERT INTO shard_leases (grp, shard, member, expires) VALUES (?, ?, ?, ?)
+    ON CONFLICT(grp, shard) DO UPDATE SET member = excluded.member, expires = excluded.expires
+    WHERE shard_leases.member = excluded.member OR shard_leases.expires <= ?
+    """
+    RELEASE_LEASE = "DELETE FROM shard_leases WHERE grp = ? AND shard = ? AND member = ?"
+    RELEASE_ALL = "DELETE FROM shard_leases WHERE grp = ? AND member = ?"
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.pool = ConnectionPool(path, busy_timeout_ms=busy_timeout_ms)
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._schema_ready and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self.pool.connection()
+        if not self._schema_ready:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._schema_ready = True
+        return conn
+
+    def _transaction(self, work: Callable[[sqlite3.Connection], object]):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def heartbeat(self, group: str, member: str, ttl: float, now: float) -> List[str]:
+        def work(conn):
+            conn.execute(self.UPSERT_MEMBER, (group, member, now + ttl))
+            conn.execute(self.DELETE_EXPIRED_MEMBERS, (group, now))
+            return [row[0] for row in conn.execute(self.SELECT_MEMBERS, (group,))]
+        return self._transaction(work)
+
+    def leave(self, group: str, member: str):
+        def work(conn):
+            conn.execute(self.DELETE_MEMBER, (group, member))
+            conn.execute(self.RELEASE_ALL, (group, member))
+        self._transaction(work)
+
+    def leases(self, group: str, now: float) -> Dict[int, str]:
+        return dict(self._connection().execute(self.SELECT_LEASES, (group, now)).fetchall())
+
+    def claim(self, group: str, shards: Iterable[int], member: str, ttl: float, now: float) -> List[int]:
+        def work(conn):
+            return [shard for shard in shards
+                    if conn.execute(self.CLAIM_LEASE, (group, shard, member, now + ttl, now)).rowcount > 0]
+        return self._transaction(work)
+
+    def release(self, group: str, shards: Iterable[int], member: str):
+        def work(conn):
+            for shard in shards:
+                conn.execute(self.RELEASE_LEASE, (group, shard, member))
+        self._transaction(work)
+
+
+class ShardLeaser:
+    """
+    Keeps this process's share of a group's shards leased, heartbeating
+    from a background thread until stopped
+    """
+
+    def __init__(self, group: str, backend, shards: int = None, lease_seconds: float = None,
+                 member: Optional[str] = None):
+        self.group = group
+        self.backend = backend
+        self.shards = shards or Config.SHARD_COUNT
+        self.lease_seconds = lease_seconds or Config.SHARD_LEASE_SECONDS
+        self.heartbeat_seconds = self.lease_seconds / 3
+        self.member = member or default_member_id()
+        # Bumped whenever the set of held shards changes, so consumers can
+        # notice a rebalance without a callback
+        self.generation = 0
+        self.members: List[str] = []
+        self.last_heartbeat = None
+        self.last_error = None
+        self._held: frozenset = frozenset()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def held(self) -> frozenset:
+        return self._held
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _preference(self, shard: int) -> int:
+        # Rendezvous order: members joining together go for different shards first
+        return _hash(f"{self.member}:{shard}")
+
+    def owns(self, target: str) -> bool:
+        return shard_of(target, self.shards) in self._held
+
+    def owned_targets(self, targets: Sequence[str]) -> List[str]:
+        """The subset of ``targets`` this process should ingest right now"""
+        held = self._held
+        return [target for target in targets if shard_of(target, self.shards) in held]
+
+    def start(self):
+        """Take a first share synchronously, then keep heartbeating in the background"""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name=f"shard-leaser-{self.group}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop heartbeating and hand every held shard back straight away"""
+        self._stop_event.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        try:
+            self.backend.leave(self.group, self.member)
+        except Exception as e:
+            logger.warning(f"Could not release {self.group} shards: {e}")
+        self._set_held(frozenset())
+
+    def _run(self):
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            self.tick()
+
+    def tick(self):
+        """One heartbeat: renew what we hold, give up any excess, claim free shards up to our share"""
+        now = time.time()
+        try:
+            members = self.backend.heartbeat(self.group, self.member, self.lease_seconds, now)
+            holders = self.backend.leases(self.group, now)
+        except Exception as e:
+            # Leases stay valid until they expire; keep ingesting them meanwhile
+            self.last_error = str(e)
+            logger.warning(f"Shard heartbeat for {self.group} failed: {e}")
+            return
+
+        share = math.ceil(self.shards / max(len(members), 1))
+        mine = sorted((shard for shard, owner in holders.items() if owner == self.member),
+                      key=self._preference)
+        if len(mine) > share:
+            excess = mine[share:]
+            mine = mine[:share]
+            try:
+                self.backend.release(self.group, excess, self.member)
+            except Exception as e:
+                logger.warning(f"Could not release {self.group} shards: {e}")
+
+        free = sorted((shard for shard in range(self.shards) if shard not in holders), key=self._preference)
+        wanted = mine + free[:max(share - len(mine), 0)]
+        try:
+            held = self.backend.claim(self.group, wanted, self.member, self.lease_seconds, now)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning(f"Shard lease renewal for {self.group} failed: {e}")
+            return
+
+        self.members = members
+        self.last_heartbeat = now
+        self.last_error = None
+        self._set_held(frozenset(held))
+
+    def _set_held(self, held: frozenset):
+        with self._lock:
+            if held == self._held:
+                return
+            gained, lost = sorted(held - self._held), sorted(self._held - held)
+            self._held = held
+            self.generation += 1
+        metrics.SHARD_LEASES.inc(self.group, amount=len(gained) - len(lost))
+        logger.info(f"Shards for {self.group} now {sorted(held)} (gained {gained}, lost {lost})")
+
+    def reset_after_fork(self):
+        """The heartbeat thread did not survive the fork and the leases belong to the parent"""
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._held = frozenset()
+        self.member = default_member_id()
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "group": self.group,
+            "member": self.member,
+            "shards": self.shards,
+            "held": sorted(self._held),
+            "members": self.members,
+            "lease_seconds": self.lease_seconds,
+            "running": self.running,
+            "last_heartbeat_age_s": round(time.time() - self.last_heartbeat, 2) if self.last_heartbeat else None,
+            "last_error": self.last_error
+        }
+
+
+def _backend():
+    name = Config.COORDINATION_BACKEND
+    if name.lower() == "sqlite":
+        return SQLiteCoordinator(Config.COORDINATION_DB_PATH, busy_timeout_ms=Config.AUTH_DB_BUSY_TIMEOUT_MS)
+    if ":" in name:
+        module_name, _, attribute = name.partition(":")
+        return getattr(importlib.import_module(module_name), attribute)()
+    return MemoryCoordinator()
+
+
+coordinator = _backend()
+if hasattr(coordinator, "reset_after_fork"):
+    os.register_at_fork(after_in_child=coordinator.reset_after_fork)
+
+
+def shard_leaser(group: str) -> ShardLeaser:
+    """A leaser for ``group`` on the configured backend"""
+    return ShardLeaser(group, coordinator)
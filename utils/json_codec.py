@@ -0,0 +1,73 @@
+"""
+JSON encoding with orjson when it is installed, stdlib json otherwise.
+
+``FastJSONProvider`` plugs the same encoder into Flask so ``jsonify`` and
+the NDJSON stream share one code path.
+"""
+
+import hashlib
+import json
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+from config.settings import Config
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+USE_ORJSON = orjson is not None and Config.JSON_BACKEND != "stdlib"
+
+# Keys that change on every request without the result itself changing;
+# responses carry their time in the Date header instead
+VOLATILE_KEYS = frozenset({
+    "timestamp", "scan_time", "scan_timestamp", "scan_completed", "analysis_timestamp"
+})
+
+
+def _default(obj):
+    # Records with their own serialization (Detection), then Flask's
+    # conversions (dates, dataclasses, UUIDs), then str() as a last resort
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    try:
+        return DefaultJSONProvider.default(obj)
+    except TypeError:
+        return str(obj)
+
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> str:
+    """Encode ``obj`` to a JSON string"""
+    if USE_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode()
+    return json.dumps(obj, default=_default, sort_keys=sort_keys,
+                      indent=2 if indent else None, separators=None if indent else (",", ":"))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by ``dumps`` above"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys),
+                     indent=kwargs.get("indent") is not None)
+
+
+def without_volatile(obj: Any) -> Any:
+    """Copy of a payload's dicts and lists with the VOLATILE_KEYS left out"""
+    if isinstance(obj, dict):
+        return {key: without_volatile(value) for key, value in obj.items() if key not in VOLATILE_KEYS}
+    if isinstance(obj, list):
+        return [without_volatile(value) for value in obj]
+    return obj
+
+
+def content_etag(body: bytes) -> str:
+    """Strong validator for an encoded body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
@@ -1,15 +1,254 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
 
+from config.settings import Config
+
+# Correlation ids attached to every record emitted while they are set
+request_id_var = contextvars.ContextVar("request_id", default=None)
+scan_id_var = contextvars.ContextVar("scan_id", default=None)
+
+# Pass as extra= on high-rate per-item messages so they are sampled
+PER_ITEM = {"per_item": True}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including request/scan ids when present"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for field in ("request_id", "scan_id", "sample_rate"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Formatted before the record was queued (DroppingQueueHandler.prepare)
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Copy request/scan ids from the calling context onto the record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.scan_id = scan_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N per-item records for each level (see LOG_ITEM_SAMPLING).
+    Records without the per_item marker, and ERROR and above, always pass.
+    """
+
+    def __init__(self, every_by_level):
+        super().__init__()
+        self.every_by_level = every_by_level
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, "per_item", False) or record.levelno >= logging.ERROR:
+            return True
+
+        every = self.every_by_level.get(record.levelname, 1)
+        if every <= 1:
+            return True
+
+        key = (record.name, record.levelno)
+        with self._lock:
+            count = self._counters.get(key, 0)
+            self._counters[key] = count + 1
+        if count % every:
+            return False
+        record.sample_rate = every
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        Merge the args into the message like QueueHandler does, but keep the
+        traceback in exc_text instead of folding it into the message, so
+        formatters still show it (JSONFormatter as its own field)
+        """
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def new_log_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def log_context(**ids):
+    """Set request_id / scan_id for every record logged inside the block"""
+    tokens = [(var, var.set(ids[key])) for key, var in (("request_id", request_id_var), ("scan_id", scan_id_var))
+              if key in ids]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def bind_log_context(stream, **ids):
+    """
+    Wrap a detection stream so its log records carry the given ids.
+    Generators run lazily, so the ids are set around every step.
+    """
+    while True:
+        with log_context(**ids):
+            try:
+                item = next(stream)
+            except StopIteration as stop:
+                return stop.value
+        yield item
+
+
+def _parse_sampling(spec):
+    every = {}
+    for part in spec.split(","):
+        level, _, value = part.partition(":")
+        if level.strip() and value.strip():
+            every[level.strip().upper()] = max(int(value), 1)
+    return every
+
+
+def _build_formatter(detailed=False):
+    if Config.LOG_FORMAT == "json":
+        return JSONFormatter()
+    if detailed:
+        return logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+    return logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
+class LogPipeline:
+    """
+    A bounded queue drained by a background QueueListener
+
+    Loggers only enqueue records; the slow part (formatting and writing to
+    stdout or a file) happens on the listener thread, so a slow pipe can
+    never stall a fetch loop.
+    """
+
+    def __init__(self, *handlers):
+        self.handlers = handlers
+        self.queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.queue_handler.addFilter(ContextFilter())
+        self.queue_handler.addFilter(SamplingFilter(_parse_sampling(Config.LOG_ITEM_SAMPLING)))
+        self.listener = None
+        self.start()
+
+    def start(self):
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+
+    def restart(self):
+        """Start a fresh listener thread (threads do not survive a fork)"""
+        self.queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.queue_handler.queue = self.queue
+        self.listener = None
+        self.start()
+
+
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _get_pipeline(key, handler_factory):
+    with _pipelines_lock:
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = LogPipeline(*handler_factory())
+            _pipelines[key] = pipeline
+        return pipeline
+
+
+def restart_log_listeners():
+    """Re-create listener threads, e.g. in a freshly forked worker"""
+    with _pipelines_lock:
+        for pipeline in _pipelines.values():
+            pipeline.restart()
+
+
+def dropped_log_records():
+    """Records dropped because a log queue was full"""
+    with _pipelines_lock:
+        return sum(pipeline.queue_handler.dropped for pipeline in _pipelines.values())
+
+
+@atexit.register
+def _flush_log_listeners():
+    with _pipelines_lock:
+        for pipeline in _pipelines.values():
+            pipeline.stop()
+
+
+def _console_handlers():
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_build_formatter())
+    return [handler]
+
+
 def setup_logger(name="social_threat_monitor", level=logging.INFO):
     """
     Setup logger with professional formatting
 
+    Records go through a shared queue to a background listener that writes
+    them to stdout (plain text, or JSON when LOG_FORMAT=json).
+
     Args:
         name (str): Logger name (usually module name)
         level: Logging level (INFO, DEBUG, ERROR, etc.)
-    
+
     Returns:
         logging.Logger: Configured logger instance
     """
@@ -18,23 +257,11 @@ def setup_logger(name="social_threat_monitor", level=logging.INFO):
 
     # Avoid duplicate handlers if logger already exists
     if not logger.handlers:
-        # Create console handler
-        handler = logging.StreamHandler(sys.stdout)
-
-        # Create formatter with timestamp and detailed info
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-
-        # Set formatter to handler
-        handler.setFormatter(formatter)
-
-        # Add handler to logger
-        logger.addHandler(handler)
+        logger.addHandler(_get_pipeline("console", _console_handlers).queue_handler)
 
     return logger
 
+
 def setup_file_logger(name, filename, level=logging.INFO):
     """
     Setup file-based logger for persistent logging
@@ -51,25 +278,22 @@ def setup_file_logger(name, filename, level=logging.INFO):
     logger.setLevel(level)
 
     if not logger.handlers:
-        # Create file handler
-        file_handler = logging.FileHandler(filename)
+        def file_handlers():
+            # Create file handler
+            file_handler = logging.FileHandler(filename)
+            file_handler.setFormatter(_build_formatter(detailed=True))
 
-        # Create detailed formatter for file logs
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+            # Also add console handler for immediate feedback
+            console_handler = logging.StreamHandler(sys.stdout)
+            if Config.LOG_FORMAT == "json":
+                console_handler.setFormatter(JSONFormatter())
+            else:
+                console_handler.setFormatter(logging.Formatter(
+                    '%(asctime)s - %(levelname)s - %(message)s',
+                    datefmt='%H:%M:%S'
+                ))
+            return [file_handler, console_handler]
 
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
-        # Also add console handler for immediate feedback
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
+        logger.addHandler(_get_pipeline(f"file:{filename}", file_handlers).queue_handler)
 
     return logger
@@ -0,0 +1,106 @@
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Optional
+
+# Allocations made by the tracer itself or the import system are noise here
+IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of this process, in bytes"""
+    rss = None
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            rss = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    return {"rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+class MemoryTracker:
+    """
+    tracemalloc session with a baseline snapshot to diff against
+
+    Tracing slows allocations noticeably, so it only runs between start()
+    and stop().
+    """
+
+    def __init__(self):
+        self.baseline = None
+        self.baseline_taken_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = None
+            self.baseline_taken_at = None
+
+    def stop(self):
+        with self._lock:
+            tracemalloc.stop()
+            self.baseline = None
+            self.baseline_taken_at = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES]
+        )
+
+    def take_baseline(self):
+        """Remember the current heap; later reports diff against it"""
+        snapshot = self._snapshot()
+        with self._lock:
+            self.baseline = snapshot
+            self.baseline_taken_at = time.time()
+
+    def report(self, top: int = 20, group_by: str = "lineno", diff: bool = True) -> Dict[str, Any]:
+        """Top allocation sites now and, if a baseline exists, the biggest growth since it"""
+        snapshot = self._snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        report = {
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "group_by": group_by,
+            "top": [_stat_dict(stat) for stat in snapshot.statistics(group_by)[:top]]
+        }
+
+        with self._lock:
+            baseline, baseline_taken_at = self.baseline, self.baseline_taken_at
+        if diff and baseline is not None:
+            report["baseline_age_seconds"] = round(time.time() - baseline_taken_at, 1)
+            report["growth"] = [_stat_dict(stat) for stat in snapshot.compare_to(baseline, group_by)[:top]]
+        return report
+
+
+def _stat_dict(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    entry = {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "size_bytes": stat.size,
+        "count": stat.count
+    }
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    if len(stat.traceback) > 1:
+        entry["traceback"] = [f"{caller.filename}:{caller.lineno}" for caller in stat.traceback]
+    return entry
+
+
+memory_tracker = MemoryTracker()
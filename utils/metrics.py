@@ -0,0 +1,350 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Every metric keeps one shard per thread, so recording a value is a plain
+dict update on the caller's own shard and never takes a lock. Shards are
+summed when /metrics is scraped.
+
+With METRICS_DIR set, each process also writes its totals to
+``<METRICS_DIR>/metrics_<pid>.json`` and a scrape merges every file, so the
+numbers stay correct behind several gunicorn workers. Counters and
+histograms of exited workers are kept; gauges only count live processes.
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config.settings import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metric:
+    """Base class: a named family of samples, sharded per thread"""
+
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.reset()
+
+    def reset(self):
+        """Forget every recorded value (also used in a freshly forked child)"""
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {labels}")
+        return tuple(str(value) for value in labels)
+
+    def _merge(self, totals, values):
+        for key, value in values.items():
+            totals[key] = totals.get(key, 0) + value
+
+    def samples(self) -> Dict[Tuple[str, ...], Any]:
+        """Sum of every thread's shard"""
+        with self._lock:
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    # Fold finished threads into one shard so the list stays short
+                    self._merge(self._retired, shard.copy())
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            totals = {}
+            self._merge(totals, self._retired)
+
+        for _thread_ref, shard in live:
+            self._merge(totals, shard.copy())
+        return totals
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """Up/down gauge; inc and dec may happen on different threads"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labels)
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # Per-bucket counts (last one is +Inf), then the running sum
+            entry = shard[key] = [0] * (len(self.buckets) + 2)
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def _merge(self, totals, values):
+        for key, entry in values.items():
+            entry = list(entry)
+            current = totals.get(key)
+            totals[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders /metrics"""
+
+    def __init__(self, directory: Optional[str] = None, flush_seconds: float = 5.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._metrics = {}
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    # ---- multi-process support ----
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable totals of this process"""
+        return {
+            name: [[list(key), value] for key, value in metric.samples().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def write_snapshot(self):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump({"pid": os.getpid(), "metrics": self.snapshot()}, snapshot_file)
+        os.replace(temp_path, path)
+
+    def clear_snapshots(self):
+        """Remove every other process's snapshot, e.g. a previous server run's"""
+        if not self.directory:
+            return
+        own_path = self._path(os.getpid())
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            if path != own_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def start(self):
+        """Write this process's snapshot every flush_seconds (no-op without METRICS_DIR)"""
+        if not self.directory or (self._flusher and self._flusher.is_alive()):
+            return
+        self._stopped.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stopped.wait(self.flush_seconds):
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stopped.set()
+        try:
+            self.write_snapshot()
+        except OSError:
+            pass
+
+    def reset_after_fork(self):
+        """A forked child starts from zero; its parent's values live in the parent's file"""
+        for metric in self._metrics.values():
+            metric.reset()
+        self._flusher = None
+        self._stopped = threading.Event()
+        self.start()
+
+    def _collect(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        if not self.directory:
+            return {name: metric.samples() for name, metric in self._metrics.items()}
+
+        self.write_snapshot()
+        merged = {name: {} for name in self._metrics}
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(snapshot.get("pid"))
+
+            for name, samples in snapshot.get("metrics", {}).items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.kind == "gauge" and not alive):
+                    continue
+                metric._merge(merged[name], {tuple(key): value for key, value in samples})
+        return merged
+
+    # ---- exposition ----
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        lines = []
+        for name, samples in self._collect().items():
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+
+            for key, value in sorted(samples.items()):
+                labels = list(zip(metric.labels, key))
+                if metric.kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry(Config.METRICS_DIR or None, Config.METRICS_FLUSH_SECONDS)
+os.register_at_fork(after_in_child=registry.reset_after_fork)
+atexit.register(registry.stop)
+
+# ---- application metrics ----
+
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to platform APIs", ("service", "call"))
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Failed platform API calls by HTTP status (429 = rate limited)",
+    ("service", "call", "status"))
+ITEMS_SCANNED = registry.counter(
+    "items_scanned_total", "Posts, comments, tweets, videos and articles analysed", ("service",))
+THREATS_FOUND = registry.counter(
+    "threats_found_total", "Harassment/abuse detections produced", ("service",))
+SCANS = registry.counter(
+    "scans_total", "Completed scans by outcome", ("service", "outcome"))
+SCAN_DURATION = registry.histogram(
+    "scan_duration_seconds", "Wall time of a full scan", ("service",))
+DETECTOR_DURATION = registry.histogram(
+    "detector_duration_seconds", "Threat detector time per analysed item", (),
+    buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by result (hit/miss)", ("cache", "result"))
+HTTP_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served")
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "Served requests", ("method", "endpoint", "status"))
+RATE_LIMIT_WAIT = registry.histogram(
+    "rate_limit_wait_seconds", "Time platform calls waited for a rate-limit token", ("service",),
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30))
+RATE_LIMITED = registry.counter(
+    "rate_limited_total", "Platform calls shed by the client-side rate limiter", ("service",))
+SCAN_JOBS = registry.counter(
+    "scan_jobs_total", "Finished asynchronous scan jobs by outcome", ("service", "state"))
+SCAN_JOBS_ACTIVE = registry.gauge(
+    "scan_jobs_active", "Asynchronous scan jobs queued or running", ("state",))
+SCAN_JOB_WAIT = registry.histogram(
+    "scan_job_queue_seconds", "Time asynchronous scan jobs waited for a worker", ("service",),
+    buckets=(0.01, 0.1, 0.5, 1, 5, 15, 30, 60, 300, 900))
+SHARD_LEASES = registry.gauge(
+    "shard_leases_held", "Ingestion shards this process holds a lease on", ("group",))
@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from config.settings import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("password_hasher")
+
+
+class HasherSaturated(Exception):
+    """
+    Raised when the hashing queue is full, or a hash did not finish within
+    PASSWORD_HASH_TIMEOUT; callers should answer 503
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+def normalize_method(method: str) -> str:
+    """Expand a werkzeug hash method to the full prefix stored in hashes"""
+    name, *params = method.split(":")
+    if name == "pbkdf2":
+        digest = params[0] if params else "sha256"
+        iterations = params[1] if len(params) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{digest}:{iterations}"
+    if name == "scrypt":
+        n, r, p = (params + ["32768", "8", "1"][len(params):])[:3]
+        return f"scrypt:{n}:{r}:{p}"
+    return method
+
+
+class PasswordHasher:
+    """
+    Password hashing on a dedicated, bounded thread pool
+
+    Request threads hand hashing to ``workers`` threads and wait for the
+    result, so at most ``workers`` PBKDF2 computations run at once no matter
+    how many logins arrive. Once ``workers + max_queue`` calls are in flight
+    new calls fail fast with HasherSaturated instead of queueing.
+    """
+
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self, method: str = None, workers: int = None,
+                 max_queue: int = None, timeout: float = None):
+        self.method = normalize_method(method or Config.PASSWORD_HASH_METHOD)
+        self.workers = workers or Config.PASSWORD_HASH_WORKERS
+        self.max_queue = max_queue if max_queue is not None else Config.PASSWORD_HASH_MAX_QUEUE
+        self.timeout = timeout or Config.PASSWORD_HASH_TIMEOUT
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latencies = {"hash": deque(maxlen=self.LATENCY_SAMPLES),
+                           "verify": deque(maxlen=self.LATENCY_SAMPLES)}
+        self._counts = {"hash": 0, "verify": 0, "rehash": 0, "rejected": 0, "timed_out": 0}
+
+    def _submit(self, kind: str, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise HasherSaturated(Config.PASSWORD_HASH_RETRY_AFTER)
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._latencies[kind].append(elapsed)
+                    self._counts[kind] += 1
+
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(timed)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _result(self, future: Future):
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            # The hash finishes in the background and frees its slot then
+            with self._lock:
+                self._counts["timed_out"] += 1
+            raise HasherSaturated(Config.PASSWORD_HASH_RETRY_AFTER) from None
+
+    def hash(self, password: str) -> str:
+        """Hash with the configured method; blocks the caller until done"""
+        return self._result(self._submit("hash", generate_password_hash, password, self.method))
+
+    def verify(self, stored_hash: str, password: str) -> bool:
+        return self._result(self._submit("verify", check_password_hash, stored_hash, password))
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """True if the stored hash was made with a different method or cost"""
+        return stored_hash.split("$", 1)[0] != self.method
+
+    def rehash_in_background(self, password: str, on_done: Callable[[str], Any]):
+        """
+        Re-hash with the current method without delaying the caller.
+        Skipped silently when the pool is saturated; it is retried on the next login.
+        """
+        try:
+            future = self._submit("hash", generate_password_hash, password, self.method)
+        except HasherSaturated:
+            return
+
+        def store(done: Future):
+            try:
+                on_done(done.result())
+                with self._lock:
+                    self._counts["rehash"] += 1
+            except Exception as e:
+                logger.warning(f"Password rehash failed: {e}")
+
+        future.add_done_callback(store)
+
+    def reset_after_fork(self):
+        """A forked child gets its own pool; the parent's hashing threads did not come along"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and latency percentiles in milliseconds"""
+        with self._lock:
+            latencies = {kind: sorted(samples) for kind, samples in self._latencies.items()}
+            counts = dict(self._counts)
+            in_flight = self._in_flight
+
+        return {
+            "method": self.method,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queued": max(in_flight - self.workers, 0),
+            "counts": counts,
+            "latency_ms": {kind: _percentiles(samples) for kind, samples in latencies.items()}
+        }
+
+
+def _percentiles(samples) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+
+    def pick(fraction):
+        return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 2)
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(samples[-1] * 1000, 2)}
+
+
+password_hasher = PasswordHasher()
+os.register_at_fork(after_in_child=password_hasher.reset_after_fork)
@@ -0,0 +1,88 @@
+"""
+Request-scoped stage timings for ?profile=1.
+
+Code on the scan path wraps its phases in ``stage("detect")`` or reports an
+already measured duration with ``record_stage``. Both are a single
+ContextVar lookup when the request is not being profiled.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+# Stage names used across the services and routes
+CONNECT = "connect"
+UPSTREAM_LIST = "upstream_list"
+ENRICH = "per_item_enrich"
+DETECT = "detect"
+SERIALIZE = "serialize"
+
+
+class StageTimings:
+    """
+    Accumulated time per stage for one request
+
+    Fan-out workers add to the same object, so stage totals can exceed
+    the request's wall time when targets run concurrently.
+    """
+
+    def __init__(self, cprofile_path: Optional[str] = None):
+        self.started = time.perf_counter()
+        self.cprofile_path = cprofile_path
+        self._totals = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage_name: str, seconds: float):
+        with self._lock:
+            self._totals[stage_name] = self._totals.get(stage_name, 0.0) + seconds
+            self._counts[stage_name] = self._counts.get(stage_name, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {"ms": round(total * 1000, 2), "count": self._counts[name]}
+                for name, total in self._totals.items()
+            }
+        timings = {"stages": stages, "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 2)}
+        if self.cprofile_path:
+            timings["cprofile_file"] = self.cprofile_path
+        return timings
+
+
+stage_timings_var = contextvars.ContextVar("stage_timings", default=None)
+
+
+def current_timings() -> Optional[StageTimings]:
+    return stage_timings_var.get()
+
+
+def record_stage(stage_name: str, seconds: float):
+    """Add an already measured duration to the current request's timings, if profiled"""
+    timings = stage_timings_var.get()
+    if timings is not None:
+        timings.add(stage_name, seconds)
+
+
+@contextmanager
+def stage(stage_name: str):
+    """Time the enclosed block as ``stage_name`` when the request is profiled"""
+    timings = stage_timings_var.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage_name, time.perf_counter() - started)
+
+
+def cprofile_path(directory: str, label: str) -> str:
+    """Where a request's cProfile capture is written (load with pstats / snakeviz)"""
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}.prof")
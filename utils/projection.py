@@ -0,0 +1,68 @@
+"""
+Field projection for detections (``?fields=``).
+
+Routes bind a FieldProjection for the request; services ask
+``projection.wants(name)`` before building costly fields (thumbnails,
+descriptions, metrics) and ``Detection.to_dict`` only emits the requested
+keys.
+"""
+
+import contextvars
+from typing import FrozenSet, Optional
+
+# Always sent so clients can tell records apart
+IDENTITY_FIELDS = frozenset({"type", "platform", "id"})
+
+FIELD_PROFILES = {
+    "summary": frozenset({"type", "platform", "id", "url", "created_at", "confidence", "category", "target"}),
+    "full": None
+}
+
+
+class FieldProjection:
+    """The set of detection fields a request asked for (None = all of them)"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Optional[FrozenSet[str]] = None):
+        self.fields = fields if fields is None else fields | IDENTITY_FIELDS
+
+    @property
+    def is_full(self) -> bool:
+        return self.fields is None
+
+    def wants(self, *names: str) -> bool:
+        """True if any of ``names`` (a field and its legacy aliases) was requested"""
+        return self.fields is None or any(name in self.fields for name in names)
+
+
+FULL = FieldProjection()
+
+
+def parse_fields(spec: Optional[str]) -> FieldProjection:
+    """
+    ``?fields=`` value to a projection: profile names (summary, full) and
+    field names may be mixed, e.g. ``summary,title``
+    """
+    if not spec:
+        return FULL
+
+    fields = set()
+    for name in (part.strip() for part in spec.split(",")):
+        if not name:
+            continue
+        if name in FIELD_PROFILES:
+            profile = FIELD_PROFILES[name]
+            if profile is None:
+                return FULL
+            fields |= profile
+        else:
+            fields.add(name)
+    return FieldProjection(frozenset(fields)) if fields else FULL
+
+
+projection_var = contextvars.ContextVar("field_projection", default=FULL)
+
+
+def current_projection() -> FieldProjection:
+    return projection_var.get()
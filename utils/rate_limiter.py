@@ -0,0 +1,421 @@
+"""
+Client-side pacing for platform APIs.
+
+Every (platform, credential) pair gets a token bucket sized from
+RATE_LIMITS, scaled down by RATE_LIMIT_HEADROOM. Platforms listed in
+RATE_LIMIT_PER_ENDPOINT (Twitter limits each endpoint separately) get one
+such bucket per endpoint. A call takes a token
+before it is sent; if none is available it waits up to RATE_LIMIT_MAX_WAIT
+and is otherwise shed with ``RateLimited`` instead of being sent to earn a
+429.
+
+Buckets follow the upstream's own accounting: ``x-rate-limit-remaining``
+(and the ``x-ratelimit-*`` / ``ratelimit-*`` variants) caps the tokens
+left, an exhausted window blocks the bucket until its reset, and
+``Retry-After`` blocks it for the time given. Headers only ever adjust the
+bucket of the call that returned them.
+
+State is per process by default; RATE_LIMIT_BACKEND=sqlite shares it
+between worker processes through a local SQLite file.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import Config
+from database import ConnectionPool
+from utils import metrics
+from utils.replay import upstream_transport
+from utils.upstream_cache import cached_http, cached_transport
+
+# Block this long after a 429 that carries no hint of when to retry
+DEFAULT_BACKOFF_SECONDS = 60.0
+
+REMAINING_HEADERS = ("x-rate-limit-remaining", "x-ratelimit-remaining", "ratelimit-remaining")
+RESET_HEADERS = ("x-rate-limit-reset", "x-ratelimit-reset", "ratelimit-reset")
+
+# Reset headers below this are "seconds from now", above it a Unix timestamp
+EPOCH_THRESHOLD = 10 ** 9
+
+# Numeric path segments after the first (the API version) are resource ids
+ID_SEGMENT = re.compile(r"(?<=.)/\d+(?=/|$)")
+
+
+class RateLimited(Exception):
+    """A call was shed because the platform's budget will not allow it soon enough"""
+
+    def __init__(self, platform: str, retry_after: float):
+        self.platform = platform
+        self.retry_after = retry_after
+        super().__init__(f"{platform} rate limit reached; retry in {retry_after:.0f}s")
+
+
+def shed_locally(error: BaseException) -> bool:
+    """
+    Whether ``error`` is, or wraps, a RateLimited shed: the call never left
+    this process (client libraries such as prawcore re-raise transport
+    errors as their own, keeping the original)
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, RateLimited):
+            return True
+        seen.add(id(error))
+        error = getattr(error, "original_exception", None) or error.__cause__ or error.__context__
+    return False
+
+
+class RateLimit:
+    """Token refill rate (per second) and burst capacity for one platform"""
+
+    __slots__ = ("rate", "capacity")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+
+def parse_rate_limits(spec: str, headroom: float = 1.0) -> Dict[str, RateLimit]:
+    """``"reddit:100/60,gnews:100/86400"`` (requests per seconds) to per-platform limits"""
+    limits = {}
+    for part in (spec or "").split(","):
+        platform, _, budget = part.strip().partition(":")
+        if not budget:
+            continue
+        requests_allowed, _, seconds = budget.partition("/")
+        allowed = float(requests_allowed) * headroom
+        limits[platform.strip().lower()] = RateLimit(allowed / float(seconds or 1), max(1.0, allowed))
+    return limits
+
+
+def endpoint_of(url: str) -> str:
+    """The endpoint a request URL calls: its path, ids replaced (/2/users/123 -> /2/users/:id)"""
+    return ID_SEGMENT.sub("/:id", urlsplit(url).path) or "/"
+
+
+class BucketState:
+    __slots__ = ("tokens", "updated", "blocked_until")
+
+    def __init__(self, tokens: float, updated: float, blocked_until: float = 0.0):
+        self.tokens = tokens
+        self.updated = updated
+        self.blocked_until = blocked_until
+
+    def refill(self, limit: RateLimit, now: float):
+        if now > self.updated:
+            self.tokens = min(limit.capacity, self.tokens + (now - self.updated) * limit.rate)
+            self.updated = now
+
+    def take(self, limit: RateLimit, cost: float, now: float) -> float:
+        """Take ``cost`` tokens and return 0, or return the seconds until they will be available"""
+        self.refill(limit, now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        cost = min(cost, limit.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / limit.rate
+
+    def adapt(self, limit: RateLimit, now: float, remaining: Optional[float], blocked_until: Optional[float]):
+        self.refill(limit, now)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+        if blocked_until is not None:
+            self.blocked_until = max(self.blocked_until, blocked_until)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class MemoryBackend:
+    """Buckets shared by the threads of one process"""
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: str, limit: RateLimit, now: float) -> BucketState:
+        state = self._buckets.get(key)
+        if state is None:
+            state = self._buckets[key] = BucketState(limit.capacity, now)
+        return state
+
+    def take(self, key: str, limit: RateLimit, cost: float, now: float) -> float:
+        with self._lock:
+            return self._state(key, limit, now).take(limit, cost, now)
+
+    def adapt(self, key: str, limit: RateLimit, now: float,
+              remaining: Optional[float] = None, blocked_until: Optional[float] = None):
+        with self._lock:
+            self._state(key, limit, now).adapt(limit, now, remaining, blocked_until)
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: {"tokens": state.tokens, "blocked_until": state.blocked_until}
+                    for key, state in self._buckets.items()}
+
+
+class SQLiteBackend:
+    """Buckets shared by every process using the same SQLite file"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated REAL NOT NULL,
+        blocked_until REAL NOT NULL
+    )
+    """
+    SELECT_BUCKET = "SELECT tokens, updated, blocked_until FROM rate_buckets WHERE key = ?"
+    UPSERT_BUCKET = "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, blocked_until) VALUES (?, ?, ?, ?)"
+    SELECT_ALL = "SELECT key, tokens, blocked_until FROM rate_buckets"
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.pool = ConnectionPool(path, busy_timeout_ms=busy_timeout_ms)
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._schema_ready and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self.pool.connection()
+        if not self._schema_ready:
+            conn.execute(self.SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _update(self, key: str, limit: RateLimit, now: float, change):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(self.SELECT_BUCKET, (key,)).fetchone()
+            state = BucketState(*row) if row else BucketState(limit.capacity, now)
+            result = change(state)
+            conn.execute(self.UPSERT_BUCKET, (key, state.tokens, state.updated, state.blocked_until))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def take(self, key: str, limit: RateLimit, cost: float, now: float) -> float:
+        return self._update(key, limit, now, lambda state: state.take(limit, cost, now))
+
+    def adapt(self, key: str, limit: RateLimit, now: float,
+              remaining: Optional[float] = None, blocked_until: Optional[float] = None):
+        self._update(key, limit, now, lambda state: state.adapt(limit, now, remaining, blocked_until))
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        return {key: {"tokens": tokens, "blocked_until": blocked_until}
+                for key, tokens, blocked_until in self._connection().execute(self.SELECT_ALL)}
+
+
+def _header(headers: Mapping[str, str], names) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _retry_after(value: Optional[str], now: float) -> Optional[float]:
+    """Retry-After as an absolute time; it is either seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return now + float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token buckets per (platform, credential), or per (platform, credential,
+    endpoint) for ``per_endpoint`` platforms, on a memory or SQLite backend
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit], backend, max_wait: float = 10.0,
+                 per_endpoint: Iterable[str] = ()):
+        self.limits = limits
+        self.backend = backend
+        self.max_wait = max_wait
+        self.per_endpoint = set(per_endpoint)
+
+    @staticmethod
+    def bucket_key(platform: str, credential: Optional[str], endpoint: Optional[str] = None) -> str:
+        # Credentials are secrets; only a short digest is stored
+        digest = hashlib.blake2b((credential or "").encode(), digest_size=6).hexdigest()
+        if endpoint:
+            return f"{platform}:{digest}:{endpoint}"
+        return f"{platform}:{digest}"
+
+    def _key(self, platform: str, credential: Optional[str], endpoint: Optional[str]) -> str:
+        return self.bucket_key(platform, credential, endpoint if platform in self.per_endpoint else None)
+
+    def acquire(self, platform: str, credential: Optional[str] = None, cost: float = 1,
+                max_wait: Optional[float] = None, endpoint: Optional[str] = None) -> float:
+        """
+        Take ``cost`` tokens for one call, waiting up to ``max_wait`` seconds
+        for them. Returns the time waited; raises RateLimited when the wait
+        would be longer. Platforms without a configured limit pass straight
+        through; ``endpoint`` only matters for per-endpoint platforms.
+        """
+        limit = self.limits.get(platform)
+        if limit is None:
+            return 0.0
+
+        key = self._key(platform, credential, endpoint)
+        started = time.time()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        while True:
+            now = time.time()
+            wait = self.backend.take(key, limit, cost, now)
+            if wait <= 0:
+                waited = now - started
+                metrics.RATE_LIMIT_WAIT.observe(waited, platform)
+                return waited
+            if now + wait > deadline:
+                metrics.RATE_LIMITED.inc(platform)
+                raise RateLimited(platform, wait)
+            time.sleep(wait)
+
+    def observe(self, platform: str, credential: Optional[str], status: Optional[int],
+                headers: Optional[Mapping[str, str]], endpoint: Optional[str] = None):
+        """Fold an upstream response's rate-limit headers (and any 429) into the bucket the call took from"""
+        limit = self.limits.get(platform)
+        if limit is None:
+            return
+
+        now = time.time()
+        headers = {str(name).lower(): value for name, value in (headers or {}).items()}
+        remaining = _header(headers, REMAINING_HEADERS)
+        reset = _header(headers, RESET_HEADERS)
+        if reset is not None and reset < EPOCH_THRESHOLD:
+            reset += now
+
+        blocked_until = _retry_after(headers.get("retry-after"), now)
+        if blocked_until is None and remaining is not None and remaining < 1 and reset is not None:
+            blocked_until = reset
+        if blocked_until is None and status == 429:
+            blocked_until = reset if reset is not None else now + DEFAULT_BACKOFF_SECONDS
+
+        if remaining is not None or blocked_until is not None:
+            self.backend.adapt(self._key(platform, credential, endpoint), limit, now, remaining, blocked_until)
+
+    def status(self) -> Dict[str, Dict[str, float]]:
+        now = time.time()
+        return {
+            key: {"tokens": round(state["tokens"], 2),
+                  "blocked_for_seconds": round(max(0.0, state["blocked_until"] - now), 1)}
+            for key, state in self.backend.status().items()
+        }
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    requests transport adapter that paces every request through a RateLimiter,
+    then sends it itself or through ``transport`` (see utils.replay)
+    """
+
+    def __init__(self, limiter: RateLimiter, platform: str, credential: Optional[str] = None,
+                 transport: Optional[HTTPAdapter] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.platform = platform
+        self.credential = credential
+        self.transport = transport
+
+    def send(self, request, **kwargs):
+        endpoint = endpoint_of(request.url)
+        self.limiter.acquire(self.platform, self.credential, endpoint=endpoint)
+        if self.transport is not None:
+            response = self.transport.send(request, **kwargs)
+        else:
+            response = super().send(request, **kwargs)
+        self.limiter.observe(self.platform, self.credential, response.status_code, response.headers, endpoint)
+        return response
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+        super().close()
+
+
+
+class RateLimitedHttp:
+    """
+    The httplib2 side of RateLimitedAdapter, for googleapiclient-based
+    clients; ``cost`` maps a request URI to the units it spends (default 1)
+    """
+
+    def __init__(self, limiter: RateLimiter, platform: str, credential: Optional[str], http,
+                 cost: Optional[Callable[[str], float]] = None):
+        self.limiter = limiter
+        self.platform = platform
+        self.credential = credential
+        self.http = http
+        self.cost = cost
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        endpoint = endpoint_of(uri)
+        self.limiter.acquire(self.platform, self.credential, self.cost(uri) if self.cost else 1, endpoint=endpoint)
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        # httplib2's response is itself the header dict
+        self.limiter.observe(self.platform, self.credential, response.status, response, endpoint)
+        return response, content
+
+    def close(self):
+        close = getattr(self.http, "close", None)
+        if close:
+            close()
+
+
+def rate_limited_session(platform: str, credential: Optional[str] = None,
+                         session: Optional[requests.Session] = None) -> requests.Session:
+    """
+    A requests session (new, or the client library's own) paced by
+    ``rate_limiter``, behind the shared response cache (utils.upstream_cache)
+    """
+    session = session or requests.Session()
+    adapter = RateLimitedAdapter(rate_limiter, platform, credential, transport=upstream_transport(platform))
+    # Cache hits are answered before the limiter, so they spend no budget
+    adapter = cached_transport(platform, credential, adapter)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def rate_limited_http(platform: str, credential: Optional[str], http,
+                      cost: Optional[Callable[[str], float]] = None):
+    """The httplib2 counterpart of rate_limited_session"""
+    return cached_http(platform, credential, RateLimitedHttp(rate_limiter, platform, credential, http, cost))
+
+
+def _backend():
+    if Config.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteBackend(Config.RATE_LIMIT_DB_PATH, busy_timeout_ms=Config.AUTH_DB_BUSY_TIMEOUT_MS)
+    return MemoryBackend()
+
+
+rate_limiter = RateLimiter(
+    parse_rate_limits(Config.RATE_LIMITS, Config.RATE_LIMIT_HEADROOM),
+    _backend(),
+    max_wait=Config.RATE_LIMIT_MAX_WAIT,
+    per_endpoint=[name.strip().lower() for name in Config.RATE_LIMIT_PER_ENDPOINT.split(",") if name.strip()]
+)
@@ -0,0 +1,303 @@
+"""
+Record/replay of upstream platform traffic for offline performance runs.
+
+UPSTREAM_MODE picks how platform calls are made:
+
+- ``live``: straight to the platform (default)
+- ``record``: to the platform, with every exchange appended to a gzip'd
+  JSON-lines cassette per platform in CASSETTE_DIR
+- ``replay``: answered from the cassettes, never touching the network,
+  with UPSTREAM_FAKE_LATENCY_MS and UPSTREAM_FAKE_ERROR_RATE injected
+
+UPSTREAM_BASE_URLS (``platform=url,...``) points a platform at another host
+instead, e.g. the local stand-ins in ``benchmarks/fake_upstreams.py``.
+
+Requests-based clients get this through the transport returned by
+``upstream_transport``; the YouTube client (httplib2) through
+``upstream_http`` and ``youtube_client_options``.
+"""
+
+import base64
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from config.settings import Config
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+# Never written to a cassette
+SECRET_PARAMS = frozenset({"apikey", "api_key", "key", "token", "access_token", "client_secret", "password"})
+# Differ on every run (time windows), so they are ignored when matching
+VOLATILE_PARAMS = frozenset({"from", "start_time", "publishedafter", "_"})
+DROPPED_HEADERS = frozenset({"set-cookie", "content-encoding", "transfer-encoding", "content-length", "connection"})
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Replay mode found no recorded exchange for a request"""
+
+
+def parse_base_urls(spec: str) -> Dict[str, str]:
+    """``"gnews=http://127.0.0.1:8804,reddit=..."`` to {platform: base url}"""
+    urls = {}
+    for part in (spec or "").split(","):
+        platform, _, url = part.strip().partition("=")
+        if url:
+            urls[platform.strip().lower()] = url.strip().rstrip("/")
+    return urls
+
+
+def redact_url(url: str) -> str:
+    """URL without credential query parameters"""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in SECRET_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def match_keys(method: str, url: str) -> Tuple[str, str]:
+    """(exact, loose) lookup keys: path plus stable query, and path alone"""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name.lower() not in SECRET_PARAMS and name.lower() not in VOLATILE_PARAMS)
+    return f"{method} {parts.path}?{urlencode(query)}", f"{method} {parts.path}"
+
+
+def rebase_url(url: str, base_url: str) -> str:
+    """Send ``url`` to ``base_url``'s scheme and host, keeping path and query"""
+    parts, base = urlsplit(url), urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+
+class FaultInjector:
+    """Added latency and random failures for replayed and fake responses"""
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+
+    def should_fail(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+class Cassette:
+    """Recorded exchanges of one platform, as a gzip'd JSON-lines file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as cassette_file:
+            for line in cassette_file:
+                if line.strip():
+                    self._index(json.loads(line))
+
+    def _index(self, exchange: Dict[str, Any]):
+        for key in match_keys(exchange["method"], exchange["url"]):
+            self._by_key.setdefault(key, []).append(exchange)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return sum(len(exchanges) for key, exchanges in self._by_key.items() if "?" not in key)
+
+    def record(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes, elapsed: float):
+        exchange = {
+            "method": method,
+            "url": redact_url(url),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+            "body": base64.b64encode(body).decode("ascii"),
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "recorded_at": time.time()
+        }
+        with self._lock:
+            self._load()
+            self._index(exchange)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending adds a gzip member; readers see one continuous stream
+            with gzip.open(self.path, "at", encoding="utf-8") as cassette_file:
+                cassette_file.write(json.dumps(exchange) + "\n")
+
+    def find(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """Next recorded exchange for this request, cycling through repeats"""
+        with self._lock:
+            self._load()
+            for key in match_keys(method, url):
+                exchanges = self._by_key.get(key)
+                if exchanges:
+                    cursor = self._cursors.get(key, 0)
+                    self._cursors[key] = cursor + 1
+                    return exchanges[cursor % len(exchanges)]
+        return None
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette_for(platform: str) -> Cassette:
+    with _cassettes_lock:
+        cassette = _cassettes.get(platform)
+        if cassette is None:
+            cassette = _cassettes[platform] = Cassette(os.path.join(Config.CASSETTE_DIR, f"{platform}.jsonl.gz"))
+        return cassette
+
+
+def build_response(request, status: int, headers: Dict[str, str], body: bytes,
+                   reason: str = "Replayed") -> requests.Response:
+    """A requests Response for a stored exchange, as if ``request`` had been sent"""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.url = request.url
+    response.request = request
+    response.reason = reason
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def default_faults() -> FaultInjector:
+    return FaultInjector(Config.UPSTREAM_FAKE_LATENCY_MS, Config.UPSTREAM_FAKE_ERROR_RATE)
+
+
+def _fault_body() -> bytes:
+    return json.dumps({"error": "injected upstream failure"}).encode()
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    requests transport for one platform: rewrites it to UPSTREAM_BASE_URLS,
+    records its exchanges, or answers them from its cassette
+    """
+
+    def __init__(self, platform: str, mode: str = LIVE, base_url: Optional[str] = None,
+                 cassette: Optional[Cassette] = None, faults: Optional[FaultInjector] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.platform = platform
+        self.mode = mode
+        self.base_url = base_url
+        self.cassette = cassette
+        self.faults = faults or FaultInjector()
+
+    def send(self, request, **kwargs):
+        if self.base_url:
+            request.url = rebase_url(request.url, self.base_url)
+
+        if self.mode == REPLAY:
+            return self._replay(request)
+
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        if self.mode == RECORD:
+            self.cassette.record(request.method, request.url, response.status_code,
+                                 dict(response.headers), response.content, time.perf_counter() - started)
+        return response
+
+    def _replay(self, request) -> requests.Response:
+        self.faults.delay()
+        if self.faults.should_fail():
+            return build_response(request, 503, {"Content-Type": "application/json"}, _fault_body())
+
+        exchange = self.cassette.find(request.method, request.url)
+        if exchange is None:
+            raise CassetteMiss(f"No recorded {self.platform} exchange for {request.method} {redact_url(request.url)}",
+                               request=request)
+        return build_response(request, exchange["status"], exchange["headers"], base64.b64decode(exchange["body"]))
+
+
+def upstream_transport(platform: str) -> Optional[ReplayAdapter]:
+    """Transport for a platform's requests session, or None to send live as usual"""
+    base_url = parse_base_urls(Config.UPSTREAM_BASE_URLS).get(platform)
+    mode = Config.UPSTREAM_MODE
+    if mode == LIVE and not base_url:
+        return None
+    return ReplayAdapter(platform, mode, base_url, cassette_for(platform), default_faults())
+
+
+class ReplayHttp:
+    """The httplib2 side of ReplayAdapter, for googleapiclient-based clients"""
+
+    def __init__(self, platform: str, mode: str, cassette: Cassette, faults: FaultInjector, http=None):
+        import httplib2
+
+        self.platform = platform
+        self.mode = mode
+        self.cassette = cassette
+        self.faults = faults
+        self.http = http or httplib2.Http(timeout=30)
+        self._response_class = httplib2.Response
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if self.mode == REPLAY:
+            self.faults.delay()
+            if self.faults.should_fail():
+                return self._response(503, {"content-type": "application/json"}), _fault_body()
+            exchange = self.cassette.find(method, uri)
+            if exchange is None:
+                raise CassetteMiss(f"No recorded {self.platform} exchange for {method} {redact_url(uri)}")
+            return self._response(exchange["status"], exchange["headers"]), base64.b64decode(exchange["body"])
+
+        started = time.perf_counter()
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if self.mode == RECORD:
+            headers = {name: value for name, value in response.items() if name != "status"}
+            self.cassette.record(method, uri, response.status, headers, content, time.perf_counter() - started)
+        return response, content
+
+    def _response(self, status: int, headers: Dict[str, str]):
+        response = self._response_class({name.lower(): value for name, value in headers.items()})
+        response.status = status
+        response.reason = "Replayed"
+        return response
+
+    def close(self):
+        close = getattr(self.http, "close", None)
+        if close:
+            close()
+
+
+def upstream_http(platform: str) -> Optional[ReplayHttp]:
+    """httplib2-compatible transport for record/replay, or None in live mode"""
+    mode = Config.UPSTREAM_MODE
+    if mode == LIVE:
+        return None
+    return ReplayHttp(platform, mode, cassette_for(platform), default_faults())
+
+
+def youtube_client_options() -> Optional[Dict[str, str]]:
+    """googleapiclient client_options pointing YouTube at UPSTREAM_BASE_URLS, if set"""
+    base_url = parse_base_urls(Config.UPSTREAM_BASE_URLS).get("youtube")
+    return {"api_endpoint": base_url + "/"} if base_url else None
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+
+class StackSampler:
+    """
+    Low-overhead wall-clock sampler for every thread of the process
+
+    A background thread reads ``sys._current_frames()`` every ``interval``
+    seconds and counts each stack. ``collapsed()`` returns the counts in the
+    folded format read by flamegraph.pl, speedscope and inferno:
+    ``thread;outer (file:line);...;inner (file:line) count``.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                self._stacks[self._fold(names.get(ident, f"thread-{ident}"), frame)] += 1
+            self.samples += 1
+
+    def _fold(self, thread_name: str, frame) -> str:
+        frames = []
+        while frame is not None:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        frames.append(thread_name)
+        return ";".join(reversed(frames))
+
+    def _label(self, code) -> str:
+        # Cached per code object: building the label is the expensive part
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def status(self) -> Dict[str, Any]:
+        end = self.stopped_at or time.time()
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "samples": self.samples,
+            "unique_stacks": len(self._stacks),
+            "duration_seconds": round(end - self.started_at, 2) if self.started_at else 0.0
+        }
+
+
+def _short_path(path: str) -> str:
+    """Path relative to the app or site-packages, so stacks stay readable"""
+    for root in (os.getcwd(), *sys.path):
+        if root and path.startswith(root + os.sep):
+            return path[len(root) + 1:]
+    return path
+
+
+def sample_for(seconds: float, interval: float = 0.01, sampler: Optional[StackSampler] = None) -> StackSampler:
+    """Run a sampler for ``seconds`` and return it stopped"""
+    sampler = sampler or StackSampler(interval)
+    sampler.start()
+    time.sleep(seconds)
+    sampler.stop()
+    return sampler
@@ -0,0 +1,332 @@
+"""
+Cross-scan record of items already fetched and analyzed.
+
+Consecutive scans overlap heavily (the same newest posts, the same week of
+tweets and articles). Services ask ``seen_items.check_and_add(key)`` before
+running the detector; a repeat is skipped or flagged depending on the
+request's repeat mode (``?repeats=skip|flag|off``).
+
+The set is a pair of Bloom filters: new keys go into the current one, and
+once it holds ``capacity`` keys it becomes the previous one and a fresh
+filter takes its place. Memory stays fixed at two filters, the oldest keys
+age out, and false positives stay near ``error_rate``. The filters are
+snapshotted to disk so a restart does not re-report everything.
+
+Each process writes its own snapshot (``<path>.<pid>``) and, on every
+snapshot cycle, ORs the other processes' snapshots into its filters, so
+gunicorn workers converge on one set of seen items within
+SEEN_FILTER_SNAPSHOT_SECONDS and a restart keeps what every worker saw.
+Snapshots of processes that are gone are deleted once merged.
+"""
+
+import atexit
+import contextvars
+import glob
+import hashlib
+import math
+import os
+import struct
+import threading
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from config.settings import Config
+
+SKIP = "skip"
+FLAG = "flag"
+OFF = "off"
+REPEAT_MODES = (SKIP, FLAG, OFF)
+
+SNAPSHOT_MAGIC = b"SEEN1"
+SNAPSHOT_HEADER = struct.Struct("<5sQIQQ")  # magic, bits, hashes, current count, previous count
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (double hashing on blake2b)"""
+
+    __slots__ = ("size", "hashes", "bits", "count")
+
+    def __init__(self, size: int, hashes: int, bits: Optional[bytearray] = None, count: int = 0):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float) -> "BloomFilter":
+        size = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hashes = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hashes)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        second |= 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Insert ``key``; True if it (probably) was already present"""
+        present = True
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                present = False
+        if not present:
+            self.count += 1
+        return present
+
+    def merge(self, other: "BloomFilter") -> bool:
+        """OR ``other`` into this filter; True if any bit changed"""
+        mine = int.from_bytes(self.bits, "little")
+        merged = mine | int.from_bytes(other.bits, "little")
+        if merged == mine:
+            return False
+        self.bits = bytearray(merged.to_bytes(len(self.bits), "little"))
+        # Keys both filters hold are counted once: estimate from the bits set
+        filled = min(merged.bit_count(), self.size - 1)
+        estimate = round(-self.size / self.hashes * math.log(1 - filled / self.size))
+        self.count = max(self.count, other.count, estimate)
+        return True
+
+
+class SeenFilter:
+    """Rotating pair of Bloom filters with periodic snapshots to ``path``"""
+
+    def __init__(self, capacity: int, error_rate: float, path: str = "", snapshot_seconds: float = 60.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.snapshot_seconds = snapshot_seconds
+        self.current = BloomFilter.for_capacity(capacity, error_rate)
+        self.previous = None
+        self.rotations = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._snapshotter = None
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.current or (self.previous is not None and key in self.previous)
+
+    def check_and_add(self, key: str) -> bool:
+        """Record ``key``; True if an earlier scan already saw it"""
+        with self._lock:
+            if self.previous is not None and key in self.previous:
+                # Keep recently seen keys alive across the next rotation
+                self.current.add(key)
+                seen = True
+            else:
+                seen = self.current.add(key)
+            if not seen:
+                self._dirty = True
+                if self.current.count >= self.capacity:
+                    self.previous = self.current
+                    self.current = BloomFilter(self.previous.size, self.previous.hashes)
+                    self.rotations += 1
+            return seen
+
+    def clear(self):
+        """Forget every key here and on disk (other live processes keep theirs in memory)"""
+        with self._lock:
+            self.current = BloomFilter.for_capacity(self.capacity, self.error_rate)
+            self.previous = None
+            self._dirty = True
+        if self.path:
+            for _pid, path in self._snapshot_files():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "error_rate": self.error_rate,
+                "current_count": self.current.count,
+                "previous_count": self.previous.count if self.previous is not None else 0,
+                "rotations": self.rotations,
+                "memory_bytes": len(self.current.bits) + (len(self.previous.bits) if self.previous is not None else 0),
+                "snapshot_path": self.path or None
+            }
+
+    # ---- snapshots ----
+
+    def _snapshot_files(self) -> List[Tuple[Optional[int], str]]:
+        """(pid, path) of every snapshot on disk; pid is None for an unpartitioned one"""
+        files = [(None, self.path)] if os.path.exists(self.path) else []
+        for path in glob.glob(glob.escape(self.path) + ".*"):
+            suffix = path.rsplit(".", 1)[1]
+            if suffix.isdigit():
+                files.append((int(suffix), path))
+        return files
+
+    def _read(self, path: str) -> Optional[Tuple[BloomFilter, BloomFilter]]:
+        try:
+            with open(path, "rb") as snapshot_file:
+                data = snapshot_file.read()
+            magic, size, hashes, current_count, previous_count = SNAPSHOT_HEADER.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+
+        expected = BloomFilter.for_capacity(self.capacity, self.error_rate)
+        length = (size + 7) // 8
+        if (magic != SNAPSHOT_MAGIC or (size, hashes) != (expected.size, expected.hashes)
+                or len(data) != SNAPSHOT_HEADER.size + 2 * length):
+            # Written with other settings; start over rather than misread it
+            return None
+
+        offset = SNAPSHOT_HEADER.size
+        return (BloomFilter(size, hashes, bytearray(data[offset:offset + length]), current_count),
+                BloomFilter(size, hashes, bytearray(data[offset + length:]), previous_count))
+
+    def _merge_snapshots(self) -> List[str]:
+        """
+        OR the other processes' snapshots into the filters; returns the
+        merged files whose process is gone
+        """
+        own_pid = os.getpid()
+        stale = []
+        for pid, path in self._snapshot_files():
+            if pid == own_pid:
+                continue
+            filters = self._read(path)
+            if filters is None:
+                continue
+            with self._lock:
+                if self.previous is None:
+                    self.previous = BloomFilter(self.current.size, self.current.hashes)
+                changed = self.current.merge(filters[0])
+                changed = self.previous.merge(filters[1]) or changed
+                if changed:
+                    self._dirty = True
+            if pid is None or not _process_alive(pid):
+                stale.append(path)
+        return stale
+
+    def load(self) -> bool:
+        """Merge every snapshot under ``path`` into the filters; False if there is none usable"""
+        if not self.path:
+            return False
+        with self._lock:
+            unsaved, self._dirty = self._dirty, False
+        self._merge_snapshots()
+        with self._lock:
+            merged = self._dirty
+            self._dirty = merged or unsaved
+        return merged
+
+    def snapshot(self):
+        """
+        Fold in the other processes' snapshots, write ours (atomically) if
+        anything changed, then drop the merged snapshots of exited processes
+        """
+        if not self.path:
+            return
+        stale = self._merge_snapshots()
+        data = None
+        with self._lock:
+            if self._dirty:
+                previous = self.previous or BloomFilter(self.current.size, self.current.hashes)
+                data = b"".join((
+                    SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.current.size, self.current.hashes,
+                                         self.current.count, previous.count),
+                    bytes(self.current.bits),
+                    bytes(previous.bits)
+                ))
+                self._dirty = False
+
+        if data is not None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            own_path = f"{self.path}.{os.getpid()}"
+            temp_path = f"{own_path}.tmp"
+            with open(temp_path, "wb") as snapshot_file:
+                snapshot_file.write(data)
+            os.replace(temp_path, own_path)
+
+        # Their keys are in our snapshot on disk now (they changed nothing
+        # if there was nothing to write)
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def start(self):
+        """Load the last snapshot and write a new one every snapshot_seconds (no-op without a path)"""
+        if not self.path or (self._snapshotter and self._snapshotter.is_alive()):
+            return
+        self.load()
+        self._stopped.clear()
+        self._start_snapshotter()
+
+    def _start_snapshotter(self):
+        self._snapshotter = threading.Thread(target=self._snapshot_loop, name="seen-filter-snapshot", daemon=True)
+        self._snapshotter.start()
+
+    def _snapshot_loop(self):
+        while not self._stopped.wait(self.snapshot_seconds):
+            try:
+                self.snapshot()
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stopped.set()
+        try:
+            self.snapshot()
+        except OSError:
+            pass
+
+    def reset_after_fork(self):
+        """A forked child keeps the inherited filters but needs its own snapshot thread"""
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if self._snapshotter is not None:
+            self._start_snapshotter()
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def canonical_url(url: str) -> str:
+    """Identity of an article URL: scheme and host lower-cased, query and fragment dropped"""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+
+
+seen_items = SeenFilter(Config.SEEN_FILTER_CAPACITY, Config.SEEN_FILTER_ERROR_RATE,
+                        Config.SEEN_FILTER_PATH, Config.SEEN_FILTER_SNAPSHOT_SECONDS)
+
+os.register_at_fork(after_in_child=seen_items.reset_after_fork)
+atexit.register(seen_items.stop)
+
+
+repeat_mode_var = contextvars.ContextVar("repeat_mode", default=Config.SEEN_FILTER_MODE)
+
+
+def current_repeat_mode() -> str:
+    return repeat_mode_var.get()
+
+
+def parse_repeat_mode(value: Optional[str]) -> str:
+    """``?repeats=`` value to a mode, falling back to SEEN_FILTER_MODE"""
+    value = (value or "").strip().lower()
+    return value if value in REPEAT_MODES else Config.SEEN_FILTER_MODE
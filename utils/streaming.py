@@ -0,0 +1,75 @@
+import time
+from datetime import datetime
+
+from utils.json_codec import dumps
+from utils.profiling import SERIALIZE, current_timings, record_stage
+
+
+def ndjson_stream(stream, service_name):
+    """
+    Encode a service detection stream as newline-delimited JSON
+
+    Each detection is written as soon as the service yields it, followed by
+    a single summary line built from the service's final response.
+
+    Args:
+        stream: Generator returned by ``BaseService.stream_data``
+        service_name (str): Service name used in error lines
+
+    Yields:
+        str: One JSON document per line
+    """
+    started = time.perf_counter()
+    first_detection_ms = None
+    emitted = 0
+
+    try:
+        while True:
+            try:
+                detection = next(stream)
+            except StopIteration as stop:
+                response = stop.value
+                break
+
+            if first_detection_ms is None:
+                first_detection_ms = round((time.perf_counter() - started) * 1000, 2)
+            emitted += 1
+            encode_started = time.perf_counter()
+            line = dumps({"event": "detection", "data": detection.to_dict()}) + "\n"
+            record_stage(SERIALIZE, time.perf_counter() - encode_started)
+            yield line
+
+    except Exception as e:
+        yield dumps({
+            "event": "summary",
+            "service": service_name,
+            "success": False,
+            "error": str(e),
+            "timestamp": datetime.utcnow().isoformat()
+        }) + "\n"
+        return
+
+    summary = {key: value for key, value in response.get("data", {}).items() if key != "detections"}
+    posts_scanned = sum(value for key, value in summary.items() if key.endswith("_scanned"))
+    timings = {
+        "first_detection_ms": first_detection_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+    stage_timings = current_timings()
+    if stage_timings is not None:
+        # ?profile=1
+        timings.update(stage_timings.as_dict())
+
+    yield dumps({
+        "event": "summary",
+        "service": response.get("service", service_name),
+        "success": response.get("success"),
+        "message": response.get("message"),
+        "error": response.get("error"),
+        "posts_scanned": posts_scanned,
+        "threats_found": summary.get("threats_found", 0),
+        "data": summary,
+        "detections_emitted": emitted,
+        "timings": timings,
+        "timestamp": response.get("timestamp")
+    }) + "\n"
@@ -0,0 +1,389 @@
+"""
+Platform API response cache shared by worker processes and restarts.
+
+Off unless UPSTREAM_CACHE_TTLS gives a platform a TTL. Successful GET
+responses are then kept for that long in two tiers: a small in-process LRU in front of a
+SQLite (WAL) key-value store at UPSTREAM_CACHE_PATH holding the responses
+zlib-compressed. Every worker reads and fills the same file, so a scan one
+worker ran is a hit for the others, and a restarted server starts warm
+instead of re-fetching everything at once. Concurrent identical misses in
+one process wait for the first instead of all going upstream.
+
+The cache sits in front of the rate limiter, so hits spend no platform
+budget. Per request, ``?cache=refresh`` skips the lookup (the fresh
+response is still stored) and ``?cache=off`` bypasses the cache.
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from config.settings import Config
+from database import ConnectionPool
+from utils import metrics
+from utils.logger import setup_logger
+from utils.replay import DROPPED_HEADERS, build_response, match_keys
+
+logger = setup_logger("upstream_cache")
+
+USE = "use"
+REFRESH = "refresh"
+OFF = "off"
+CACHE_MODES = (USE, REFRESH, OFF)
+
+# Identity and connection checks always go upstream: a cached answer would
+# hide revoked or broken credentials
+UNCACHED_PATHS = ("/api/v1/me", "/2/users/me")
+
+# Expired rows are swept, and the store trimmed to max_rows, every this many writes
+PURGE_EVERY = 200
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """``"reddit:60,youtube:300"`` to {platform: seconds}"""
+    ttls = {}
+    for part in (spec or "").split(","):
+        platform, _, seconds = part.strip().partition(":")
+        if seconds:
+            ttls[platform.strip().lower()] = float(seconds)
+    return ttls
+
+
+def cacheable(method: str, url: str) -> bool:
+    return method == "GET" and not urlsplit(url).path.rstrip("/").endswith(UNCACHED_PATHS)
+
+
+def encode_entry(status: int, headers: Mapping[str, str], body: bytes) -> bytes:
+    """One JSON line of status and headers, then the raw body"""
+    head = {"status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}}
+    return json.dumps(head).encode() + b"\n" + body
+
+
+def decode_entry(value: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    head, _, body = value.partition(b"\n")
+    head = json.loads(head)
+    return head["status"], head["headers"], body
+
+
+class MemoryTier:
+    """Most recently used entries of this process, each with its own expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[0]
+
+    def set(self, key: str, value: bytes, expires: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(len(value) for _, value in self._entries.values())
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+
+
+class SQLiteStore:
+    """Entries shared by every process using the same SQLite file"""
+
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS upstream_cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS upstream_cache_expires ON upstream_cache (expires)"
+    )
+    SELECT_ENTRY = "SELECT value, expires FROM upstream_cache WHERE key = ? AND expires > ?"
+    UPSERT_ENTRY = "INSERT OR REPLACE INTO upstream_cache (key, value, expires) VALUES (?, ?, ?)"
+    DELETE_EXPIRED = "DELETE FROM upstream_cache WHERE expires <= ?"
+    # Soonest-expiring rows go first once the store holds more than max_rows
+    TRIM = """
+    DELETE FROM upstream_cache WHERE key IN (
+        SELECT key FROM upstream_cache ORDER BY expires
+        LIMIT max(0, (SELECT count(*) FROM upstream_cache) - ?)
+    )
+    """
+    SELECT_STATS = "SELECT count(*), coalesce(sum(length(value)), 0) FROM upstream_cache WHERE expires > ?"
+    DELETE_ALL = "DELETE FROM upstream_cache"
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, max_rows: int = 20000, compress_level: int = 6):
+        self.path = path
+        self.max_rows = max_rows
+        self.compress_level = compress_level
+        self.pool = ConnectionPool(path, busy_timeout_ms=busy_timeout_ms)
+        self._schema_ready = False
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._schema_ready and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self.pool.connection()
+        if not self._schema_ready:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._schema_ready = True
+        return conn
+
+    def get(self, key: str, now: float) -> Optional[Tuple[bytes, float]]:
+        row = self._connection().execute(self.SELECT_ENTRY, (key, now)).fetchone()
+        return (zlib.decompress(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: bytes, expires: float):
+        conn = self._connection()
+        conn.execute(self.UPSERT_ENTRY, (key, zlib.compress(value, self.compress_level), expires))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge(time.time())
+
+    def purge(self, now: float):
+        conn = self._connection()
+        conn.execute(self.DELETE_EXPIRED, (now,))
+        conn.execute(self.TRIM, (self.max_rows,))
+
+    def clear(self):
+        self._connection().execute(self.DELETE_ALL)
+
+    def status(self) -> Dict[str, int]:
+        rows, stored_bytes = self._connection().execute(self.SELECT_STATS, (time.time(),)).fetchone()
+        return {"rows": rows, "stored_bytes": stored_bytes}
+
+
+class SharedCache:
+    """The in-process tier over the optional shared store, with per-platform TTLs"""
+
+    def __init__(self, ttls: Dict[str, float], memory_entries: int = 512, store: Optional[SQLiteStore] = None):
+        self.ttls = ttls
+        self.memory = MemoryTier(memory_entries)
+        self.store = store
+        self._in_flight: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def ttl(self, platform: str) -> float:
+        return self.ttls.get(platform, 0.0)
+
+    @staticmethod
+    def key(platform: str, credential: Optional[str], method: str, url: str) -> str:
+        # Time-window parameters are left out (see utils.replay), so a
+        # window shifted by less than the TTL still hits
+        exact, _ = match_keys(method, url)
+        digest = hashlib.blake2b(f"{credential or ''}\n{exact}".encode(), digest_size=16).hexdigest()
+        return f"{platform}:{digest}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        entry = self.memory.get(key, now)
+        metrics.CACHE_REQUESTS.inc("upstream_memory", "hit" if entry else "miss")
+        if entry is not None or self.store is None:
+            return entry[0] if entry else None
+
+        try:
+            entry = self.store.get(key, now)
+        except (sqlite3.Error, zlib.error) as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            entry = None
+        metrics.CACHE_REQUESTS.inc("upstream_shared", "hit" if entry else "miss")
+        if entry is None:
+            return None
+        value, expires = entry
+        self.memory.set(key, value, expires)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        expires = time.time() + ttl
+        self.memory.set(key, value, expires)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, expires)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache write failed: {e}")
+
+    @contextmanager
+    def single_flight(self, key: str):
+        """Hold the key's lock, so only one thread per process fetches it at a time"""
+        with self._lock:
+            slot = self._in_flight.get(key)
+            if slot is None:
+                slot = self._in_flight[key] = [threading.Lock(), 0]
+            slot[1] += 1
+        try:
+            with slot[0]:
+                yield
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._in_flight[key]
+
+    def clear(self):
+        self.memory.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def status(self) -> Dict[str, object]:
+        status = {
+            "ttls": self.ttls,
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "memory_bytes": self.memory.memory_bytes(),
+            "shared": None
+        }
+        if self.store is not None:
+            status["shared"] = {"path": self.store.path, "max_rows": self.store.max_rows, **self.store.status()}
+        return status
+
+    def reset_after_fork(self):
+        self.memory.reset_after_fork()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+
+cache_mode_var = contextvars.ContextVar("upstream_cache_mode", default=USE)
+
+
+def current_cache_mode() -> str:
+    return cache_mode_var.get()
+
+
+def parse_cache_mode(value: Optional[str]) -> str:
+    """``?cache=`` value to a mode, falling back to "use\""""
+    value = (value or "").strip().lower()
+    return value if value in CACHE_MODES else USE
+
+
+class CachingAdapter(HTTPAdapter):
+    """requests transport answering repeated GETs from a SharedCache before ``transport`` sends them"""
+
+    def __init__(self, cache: SharedCache, platform: str, credential: Optional[str], transport: HTTPAdapter, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.platform = platform
+        self.credential = credential
+        self.transport = transport
+
+    def send(self, request, **kwargs):
+        ttl = self.cache.ttl(self.platform)
+        mode = current_cache_mode()
+        if not cacheable(request.method, request.url) or ttl <= 0 or mode == OFF:
+            return self.transport.send(request, **kwargs)
+
+        key = self.cache.key(self.platform, self.credential, request.method, request.url)
+        with self.cache.single_flight(key):
+            if mode == USE:
+                value = self.cache.get(key)
+                if value is not None:
+                    return build_response(request, *decode_entry(value), reason="Cached")
+            response = self.transport.send(request, **kwargs)
+            if response.status_code == 200:
+                self.cache.set(key, encode_entry(200, response.headers, response.content), ttl)
+            return response
+
+    def close(self):
+        self.transport.close()
+        super().close()
+
+
+class CachingHttp:
+    """The httplib2 side of CachingAdapter, for googleapiclient-based clients"""
+
+    def __init__(self, cache: SharedCache, platform: str, credential: Optional[str], http):
+        import httplib2
+
+        self.cache = cache
+        self.platform = platform
+        self.credential = credential
+        self.http = http
+        self._response_class = httplib2.Response
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        ttl = self.cache.ttl(self.platform)
+        mode = current_cache_mode()
+        if not cacheable(method, uri) or ttl <= 0 or mode == OFF:
+            return self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+
+        key = self.cache.key(self.platform, self.credential, method, uri)
+        with self.cache.single_flight(key):
+            if mode == USE:
+                value = self.cache.get(key)
+                if value is not None:
+                    status, cached_headers, content = decode_entry(value)
+                    response = self._response_class({name.lower(): value for name, value in cached_headers.items()})
+                    response.status = status
+                    response.reason = "Cached"
+                    return response, content
+            response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+            if response.status == 200:
+                response_headers = {name: value for name, value in response.items()
+                                    if name != "status" and not name.startswith("-")}
+                self.cache.set(key, encode_entry(200, response_headers, content), ttl)
+            return response, content
+
+    def close(self):
+        close = getattr(self.http, "close", None)
+        if close:
+            close()
+
+
+def cached_transport(platform: str, credential: Optional[str], transport: HTTPAdapter) -> HTTPAdapter:
+    """``transport`` behind ``upstream_cache``, or unchanged when the platform is not cached"""
+    if upstream_cache.ttl(platform) <= 0:
+        return transport
+    return CachingAdapter(upstream_cache, platform, credential, transport)
+
+
+def cached_http(platform: str, credential: Optional[str], http):
+    """httplib2 ``http`` behind ``upstream_cache``, or unchanged when the platform is not cached"""
+    if upstream_cache.ttl(platform) <= 0:
+        return http
+    return CachingHttp(upstream_cache, platform, credential, http)
+
+
+def _store() -> Optional[SQLiteStore]:
+    if not Config.UPSTREAM_CACHE_PATH:
+        return None
+    return SQLiteStore(Config.UPSTREAM_CACHE_PATH, busy_timeout_ms=Config.AUTH_DB_BUSY_TIMEOUT_MS,
+                       max_rows=Config.UPSTREAM_CACHE_MAX_ROWS, compress_level=Config.UPSTREAM_CACHE_COMPRESS_LEVEL)
+
+
+upstream_cache = SharedCache(parse_ttls(Config.UPSTREAM_CACHE_TTLS), Config.UPSTREAM_CACHE_MEMORY_ENTRIES, _store())
+
+os.register_at_fork(after_in_child=upstream_cache.reset_after_fork)